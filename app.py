@@ -1,13 +1,32 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, send_file, make_response, stream_with_context, g
 # تغيير طريقة الاستيراد لتجنب الاستيراد الدائري
 # from google_drive_backup import backup_manager, setup_backup_schedule
 from flask_login import LoginManager, login_user, logout_user, login_required, current_user
 from flask_wtf.csrf import CSRFProtect
-from config import Config
-from models import db, User, Employee, Attendance, Payroll, Asset, JobApplication, Document, Settings, Notification, NotificationSettings
+from config import get_config
+from models import db, User, Employee, Attendance, Payroll, Asset, JobApplication, Document, Settings, Notification, NotificationSettings, Job, BackupLog, ScheduledTaskRun, Role
+from stats_service import get_stats
+from attendance_bulk import bulk_upsert_attendance, ensure_unique_index
+from search_index import apply_search, ensure_search_index
+from pagination import keyset_paginate, cursor_url
+from facet_cache import get_facet, init_facet_cache
+from notification_cache import notification_cache, init_notification_cache, RECENT_LIMIT
+from notification_push import broker, init_notification_push, notification_stream
+from notification_fanout import fan_out_notification
+from payroll_run import run_payroll
+from employee_export import filter_employees, export_filters, export_columns, iter_employee_rows, generate_employees_csv, EXPORT_FORMATS
+from employee_fields import compile_field_groups, allowed_columns, employee_projection
+from permissions import SYSTEM_MODULES, EMPTY_ROLE, permission_cache, ensure_default_roles, save_role, remove_role
+from data_export import EXPORT_FORMATS as DATA_EXPORT_FORMATS
+from jobs import init_jobs, submit_job, ensure_job_columns, fail_stale_jobs
+from scheduler import init_scheduler
+from db_engine import init_db_engine, read_replica, replica_stream
+from photo_variants import VARIANTS as PHOTO_VARIANTS, FORMATS as PHOTO_FORMATS, PhotoError, generate_variants, get_variant
+import job_tasks  # تسجيل المهام الخلفية
 from forms import EmployeeForm, AttendanceForm, PayrollForm, AssetForm, JobApplicationForm, UserForm, EditUserForm, DocumentForm, DocumentSearchForm, SettingsForm, SendNotificationForm
 from datetime import datetime, date, timedelta
 from sqlalchemy import func, extract
+from sqlalchemy.orm import joinedload, contains_eager
 import os
 from werkzeug.utils import secure_filename
 from werkzeug.datastructures import FileStorage
@@ -16,34 +35,12 @@ from flask import abort
 import pandas as pd
 import io
 import re
+import uuid
 from flask_talisman import Talisman
 from flask_cors import CORS
 
-def _safe_salary_conversion(value):
-    """تحويل آمن للراتب مع معالجة جميع الحالات الممكنة"""
-    if pd.isna(value) or str(value).strip().lower() in ['', 'nan', 'none', 'null']:
-        return 3000.0  # راتب افتراضي
-    
-    try:
-        # إزالة الفواصل والرموز
-        clean_value = str(value).replace(',', '').replace('ر.س', '').replace('ريال', '').strip()
-        
-        # محاولة التحويل إلى رقم
-        salary = float(clean_value)
-        
-        # التحقق من أن الراتب في نطاق معقول
-        if salary < 0:
-            return 3000.0
-        elif salary > 1000000:  # حد أقصى مليون
-            return 50000.0
-        
-        return salary
-        
-    except (ValueError, TypeError):
-        return 3000.0  # راتب افتراضي في حالة الخطأ
-
 app = Flask(__name__)
-app.config.from_object(Config)
+app.config.from_object(get_config())
 
 # إضافة CSRF Protection
 csrf = CSRFProtect(app)
@@ -73,6 +70,17 @@ app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB
 
 # تهيئة قاعدة البيانات
 db.init_app(app)
+init_db_engine(app)
+
+# تهيئة كاش قوائم الفلاتر
+init_facet_cache(app)
+
+# تهيئة كاش عدادات الإشعارات
+init_notification_cache(app)
+init_notification_push(app)
+
+# تهيئة المهام الخلفية
+init_jobs(app)
 
 # تهيئة نظام تسجيل الدخول
 login_manager = LoginManager()
@@ -107,220 +115,55 @@ def role_required(*allowed_roles):
         return decorated_function
     return decorator
 
-# تعريف جميع الوحدات والحقول في النظام
-SYSTEM_MODULES = {
-    'employees': {
-        'name': 'إدارة الموظفين',
-        'icon': 'fas fa-users',
-        'fields': {
-            'basic_info': {
-                'name': 'البيانات الأساسية',
-                'fields': ['employee_photo', 'name_arabic', 'name_english', 'national_id', 'birth_date', 'nationality', 'gender']
-            },
-            'contact_info': {
-                'name': 'بيانات التواصل',
-                'fields': ['phone', 'additional_phone', 'email', 'address', 'emergency_phone']
-            },
-            'contract_info': {
-                'name': 'بيانات العقد',
-                'fields': ['salary', 'contract_signing_date', 'contract_end_date', 'job_title', 'contract_type']
-            },
-            'work_info': {
-                'name': 'بيانات العمل',
-                'fields': ['department', 'center', 'square', 'camp_number', 'work_shift', 'employee_type']
-            },
-            'bank_info': {
-                'name': 'البيانات البنكية',
-                'fields': ['bank_type', 'iban_number', 'additional_bank', 'beneficiary_name']
-            }
-        }
-    },
-    'documents': {
-        'name': 'إدارة المستندات',
-        'icon': 'fas fa-file-pdf',
-        'fields': {
-            'document_info': {
-                'name': 'معلومات المستند',
-                'fields': ['document_name', 'document_file', 'department', 'category', 'description']
-            },
-            'employee_link': {
-                'name': 'ربط الموظف',
-                'fields': ['employee_id', 'employee_name', 'employee_number']
-            },
-            'security': {
-                'name': 'الأمان',
-                'fields': ['is_confidential', 'status']
-            }
-        }
-    },
-    'attendance': {
-        'name': 'الحضور والغياب',
-        'icon': 'fas fa-clock',
-        'fields': {
-            'time_tracking': {
-                'name': 'تتبع الوقت',
-                'fields': ['check_in', 'check_out', 'break_start', 'break_end']
-            },
-            'status_info': {
-                'name': 'معلومات الحالة',
-                'fields': ['status', 'notes', 'date']
-            }
-        }
-    },
-    'payroll': {
-        'name': 'كشوف الرواتب',
-        'icon': 'fas fa-money-bill-wave',
-        'fields': {
-            'salary_components': {
-                'name': 'مكونات الراتب',
-                'fields': ['basic_salary', 'housing_allowance', 'transport_allowance', 'other_allowances']
-            },
-            'deductions': {
-                'name': 'الخصومات',
-                'fields': ['insurance_deduction', 'tax_deduction', 'other_deductions']
-            },
-            'working_hours': {
-                'name': 'ساعات العمل',
-                'fields': ['regular_hours', 'overtime_hours', 'overtime_rate']
-            }
-        }
-    },
-    'assets': {
-        'name': 'إدارة الأصول',
-        'icon': 'fas fa-laptop',
-        'fields': {
-            'asset_info': {
-                'name': 'معلومات الأصل',
-                'fields': ['asset_id', 'name', 'description', 'category', 'value']
-            },
-            'assignment_info': {
-                'name': 'معلومات التخصيص',
-                'fields': ['employee_id', 'assigned_date', 'return_date', 'condition', 'status']
-            }
-        }
-    },
-    'recruitment': {
-        'name': 'التوظيف',
-        'icon': 'fas fa-user-plus',
-        'fields': {
-            'applicant_info': {
-                'name': 'معلومات المتقدم',
-                'fields': ['first_name', 'last_name', 'email', 'phone', 'position_applied']
-            },
-            'qualifications': {
-                'name': 'المؤهلات',
-                'fields': ['education', 'experience_years', 'skills', 'cover_letter']
-            }
-        }
-    },
-    'users': {
-        'name': 'إدارة المستخدمين',
-        'icon': 'fas fa-user-cog',
-        'fields': {
-            'user_info': {
-                'name': 'معلومات المستخدم',
-                'fields': ['username', 'email', 'role', 'created_at']
-            }
-        }
-    }
-}
-
-# تعريف الصلاحيات التفصيلية لكل دور
-ROLE_PERMISSIONS = {
-    'admin': {
-        'name': 'مدير النظام',
-        'modules': {
-            'employees': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'attendance': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'payroll': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'assets': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'recruitment': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'documents': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'users': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'}
-        }
-    },
-    'manager': {
-        'name': 'مدير',
-        'modules': {
-            'employees': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': ['basic_info', 'contact_info', 'work_info']},
-            'attendance': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'payroll': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': ['salary_components', 'working_hours']},
-            'assets': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'recruitment': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'documents': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
-            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
-        }
-    },
-    'hr': {
-        'name': 'موارد بشرية',
-        'modules': {
-            'employees': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': ['basic_info', 'contact_info', 'contract_info', 'work_info']},
-            'attendance': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': 'all'},
-            'payroll': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': ['salary_components']},
-            'assets': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': 'all'},
-            'recruitment': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': 'all'},
-            'documents': {'view': True, 'add': True, 'edit': False, 'delete': False, 'fields': 'all'},
-            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
-        }
-    },
-    'employee': {
-        'name': 'موظف',
-        'modules': {
-            'employees': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': ['basic_info', 'contact_info']},
-            'attendance': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': ['time_tracking', 'status_info']},
-            'payroll': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'assets': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'recruitment': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'documents': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
-        }
-    },
-    'user': {
-        'name': 'مستخدم عادي',
-        'modules': {
-            'employees': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'attendance': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'payroll': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'assets': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'recruitment': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'documents': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
-            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
-        }
-    }
-}
+# دوال الصلاحيات (من الأدوار المترجمة في permission_cache)
+def current_role():
+    """الدور المترجم للمستخدم الحالي (يحسب مرة واحدة لكل طلب)"""
+    role = g.get('current_role')
+    if role is None:
+        role = permission_cache.role(current_user.role) if current_user.is_authenticated else EMPTY_ROLE
+        g.current_role = role
+    return role
 
-# دوال الصلاحيات المحدثة
 def can_view(resource_type):
-    if not current_user.is_authenticated:
-        return False
-    return ROLE_PERMISSIONS.get(current_user.role, {}).get('modules', {}).get(resource_type, {}).get('view', False)
+    return current_role().allows(resource_type, 'view')
 
 def can_edit(resource_type):
-    if not current_user.is_authenticated:
-        return False
-    return ROLE_PERMISSIONS.get(current_user.role, {}).get('modules', {}).get(resource_type, {}).get('edit', False)
+    return current_role().allows(resource_type, 'edit')
 
 def can_delete(resource_type):
-    if not current_user.is_authenticated:
-        return False
-    return ROLE_PERMISSIONS.get(current_user.role, {}).get('modules', {}).get(resource_type, {}).get('delete', False)
+    return current_role().allows(resource_type, 'delete')
 
 def can_add(resource_type):
-    if not current_user.is_authenticated:
-        return False
-    return ROLE_PERMISSIONS.get(current_user.role, {}).get('modules', {}).get(resource_type, {}).get('add', False)
+    return current_role().allows(resource_type, 'add')
 
 def get_accessible_fields(resource_type):
-    if not current_user.is_authenticated:
-        return []
-    
-    user_permissions = ROLE_PERMISSIONS.get(current_user.role, {}).get('modules', {}).get(resource_type, {})
-    allowed_fields = user_permissions.get('fields', [])
-    
-    if allowed_fields == 'all':
-        return list(SYSTEM_MODULES.get(resource_type, {}).get('fields', {}).keys())
-    
-    return allowed_fields
+    """مجموعات الحقول المسموحة (frozenset) للمستخدم الحالي في الوحدة"""
+    return current_role().fields.get(resource_type, frozenset())
+
+# أعمدة جدول الموظفين لكل مجموعة حقول
+EMPLOYEE_FIELD_COLUMNS = compile_field_groups(SYSTEM_MODULES['employees']['fields'])
+
+# تبويبات تفاصيل الموظف ومجموعات الحقول التي تعرضها
+EMPLOYEE_TABS = (
+    ('personal', ['basic_info']),
+    ('contact', ['contact_info']),
+    ('work', ['contract_info', 'work_info']),
+    ('financial', ['bank_info'])
+)
+
+def get_employee_columns(needed=None):
+    """أعمدة الموظف المسموحة للمستخدم الحالي حسب مجموعات الحقول (مقصورة على needed إن حددت)"""
+    return allowed_columns(EMPLOYEE_FIELD_COLUMNS, get_accessible_fields('employees'), needed)
+
+def employee_load_options(needed=None):
+    """خيار تحميل الموظفين بالأعمدة المسموحة فقط (لا تقرأ أعمدة المجموعات الأخرى من القاعدة)"""
+    return employee_projection(get_employee_columns(needed))
+
+def get_employee_tabs(fields):
+    return [tab for tab, groups in EMPLOYEE_TABS if any(group in fields for group in groups)]
+
+# روابط التنقل بين الصفحات حسب المفتاح
+app.jinja_env.globals['cursor_url'] = cursor_url
 
 # إتاحة الدوال والبيانات في القوالب
 @app.context_processor
@@ -331,8 +174,7 @@ def inject_permissions():
         can_delete=can_delete,
         can_add=can_add,
         get_accessible_fields=get_accessible_fields,
-        SYSTEM_MODULES=SYSTEM_MODULES,
-        ROLE_PERMISSIONS=ROLE_PERMISSIONS
+        SYSTEM_MODULES=SYSTEM_MODULES
     )
 
 # وظائف مساعدة للإشعارات
@@ -373,37 +215,25 @@ def create_attendance_notification(user_id, attendance_id, title, message, prior
 
 def notify_all_admins(title, message, notification_type='info', priority='normal'):
     """إرسال إشعار لجميع المديرين"""
-    admins = User.query.filter(User.role.in_(['admin', 'manager'])).all()
-    for admin in admins:
-        create_system_notification(admin.id, title, message, notification_type, priority)
+    return fan_out_notification(
+        ['admin', 'manager'], title, message, notification_type, priority, source_type='system'
+    )
 
 def notify_hr_staff(title, message, notification_type='info', priority='normal'):
     """إرسال إشعار لموظفي الموارد البشرية"""
-    hr_users = User.query.filter(User.role.in_(['admin', 'manager', 'hr'])).all()
-    for user in hr_users:
-        create_system_notification(user.id, title, message, notification_type, priority)
+    return fan_out_notification(
+        ['admin', 'manager', 'hr'], title, message, notification_type, priority, source_type='system'
+    )
 
 # إضافة context processor للإشعارات
 @app.context_processor
 def inject_notifications():
     if current_user.is_authenticated:
         try:
-            unread_count = Notification.query.filter_by(
-                user_id=current_user.id, 
-                is_read=False, 
-                is_dismissed=False
-            ).filter(
-                db.or_(
-                    Notification.expires_at.is_(None),
-                    Notification.expires_at > datetime.utcnow()
-                )
-            ).count()
-            
-            recent_notifications = Notification.get_user_notifications(
-                current_user.id, 
-                unread_only=False, 
-                limit=5
-            )
+            # من الكاش بدلاً من استعلامين في كل صفحة
+            state = notification_cache.get(current_user.id)
+            unread_count = state['unread_count']
+            recent_notifications = state['recent'][:5]
             
             return {
                 'unread_notifications_count': unread_count,
@@ -422,6 +252,33 @@ def inject_notifications():
 with app.app_context():
     db.create_all()
     
+    # إضافة القيد الفريد لجدول الحضور في قواعد البيانات القديمة
+    try:
+        ensure_unique_index()
+    except Exception as e:
+        print(f'خطأ في إعداد فهرس الحضور: {e}')
+    
+    # إعداد فهرس البحث (FTS5 على SQLite أو pg_trgm على PostgreSQL)
+    try:
+        ensure_search_index()
+    except Exception as e:
+        print(f'خطأ في إعداد فهرس البحث: {e}')
+    
+    # المهام التي توقفت عمليتها قبل إعادة التشغيل (نشر جديد أو نفاد الذاكرة) تحدد كفاشلة
+    try:
+        ensure_job_columns()
+        fail_stale_jobs()
+    except Exception as e:
+        db.session.rollback()
+        print(f'خطأ في فحص المهام المعلقة: {e}')
+    
+    # الأدوار الأساسية في جدول الأدوار (أول تشغيل فقط)
+    try:
+        ensure_default_roles()
+    except Exception as e:
+        db.session.rollback()
+        print(f'خطأ في إعداد الأدوار: {e}')
+    
     # التحقق من وجود مستخدم مدير
     admin_exists = User.query.filter_by(role='admin').first()
     if not admin_exists:
@@ -443,33 +300,17 @@ with app.app_context():
 # الصفحة الرئيسية
 @app.route('/')
 @login_required
+@read_replica
 def index():
-    # إحصائيات الموظفين
-    stats = {
-        'الإدارة': Employee.query.filter_by(employee_type='الإدارة', status='active').count(),
-        'الإداريات': Employee.query.filter_by(employee_type='الإداريات', status='active').count(),
-        'الحراسات الأمنية': Employee.query.filter_by(employee_type='الحراسات الأمنية', status='active').count(),
-        'الحارسات': Employee.query.filter_by(employee_type='الحارسات', status='active').count(),
-        'العمالة رجال': Employee.query.filter_by(employee_type='العمالة رجال', status='active').count(),
-        'العاملات': Employee.query.filter_by(employee_type='العاملات', status='active').count(),
-        'مرشدي الحافلات': Employee.query.filter_by(employee_type='مرشدي الحافلات', status='active').count()
-    }
-    
-    total_employees = sum(stats.values())
-    
-    # إحصائيات إضافية
-    today = date.today()
-    present_today = Attendance.query.filter_by(date=today, status='present').count()
-    absent_today = Attendance.query.filter_by(date=today, status='absent').count()
-    
-    pending_applications = JobApplication.query.filter_by(status='pending').count()
+    # إحصائيات الموظفين والحضور من خدمة الإحصائيات المشتركة
+    dashboard_stats = get_stats(ttl=app.config.get('STATS_CACHE_TTL', 30))
     
     return render_template('index.html', 
-                         stats=stats, 
-                         total_employees=total_employees,
-                         present_today=present_today,
-                         absent_today=absent_today,
-                         pending_applications=pending_applications)
+                         stats=dashboard_stats['employees_by_type'], 
+                         total_employees=dashboard_stats['total_employees'],
+                         present_today=dashboard_stats['attendance']['present'],
+                         absent_today=dashboard_stats['attendance']['absent'],
+                         pending_applications=dashboard_stats['pending_applications'])
 
 # لوحة التحكم
 @app.route('/dashboard')
@@ -479,11 +320,15 @@ def dashboard():
 
 # قسم الموظفين
 # استبدال route الموظفين الحالي (حوالي السطر 87)
+# أعمدة الموظف المعروضة في جدول قائمة الموظفين
+EMPLOYEE_LIST_COLUMNS = ['employee_photo', 'national_id', 'phone', 'department', 'job_title']
+
 @app.route('/employees')
 @login_required
 @role_required('admin', 'manager', 'hr', 'employee')
+@read_replica
 def employees():
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     
     # الحصول على معاملات البحث
     search_name = request.args.get('search_name', '').strip()
@@ -500,97 +345,23 @@ def employees():
     search_contract_type = request.args.get('search_contract_type', '').strip()
     search_employee_type = request.args.get('search_employee_type', '').strip()
     
-    # بناء الاستعلام الأساسي
-    query = Employee.query.filter_by(status='active')
-    
-    # تطبيق الفلاتر
-    if search_name:
-        query = query.filter(
-            db.or_(
-                Employee.name_arabic.contains(search_name),
-                Employee.name_english.contains(search_name)
-            )
-        )
-    
-    if search_national_id:
-        query = query.filter(Employee.national_id.contains(search_national_id))
+    # بناء الاستعلام الأساسي وتطبيق فلاتر البحث (نفس فلاتر التصدير)
+    # (القائمة مرتبة حسب الأحدث لتعمل مع التقسيم حسب المفتاح)
+    query = filter_employees(Employee.query.filter_by(status='active'), request.args)
+    query = query.options(employee_load_options(EMPLOYEE_LIST_COLUMNS))
     
-    if search_employee_id:
-        query = query.filter(Employee.id == search_employee_id)
-    
-    if search_department:
-        query = query.filter(Employee.department.contains(search_department))
+    # ترتيب النتائج وتقسيمها إلى صفحات حسب المفتاح (بدون OFFSET)
+    employees = keyset_paginate(query, [Employee.id], cursor=cursor, per_page=20, with_total=True)
     
-    if search_job_title:
-        query = query.filter(Employee.job_title.contains(search_job_title))
-    
-    if search_phone:
-        query = query.filter(
-            db.or_(
-                Employee.phone.contains(search_phone),
-                Employee.additional_phone.contains(search_phone)
-            )
-        )
-    
-    if search_email:
-        query = query.filter(Employee.email.contains(search_email))
-    
-    if search_gender:
-        query = query.filter(Employee.gender == search_gender)
-    
-    if search_nationality:
-        query = query.filter(Employee.nationality.contains(search_nationality))
-    
-    if search_contract_type:
-        query = query.filter(Employee.contract_type == search_contract_type)
-    
-    if search_employee_type:
-        query = query.filter(Employee.employee_type == search_employee_type)
-    
-    # فلترة التاريخ
-    if date_from:
-        try:
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            query = query.filter(Employee.contract_signing_date >= date_from_obj)
-        except ValueError:
-            pass
-    
-    if date_to:
-        try:
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            query = query.filter(Employee.contract_signing_date <= date_to_obj)
-        except ValueError:
-            pass
-    
-    # ترتيب النتائج وتقسيمها إلى صفحات
-    employees = query.order_by(Employee.id.desc()).paginate(
-        page=page, per_page=20, error_out=False
-    )
-    
-    # الحصول على القيم الفريدة للفلاتر
-    departments = db.session.query(Employee.department).filter(
-        Employee.department.isnot(None), 
-        Employee.department != '',
-        Employee.status == 'active'
-    ).distinct().all()
-    departments = [dept[0] for dept in departments if dept[0]]
-    
-    job_titles = db.session.query(Employee.job_title).filter(
-        Employee.job_title.isnot(None), 
-        Employee.job_title != '',
-        Employee.status == 'active'
-    ).distinct().all()
-    job_titles = [title[0] for title in job_titles if title[0]]
-    
-    nationalities = db.session.query(Employee.nationality).filter(
-        Employee.nationality.isnot(None), 
-        Employee.nationality != '',
-        Employee.status == 'active'
-    ).distinct().all()
-    nationalities = [nat[0] for nat in nationalities if nat[0]]
+    # الحصول على القيم الفريدة للفلاتر (من الكاش)
+    departments = get_facet(Employee.department, status='active')
+    job_titles = get_facet(Employee.job_title, status='active')
+    nationalities = get_facet(Employee.nationality, status='active')
     
     return render_template('employees/list.html', 
                          employees=employees,
+                         fields=get_accessible_fields('employees'),
+                         export_filters=export_filters(request.args),
                          departments=departments,
                          job_titles=job_titles,
                          nationalities=nationalities,
@@ -639,6 +410,12 @@ def add_employee():
                 employee_photo_filename = timestamp + employee_photo_filename
                 photo_path = os.path.join(photos_dir, employee_photo_filename)
                 form.employee_photo.data.save(photo_path)
+                # المقاسات المصغرة (WebP/JPEG بدون EXIF) للقوائم وصفحة الموظف والطباعة
+                generate_variants(photo_path)
+            except PhotoError as e:
+                os.remove(photo_path)
+                flash(f'ملف صورة الموظف غير صالح: {str(e)}', 'error')
+                return render_template('employees/add.html', form=form)
             except Exception as e:
                 flash(f'خطأ في رفع صورة الموظف: {str(e)}', 'error')
                 return render_template('employees/add.html', form=form)
@@ -777,6 +554,7 @@ def add_employee():
 @app.route('/attendance')
 @login_required
 @role_required('admin', 'manager', 'hr', 'employee')
+@read_replica
 def attendance():
     # إحصائيات الجنس
     male_count = Employee.query.filter_by(gender='ذكر', status='active').count()
@@ -789,6 +567,7 @@ def attendance():
 @app.route('/attendance/gender/<gender>')
 @login_required
 @role_required('admin', 'manager', 'hr', 'employee')
+@read_replica
 def attendance_by_gender(gender):
     today = date.today()
     
@@ -831,20 +610,17 @@ def attendance_by_gender(gender):
     if status:
         query = query.filter(Attendance.status == status)
     
-    records = query.all()
-    
-    # الحصول على قوائم الأقسام والورديات
-    departments = db.session.query(Employee.department).filter(
-        Employee.gender == gender,
-        Employee.status == 'active'
-    ).distinct().all()
-    departments = [d[0] for d in departments if d[0]]
+    # تحميل بيانات الموظف من نفس الاستعلام (بدون استعلام لكل سجل)
+    records = query.options(
+        contains_eager(Attendance.employee).load_only(
+            Employee.employee_id, Employee.name_arabic, Employee.first_name,
+            Employee.last_name, Employee.department, Employee.work_shift
+        )
+    ).all()
     
-    shifts = db.session.query(Employee.work_shift).filter(
-        Employee.gender == gender,
-        Employee.status == 'active'
-    ).distinct().all()
-    shifts = [s[0] for s in shifts if s[0]]
+    # الحصول على قوائم الأقسام والورديات (من الكاش)
+    departments = get_facet(Employee.department, gender=gender, status='active')
+    shifts = get_facet(Employee.work_shift, gender=gender, status='active')
     
     return render_template('attendance/list_by_gender.html',
                          records=records,
@@ -862,16 +638,9 @@ def add_attendance_status():
     # الحصول على الموظفين النشطين
     employees = Employee.query.filter_by(status='active').all()
     
-    # الحصول على قوائم الأقسام والورديات
-    departments = db.session.query(Employee.department).filter(
-        Employee.status == 'active'
-    ).distinct().all()
-    departments = [d[0] for d in departments if d[0]]
-    
-    shifts = db.session.query(Employee.work_shift).filter(
-        Employee.status == 'active'
-    ).distinct().all()
-    shifts = [s[0] for s in shifts if s[0]]
+    # الحصول على قوائم الأقسام والورديات (من الكاش)
+    departments = get_facet(Employee.department, status='active')
+    shifts = get_facet(Employee.work_shift, status='active')
     
     return render_template('attendance/add_status.html',
                          employees=employees,
@@ -897,45 +666,23 @@ def save_attendance_status():
             return jsonify({'success': False, 'message': 'بيانات غير مكتملة'})
         
         attendance_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
-        saved_count = 0
-        
-        for employee_id, emp_data in attendance_data.items():
-            # التحقق من وجود سجل حضور
-            existing_record = Attendance.query.filter_by(
-                employee_id=employee_id,
-                date=attendance_date
-            ).first()
-            
-            if existing_record:
-                # تحديث السجل الموجود
-                existing_record.status = emp_data.get('status')
-                if emp_data.get('check_in'):
-                    existing_record.check_in = datetime.strptime(emp_data.get('check_in'), '%H:%M').time()
-                if emp_data.get('check_out'):
-                    existing_record.check_out = datetime.strptime(emp_data.get('check_out'), '%H:%M').time()
-                existing_record.notes = emp_data.get('notes')
-                existing_record.substitute_for_employee_id = emp_data.get('substitute_id')
-                existing_record.employee_type = 'substitute' if emp_data.get('substitute_id') else 'primary'
-            else:
-                # إنشاء سجل جديد
-                new_record = Attendance(
-                    employee_id=employee_id,
-                    date=attendance_date,
-                    status=emp_data.get('status'),
-                    check_in=datetime.strptime(emp_data.get('check_in'), '%H:%M').time() if emp_data.get('check_in') else None,
-                    check_out=datetime.strptime(emp_data.get('check_out'), '%H:%M').time() if emp_data.get('check_out') else None,
-                    notes=emp_data.get('notes'),
-                    substitute_for_employee_id=emp_data.get('substitute_id'),
-                    employee_type='substitute' if emp_data.get('substitute_id') else 'primary'
-                )
-                db.session.add(new_record)
-            
-            saved_count += 1
         
+        # حفظ جماعي: استعلام IN واحد لكل دفعة بدلاً من استعلام لكل موظف
+        result = bulk_upsert_attendance(attendance_date, attendance_data)
         db.session.commit()
+        
+        saved_count = result['inserted'] + result['updated']
+        message = f'تم حفظ {saved_count} سجل حضور بنجاح!'
+        if result['failed']:
+            message += f' (تعذر حفظ {result["failed"]} سجل)'
+        
         return jsonify({
             'success': True, 
-            'message': f'تم حفظ {saved_count} سجل حضور بنجاح!',
+            'message': message,
+            'inserted': result['inserted'],
+            'updated': result['updated'],
+            'failed': result['failed'],
+            'results': result['rows'],
             'redirect_url': url_for('attendance')
         })
         
@@ -946,6 +693,7 @@ def save_attendance_status():
 @app.route('/attendance/export/<gender>')
 @login_required
 @role_required('admin', 'manager', 'hr')
+@read_replica
 def export_attendance(gender):
     # يمكن إضافة وظيفة التصدير هنا
     flash('سيتم إضافة وظيفة التصدير قريباً', 'info')
@@ -1041,6 +789,7 @@ def delete_attendance(id):
 @app.route('/payroll')
 @login_required
 @role_required('admin', 'manager', 'hr')
+@read_replica
 def payroll():
     current_month = date.today().month
     current_year = date.today().year
@@ -1048,6 +797,10 @@ def payroll():
     payroll_records = Payroll.query.filter_by(
         month=current_month, 
         year=current_year
+    ).options(
+        joinedload(Payroll.employee).load_only(
+            Employee.employee_id, Employee.name_arabic, Employee.first_name, Employee.last_name
+        )
     ).all()
     
     return render_template('payroll/list.html', 
@@ -1098,6 +851,31 @@ def add_payroll():
     
     return render_template('payroll/add.html', form=form)
 
+@app.route('/payroll/run', methods=['POST'])
+@login_required
+@role_required('admin', 'manager')
+def run_monthly_payroll():
+    """إنشاء كشوف رواتب الشهر لجميع الموظفين النشطين من سجلات الحضور"""
+    month = request.form.get('month', type=int)
+    year = request.form.get('year', type=int)
+    if not month or not year or not 1 <= month <= 12:
+        flash('يرجى اختيار الشهر والسنة', 'error')
+        return redirect(url_for('payroll'))
+    
+    try:
+        result = run_payroll(month, year)
+        db.session.commit()
+        flash(f'تم إنشاء {result["created"]} كشف راتب (مسودة) لشهر {month}/{year}، '
+              f'وتم تخطي {result["skipped"]} موظف لديهم كشف راتب مسبقاً', 'success')
+        if result['no_salary']:
+            flash(f'تم تخطي {result["no_salary"]} موظف بدون راتب أساسي، يرجى إدخال رواتبهم ثم إعادة التشغيل', 'warning')
+    except Exception as e:
+        db.session.rollback()
+        print(f"خطأ في إنشاء مسير الرواتب: {e}")
+        flash('حدث خطأ أثناء إنشاء كشوف الرواتب!', 'error')
+    
+    return redirect(url_for('payroll'))
+
 @app.route('/payroll/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 @role_required('admin', 'manager')
@@ -1157,9 +935,15 @@ def delete_payroll(id):
 @app.route('/assets')
 @login_required
 @role_required('admin', 'manager', 'hr')
+@read_replica
 def assets():
-    assets = Asset.query.all()
-    return render_template('assets/list.html', assets=assets)
+    assets = Asset.query.options(
+        joinedload(Asset.employee).load_only(
+            Employee.name_arabic, Employee.first_name, Employee.last_name
+        )
+    ).all()
+    categories = sorted({asset.category for asset in assets if asset.category})
+    return render_template('assets/list.html', assets=assets, categories=categories)
 
 @app.route('/assets/add', methods=['GET', 'POST'])
 @login_required
@@ -1348,20 +1132,16 @@ def apply_job():
 # API للإحصائيات
 @app.route('/api/stats')
 @login_required
+@read_replica
 def api_stats():
+    dashboard_stats = get_stats(ttl=app.config.get('STATS_CACHE_TTL', 30))
+    attendance = dashboard_stats['attendance']
     stats = {
-        'employees_by_type': {
-            'الإدارة': Employee.query.filter_by(employee_type='الإدارة', status='active').count(),
-            'الحراسات الأمنية': Employee.query.filter_by(employee_type='الحراسات الأمنية', status='active').count(),
-            'الحارسات': Employee.query.filter_by(employee_type='الحارسات', status='active').count(),
-            'العمالة رجال': Employee.query.filter_by(employee_type='العمالة رجال', status='active').count(),
-            'العاملات': Employee.query.filter_by(employee_type='العاملات', status='active').count(),
-            'مرشدي الحافلات': Employee.query.filter_by(employee_type='مرشدي الحافلات', status='active').count()
-        },
+        'employees_by_type': dashboard_stats['employees_by_type'],
         'attendance_today': {
-            'present': Attendance.query.filter_by(date=date.today(), status='present').count(),
-            'absent': Attendance.query.filter_by(date=date.today(), status='absent').count(),
-            'late': Attendance.query.filter_by(date=date.today(), status='late').count()
+            'present': attendance['present'],
+            'absent': attendance['absent'],
+            'late': attendance['late']
         }
     }
     return jsonify(stats)
@@ -1387,7 +1167,12 @@ def login():
 @role_required('admin')  # إضافة تقييد الصلاحيات
 def settings():
     current_settings = Settings.get_settings()
-    return render_template('settings.html', settings=current_settings)
+    # آخر النسخ الاحتياطية (الحجم والمدة) لمتابعة نموها
+    recent_backups = BackupLog.query.order_by(BackupLog.created_at.desc()).limit(5).all()
+    # آخر تشغيل للمهام الدورية وموعدها القادم
+    scheduled_runs = ScheduledTaskRun.query.order_by(ScheduledTaskRun.name).all()
+    return render_template('settings.html', settings=current_settings, recent_backups=recent_backups,
+                           scheduled_runs=scheduled_runs)
 
 @app.route('/settings/update', methods=['POST'])
 @login_required
@@ -1468,13 +1253,6 @@ def update_settings():
         app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=current_settings.session_lifetime)
         app.config['MAX_CONTENT_LENGTH'] = current_settings.max_file_size * 1024 * 1024
         
-        # إعادة إعداد جدولة النسخ الاحتياطي
-        try:
-            from google_drive_backup import setup_backup_schedule
-            setup_backup_schedule()
-        except Exception as e:
-            print(f"خطأ في إعادة إعداد النسخ الاحتياطي: {e}")
-        
         flash('تم تحديث الإعدادات بنجاح!', 'success')
         
     except Exception as e:
@@ -1496,57 +1274,28 @@ def logout():
 @login_required
 @role_required('admin', 'manager', 'hr')
 def export_employees():
-    try:
-        # جلب جميع الموظفين النشطين
-        employees = Employee.query.filter_by(status='active').all()
-        
-        # إنشاء قائمة البيانات
-        data = []
-        for emp in employees:
-            data.append({
-                'رقم الموظف': emp.id,
-                'الاسم بالعربية': emp.name_arabic,
-                'الاسم بالإنجليزية': emp.name_english,
-                'رقم الهوية': emp.national_id,
-                'تاريخ الميلاد': emp.birth_date.strftime('%Y-%m-%d') if emp.birth_date else '',
-                'الجنسية': emp.nationality,
-                'الجنس': emp.gender,
-                'رقم الهاتف': emp.phone,
-                'البريد الإلكتروني': emp.email,
-                'العنوان': emp.address,
-                'المسمى الوظيفي': emp.job_title,
-                'القسم': emp.department,
-                'المركز': emp.center,
-                'الراتب الأساسي': emp.salary,
-                'تاريخ بداية العقد': emp.contract_signing_date.strftime('%Y-%m-%d') if emp.contract_signing_date else '',
-                'تاريخ انتهاء العقد': emp.contract_end_date.strftime('%Y-%m-%d') if emp.contract_end_date else '',
-                'نوع العقد': emp.contract_type,
-                'نوع الموظف': emp.employee_type,
-                'نوع البنك': emp.bank_type,
-                'رقم الآيبان': emp.iban_number
-            })
-        
-        # إنشاء DataFrame
-        df = pd.DataFrame(data)
-        
-        # إنشاء ملف Excel في الذاكرة
-        output = io.BytesIO()
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            df.to_excel(writer, sheet_name='الموظفين', index=False)
-        
-        output.seek(0)
-        
-        # إرسال الملف للتحميل
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'employees_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
-        )
-        
-    except Exception as e:
-        flash(f'حدث خطأ أثناء تصدير البيانات: {str(e)}', 'error')
-        return redirect(url_for('employees'))
+    # التصدير يحترم نفس فلاتر صفحة قائمة الموظفين
+    export_format = request.args.get('format', 'xlsx')
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+    filters = export_filters(request.args)
+    # أعمدة التصدير مقصورة على مجموعات الحقول المسموحة للمستخدم
+    fields = sorted(get_employee_columns())
+    
+    if export_format == 'xlsx':
+        # ملف Excel يتم إنشاؤه في الخلفية ويتم تحميله من صفحة المهمة
+        job = submit_job('export_employees', params={'filters': filters, 'fields': fields}, user_id=current_user.id)
+        return job_response(job)
+    
+    # CSV يرسل مباشرة على دفعات بدون تجميع الملف في الذاكرة (القراءة من النسخة المقروءة)
+    mimetype, extension = EXPORT_FORMATS[export_format]
+    columns = export_columns(fields)
+    rows = iter_employee_rows(filters, columns=columns)
+    body = generate_employees_csv(rows, compress=(export_format == 'csv.gz'), columns=columns)
+    filename = f'employees_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.{extension}'
+    response = app.response_class(stream_with_context(replica_stream(body)), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
 
 @app.route('/employees/import', methods=['GET', 'POST'])
 @login_required
@@ -1570,154 +1319,19 @@ def import_employees():
                 flash('يجب أن يكون الملف من نوع Excel (.xlsx أو .xls)', 'error')
                 return redirect(url_for('employees'))
             
-            # قراءة ملف Excel مع معالجة الأخطاء
-            try:
-                df = pd.read_excel(file, engine='openpyxl' if file.filename.endswith('.xlsx') else 'xlrd')
-            except Exception as e:
-                flash(f'خطأ في قراءة ملف Excel: {str(e)}', 'error')
-                return redirect(url_for('employees'))
-            
-            # التحقق من وجود بيانات في الملف
-            if df.empty:
-                flash('الملف فارغ أو لا يحتوي على بيانات صالحة', 'error')
-                return redirect(url_for('employees'))
+            # حفظ الملف والاستيراد في الخلفية
+            upload_dir = os.path.join(app.config['JOBS_RESULT_FOLDER'], 'uploads')
+            os.makedirs(upload_dir, exist_ok=True)
+            extension = os.path.splitext(file.filename)[1].lower()
+            upload_path = os.path.abspath(os.path.join(upload_dir, f'{uuid.uuid4().hex}{extension}'))
+            file.save(upload_path)
             
-            # تنظيف أسماء الأعمدة
-            df.columns = df.columns.str.strip()
-            
-            # التحقق من الأعمدة المطلوبة
-            required_columns = ['الاسم بالعربية', 'رقم الهوية']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            
-            if missing_columns:
-                flash(f'الأعمدة التالية مفقودة في الملف: {", ".join(missing_columns)}', 'error')
-                return redirect(url_for('employees'))
-            
-            # معالجة البيانات وإدراجها
-            success_count = 0
-            error_count = 0
-            error_details = []
-            
-            for index, row in df.iterrows():
-                try:
-                    # التحقق من عدم وجود موظف بنفس رقم الهوية
-                    national_id_value = str(row['رقم الهوية']).strip()
-                    if not national_id_value or national_id_value == 'nan':
-                        error_count += 1
-                        error_details.append(f'الصف {index + 2}: رقم الهوية مفقود')
-                        continue
-                        
-                    existing_employee = Employee.query.filter_by(national_id=national_id_value).first()
-                    if existing_employee:
-                        error_count += 1
-                        error_details.append(f'الصف {index + 2}: رقم الهوية {national_id_value} موجود مسبقاً')
-                        continue
-                    
-                    # التحقق من الاسم العربي
-                    name_arabic = str(row['الاسم بالعربية']).strip()
-                    if not name_arabic or name_arabic == 'nan':
-                        error_count += 1
-                        error_details.append(f'الصف {index + 2}: الاسم بالعربية مفقود')
-                        continue
-                    
-                    # إنشاء employee_id تلقائياً
-                    employee_id = Employee.generate_employee_id()
-                    
-                    # تحويل التواريخ بأمان
-                    def safe_date_conversion(date_value):
-                        if pd.isna(date_value) or str(date_value).strip() == '':
-                            return None
-                        try:
-                            return pd.to_datetime(date_value, errors='coerce').date()
-                        except:
-                            return None
-                    
-                    # تعيين قيم افتراضية للحقول الإجبارية
-                    birth_date = safe_date_conversion(row.get('تاريخ الميلاد'))
-                    if not birth_date:
-                        birth_date = date(1990, 1, 1)  # تاريخ افتراضي
-                    
-                    contract_signing_date = safe_date_conversion(row.get('تاريخ بداية العقد'))
-                    if not contract_signing_date:
-                        contract_signing_date = date.today()
-                    
-                    contract_end_date = safe_date_conversion(row.get('تاريخ انتهاء العقد'))
-                    if not contract_end_date:
-                        contract_end_date = date.today() + timedelta(days=365)  # سنة من اليوم
-                    
-                    id_expiry_date = safe_date_conversion(row.get('تاريخ انتهاء الهوية'))
-                    if not id_expiry_date:
-                        id_expiry_date = date.today() + timedelta(days=3650)  # 10 سنوات
-                    
-                    # إنشاء موظف جديد مع جميع الحقول المطلوبة
-                    employee = Employee(
-                        employee_id=employee_id,
-                        name_arabic=name_arabic,
-                        name_english=str(row.get('الاسم بالإنجليزية', '')).strip(),
-                        national_id=national_id_value,
-                        id_validity=str(row.get('صلاحية الهوية', 'سارية')).strip(),
-                        id_expiry_date=id_expiry_date,
-                        birth_date=birth_date,
-                        nationality=str(row.get('الجنسية', 'سعودي')).strip(),
-                        birth_place=str(row.get('مكان الميلاد', '')).strip(),
-                        marital_status=str(row.get('الحالة الاجتماعية', 'أعزب')).strip(),
-                        gender=str(row.get('الجنس', 'ذكر')).strip(),
-                        id_issuer=str(row.get('جهة إصدار الهوية', '')).strip(),
-                        phone=str(row.get('رقم الهاتف', '')).strip(),
-                        additional_phone=str(row.get('رقم هاتف إضافي', '')).strip(),
-                        email=str(row.get('البريد الإلكتروني', '')).strip(),
-                        address=str(row.get('العنوان', '')).strip(),
-                        emergency_phone=str(row.get('رقم الطوارئ', '')).strip(),
-                        salary=_safe_salary_conversion(row.get('الراتب الأساسي', 0)),
-                        contract_signing_date=contract_signing_date,
-                        contract_end_date=contract_end_date,
-                        start_work_date=safe_date_conversion(row.get('تاريخ المباشرة')),
-                        contract_duration=str(row.get('مدة العقد', 'سنة واحدة')).strip(),
-                        job_title=str(row.get('المسمى الوظيفي', 'موظف')).strip(),
-                        contract_type=str(row.get('نوع العقد', 'دائم')).strip(),
-                        probation_period=str(row.get('فترة التجربة', '3 أشهر')).strip(),
-                        working_hours=int(row.get('ساعات العمل', 8)) if pd.notna(row.get('ساعات العمل')) else 8,
-                        uniform_provision=str(row.get('بند البدلة', 'نعم')).strip(),
-                        operating_company=str(row.get('الشركة المشغلة', 'شركة رايزو')).strip(),
-                        notes=str(row.get('ملاحظات', '')).strip(),
-                        penalty_clause=str(row.get('الشرط الجزائي', '')).strip(),
-                        internet_provision=str(row.get('بند الإنترنت', 'لا')).strip(),
-                        department=str(row.get('القسم', 'عام')).strip(),
-                        center=str(row.get('المركز', '')).strip(),
-                        square=str(row.get('المربع', '')).strip(),
-                        camp_number=str(row.get('رقم المخيم', '')).strip(),
-                        work_shift=str(row.get('فترة العمل', 'صباحية')).strip(),
-                        bank_type=str(row.get('نوع البنك', '')).strip(),
-                        iban_number=str(row.get('رقم الآيبان', '')).strip(),
-                        iban_certificate=str(row.get('شهادة الآيبان', '')).strip(),
-                        additional_bank=str(row.get('بنك إضافي', '')).strip(),
-                        additional_iban=str(row.get('آيبان إضافي', '')).strip(),
-                        beneficiary_name=str(row.get('اسم المستفيد', '')).strip(),
-                        beneficiary_phone=str(row.get('رقم المستفيد', '')).strip(),
-                        # حقول التوافق مع النظام القديم
-                        first_name=name_arabic.split()[0] if name_arabic else '',
-                        last_name=' '.join(name_arabic.split()[1:]) if len(name_arabic.split()) > 1 else '',
-                        employee_type=str(row.get('نوع الموظف', 'دائم')).strip(),
-                        hire_date=contract_signing_date,
-                        status='active',
-                        emergency_contact=str(row.get('جهة الطوارئ', '')).strip()
-                    )
-                    
-                    db.session.add(employee)
-                    success_count += 1
-                    
-                except Exception as e:
-                    error_count += 1
-                    error_details.append(f'الصف {index + 2}: {str(e)}')
-                    continue
-            
-            # حفظ التغييرات
-            if success_count > 0:
-                db.session.commit()
-                flash(f'تم استيراد {success_count} موظف بنجاح.', 'success')
-            
-            if error_count > 0:
-                flash(f'فشل في استيراد {error_count} موظف. التفاصيل: {"; ".join(error_details[:5])}', 'warning')
+            job = submit_job(
+                'import_employees',
+                {'path': upload_path, 'filename': file.filename},
+                user_id=current_user.id
+            )
+            return job_response(job)
             
         except Exception as e:
             db.session.rollback()
@@ -1728,12 +1342,29 @@ def import_employees():
 @app.route('/employees/view/<int:id>')
 @login_required
 def view_employee(id):
-    employee = Employee.query.get_or_404(id)
-    return render_template('employees/view.html', employee=employee)
+    employee = Employee.query.options(employee_load_options()).get_or_404(id)
+    fields = get_accessible_fields('employees')
+    return render_template('employees/view.html', employee=employee, fields=fields,
+                           tabs=get_employee_tabs(fields))
+
+@app.route('/employees/<int:id>/card')
+@login_required
+@read_replica
+def employee_card(id):
+    """بطاقة تفاصيل الموظف لنافذة العرض السريع في قائمة الموظفين"""
+    if not can_view('employees'):
+        abort(403)
+    employee = Employee.query.options(employee_load_options()).get_or_404(id)
+    fields = get_accessible_fields('employees')
+    return render_template('employees/_detail_card.html', employee=employee, fields=fields,
+                           tabs=get_employee_tabs(fields))
 
 @app.route('/employees/edit/<int:id>', methods=['GET', 'POST'])
 @login_required
 def edit_employee(id):
+    # النموذج يعرض ويحفظ جميع الحقول، لذلك يلزم صلاحية التعديل
+    if not can_edit('employees'):
+        abort(403)
     employee = Employee.query.get_or_404(id)
     form = EmployeeForm(obj=employee)
     
@@ -1743,10 +1374,18 @@ def edit_employee(id):
         
         # معالجة رفع الصور والمستندات
         if form.employee_photo.data and hasattr(form.employee_photo.data, 'filename') and form.employee_photo.data.filename:
-            photo_filename = secure_filename(form.employee_photo.data.filename)
+            # اسم جديد لكل رفع حتى لا تعرض المتصفحات المقاسات المخزنة للصورة القديمة
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_')
+            photo_filename = timestamp + secure_filename(form.employee_photo.data.filename)
             photo_path = os.path.join(app.config['UPLOAD_FOLDER'], 'photos', photo_filename)
             os.makedirs(os.path.dirname(photo_path), exist_ok=True)
             form.employee_photo.data.save(photo_path)
+            try:
+                generate_variants(photo_path)
+            except PhotoError as e:
+                os.remove(photo_path)
+                flash(f'ملف صورة الموظف غير صالح: {str(e)}', 'error')
+                return render_template('employees/edit.html', form=form, employee=employee)
             employee.employee_photo = photo_filename
             
         if form.iban_certificate.data and hasattr(form.iban_certificate.data, 'filename') and form.iban_certificate.data.filename:
@@ -1782,12 +1421,39 @@ def delete_employee(id):
 @app.route('/employees/print/<int:id>')
 @login_required
 def print_employee(id):
-    employee = Employee.query.get_or_404(id)
-    return render_template('employees/print.html', employee=employee)
+    if not can_view('employees'):
+        abort(403)
+    employee = Employee.query.options(employee_load_options()).get_or_404(id)
+    return render_template('employees/print.html', employee=employee,
+                           fields=get_accessible_fields('employees'))
 
 import logging
 logging.basicConfig(level=logging.DEBUG)
 
+@app.route('/photos/<variant>/<filename>')
+@login_required
+def employee_photo(variant, filename):
+    """مقاس مصغر من صورة الموظف (WebP إذا دعمه المتصفح وإلا JPEG)"""
+    if variant not in PHOTO_VARIANTS or filename != secure_filename(filename):
+        abort(404)
+    fmt = 'webp' if 'image/webp' in request.accept_mimetypes.values() else 'jpg'
+    try:
+        path = get_variant(filename, variant, fmt)
+    except PhotoError as e:
+        print(f"خطأ في إنشاء مقاس الصورة: {e}")
+        path = None
+    if path is None:
+        abort(404)
+
+    response = send_file(os.path.abspath(path), mimetype=PHOTO_FORMATS[fmt][0],
+                         max_age=app.config['PHOTO_CACHE_MAX_AGE'])
+    # اسم الصورة لا يتكرر لمحتوى مختلف، لذلك لا يعاد التحقق منها
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.immutable = True
+    response.vary.add('Accept')
+    return response
+
 @app.route('/debug/photos')
 @login_required
 def debug_photos():
@@ -1806,10 +1472,8 @@ def users():
         flash('ليس لديك صلاحية للوصول إلى هذه الصفحة', 'error')
         return redirect(url_for('dashboard'))
     
-    page = request.args.get('page', 1, type=int)
-    users = User.query.paginate(
-        page=page, per_page=20, error_out=False
-    )
+    cursor = request.args.get('cursor')
+    users = keyset_paginate(User.query, [User.id], cursor=cursor, per_page=20, with_total=True)
     return render_template('users/list.html', users=users)
 
 # إضافة route الصلاحيات بشكل منفصل
@@ -1820,13 +1484,14 @@ def permissions():
         flash('ليس لديك صلاحية للوصول إلى هذه الصفحة', 'error')
         return redirect(url_for('dashboard'))
     
-    return render_template('permissions.html')
+    return render_template('permissions.html', ROLE_PERMISSIONS=permission_cache.definitions())
 
 @app.route('/users/add', methods=['GET', 'POST'])
 @login_required
 @role_required('admin')
 def add_user():
     form = UserForm()
+    form.role.choices = permission_cache.choices()
     if form.validate_on_submit():
         # التحقق من عدم وجود مستخدم بنفس اسم المستخدم أو البريد الإلكتروني
         existing_user = User.query.filter(
@@ -1864,6 +1529,7 @@ def add_user():
 def edit_user(id):
     user = User.query.get_or_404(id)
     form = EditUserForm(original_user=user, obj=user)
+    form.role.choices = permission_cache.choices()
     
     if form.validate_on_submit():
         try:
@@ -1918,10 +1584,13 @@ def delete_user(id):
         
         # تحديث المستندات المرفوعة من قبل المستخدم (إزالة الربط بدلاً من الحذف)
         Document.query.filter_by(uploaded_by=user.id).update({'uploaded_by': None})
+        Job.query.filter_by(created_by=user.id).update({'created_by': None})
         
         # الآن يمكن حذف المستخدم بأمان
+        user_id = user.id
         db.session.delete(user)
         db.session.commit()
+        notification_cache.invalidate(user_id)
         
         flash('تم حذف المستخدم بنجاح!', 'success')
     except Exception as e:
@@ -1933,6 +1602,7 @@ def delete_user(id):
 # ===== إدارة المستندات =====
 @app.route('/documents')
 @login_required
+@read_replica
 def documents():
     if not can_view('documents'):
         flash('ليس لديك صلاحية لعرض المستندات', 'error')
@@ -1987,12 +1657,9 @@ def documents():
     total_size = db.session.query(db.func.sum(Document.file_size)).filter_by(status='active').scalar() or 0
     total_size_mb = round(total_size / (1024 * 1024), 2)
     
-    # الأقسام والفئات للفلترة
-    departments = db.session.query(Document.department).filter_by(status='active').distinct().all()
-    departments = [dept[0] for dept in departments if dept[0]]
-    
-    categories = db.session.query(Document.category).filter_by(status='active').distinct().all()
-    categories = [cat[0] for cat in categories if cat[0]]
+    # الأقسام والفئات للفلترة (من الكاش)
+    departments = get_facet(Document.department, status='active')
+    categories = get_facet(Document.category, status='active')
     
     return render_template('documents/list.html',
                          documents=documents,
@@ -2208,7 +1875,7 @@ def add_role():
         return redirect(url_for('permissions'))
     
     # التحقق من عدم وجود الدور مسبقاً
-    if role_key in ROLE_PERMISSIONS:
+    if role_key in permission_cache.roles():
         flash('هذا الدور موجود بالفعل', 'error')
         return redirect(url_for('permissions'))
     
@@ -2234,16 +1901,14 @@ def add_role():
         
         new_role['modules'][module_key] = module_permissions
     
-    # إضافة الدور الجديد إلى ROLE_PERMISSIONS
-    ROLE_PERMISSIONS[role_key] = new_role
-    
-    # حفظ الأدوار في ملف منفصل (اختياري)
+    # حفظ الدور في قاعدة البيانات (يظهر في جميع العمليات مع الطلب التالي)
     try:
-        import json
-        with open('roles_config.json', 'w', encoding='utf-8') as f:
-            json.dump(ROLE_PERMISSIONS, f, ensure_ascii=False, indent=2)
+        save_role(role_key, role_name, new_role['modules'])
+        db.session.commit()
     except Exception as e:
-        print(f'تحذير: لم يتم حفظ الأدوار في الملف: {e}')
+        db.session.rollback()
+        flash(f'حدث خطأ أثناء حفظ الدور: {str(e)}', 'error')
+        return redirect(url_for('permissions'))
     
     flash(f'تم إضافة الدور "{role_name}" بنجاح', 'success')
     return redirect(url_for('permissions'))
@@ -2257,8 +1922,8 @@ def delete_role(role_key):
         return redirect(url_for('permissions'))
     
     # منع حذف الأدوار الأساسية
-    protected_roles = ['admin', 'manager', 'hr', 'employee', 'user']
-    if role_key in protected_roles:
+    role = db.session.get(Role, role_key)
+    if role is not None and role.is_system:
         flash('لا يمكن حذف الأدوار الأساسية للنظام', 'error')
         return redirect(url_for('permissions'))
     
@@ -2268,17 +1933,15 @@ def delete_role(role_key):
         flash(f'لا يمكن حذف هذا الدور لأن هناك {users_with_role} مستخدم يستخدمه', 'error')
         return redirect(url_for('permissions'))
     
-    if role_key in ROLE_PERMISSIONS:
-        role_name = ROLE_PERMISSIONS[role_key]['name']
-        del ROLE_PERMISSIONS[role_key]
-        
-        # حفظ التغييرات في الملف
+    if role is not None:
+        role_name = role.name
         try:
-            import json
-            with open('roles_config.json', 'w', encoding='utf-8') as f:
-                json.dump(ROLE_PERMISSIONS, f, ensure_ascii=False, indent=2)
+            remove_role(role_key)
+            db.session.commit()
         except Exception as e:
-            print(f'تحذير: لم يتم حفظ التغييرات في الملف: {e}')
+            db.session.rollback()
+            flash(f'حدث خطأ أثناء حذف الدور: {str(e)}', 'error')
+            return redirect(url_for('permissions'))
         
         flash(f'تم حذف الدور "{role_name}" بنجاح', 'success')
     else:
@@ -2290,48 +1953,19 @@ def delete_role(role_key):
 @app.route('/reports')
 @login_required
 @role_required('admin', 'manager', 'hr')
+@read_replica
 def reports():
-    # إحصائيات الموظفين
-    total_employees = Employee.query.filter_by(status='active').count()
-    employees_by_type = {
-        'الإدارة': Employee.query.filter_by(employee_type='الإدارة', status='active').count(),
-        'الإداريات': Employee.query.filter_by(employee_type='الإداريات', status='active').count(),
-        'الحراسات الأمنية': Employee.query.filter_by(employee_type='الحراسات الأمنية', status='active').count(),
-        'العمال': Employee.query.filter_by(employee_type='العمال', status='active').count(),
-        'المقاولين': Employee.query.filter_by(employee_type='المقاولين', status='active').count()
-    }
-    
-    # إحصائيات الحضور
-    today = date.today()
-    attendance_today = Attendance.query.filter(
-        func.date(Attendance.date) == today
-    ).count()
-    
-    # إحصائيات الرواتب
-    current_month = today.month
-    current_year = today.year
-    payroll_count = Payroll.query.filter(
-        Payroll.month == current_month,
-        Payroll.year == current_year
-    ).count()
-    
-    # إحصائيات الوثائق
-    total_documents = Document.query.count()
-    confidential_documents = Document.query.filter_by(is_confidential=True).count()
-    
-    # إحصائيات الأصول
-    total_assets = Asset.query.count()
-    assigned_assets = Asset.query.filter_by(status='assigned').count()
+    dashboard_stats = get_stats(ttl=app.config.get('STATS_CACHE_TTL', 30))
     
     return render_template('reports.html', 
-                         total_employees=total_employees,
-                         employees_by_type=employees_by_type,
-                         attendance_today=attendance_today,
-                         payroll_count=payroll_count,
-                         total_documents=total_documents,
-                         confidential_documents=confidential_documents,
-                         total_assets=total_assets,
-                         assigned_assets=assigned_assets)
+                         total_employees=dashboard_stats['total_employees'],
+                         employees_by_type=dashboard_stats['employees_by_type'],
+                         attendance_today=dashboard_stats['attendance_total'],
+                         payroll_count=dashboard_stats['payroll_count'],
+                         total_documents=dashboard_stats['total_documents'],
+                         confidential_documents=dashboard_stats['confidential_documents'],
+                         total_assets=dashboard_stats['total_assets'],
+                         assigned_assets=dashboard_stats['assigned_assets'])
 
 @app.route('/api/search-substitute', methods=['POST'])
 @login_required
@@ -2343,17 +1977,9 @@ def search_substitute():
         if not search_term:
             return jsonify({'employees': []})
         
-        # البحث في الموظفين النشطين
-        employees = Employee.query.filter(
-            Employee.status == 'active',
-            db.or_(
-                Employee.employee_id.contains(search_term),
-                Employee.name_arabic.contains(search_term),
-                Employee.name_english.contains(search_term),
-                Employee.national_id.contains(search_term),
-                Employee.phone.contains(search_term)
-            )
-        ).limit(10).all()
+        # البحث في الموظفين النشطين عبر فهرس البحث مع ترتيب النتائج حسب الصلة
+        query = apply_search(Employee.query.filter(Employee.status == 'active'), any_field=search_term)
+        employees = query.order_by(Employee.id.desc()).limit(10).all()
         
         result = []
         for emp in employees:
@@ -2374,10 +2000,10 @@ def search_substitute():
 @login_required
 def notifications():
     """صفحة عرض جميع الإشعارات"""
-    page = request.args.get('page', 1, type=int)
+    cursor = request.args.get('cursor')
     per_page = 20
     
-    notifications = Notification.query.filter_by(
+    query = Notification.query.filter_by(
         user_id=current_user.id,
         is_dismissed=False
     ).filter(
@@ -2385,8 +2011,9 @@ def notifications():
             Notification.expires_at.is_(None),
             Notification.expires_at > datetime.utcnow()
         )
-    ).order_by(Notification.created_at.desc()).paginate(
-        page=page, per_page=per_page, error_out=False
+    )
+    notifications = keyset_paginate(
+        query, [Notification.created_at, Notification.id], cursor=cursor, per_page=per_page
     )
     
     return render_template('notifications/list.html', notifications=notifications)
@@ -2398,30 +2025,55 @@ def api_notifications():
     unread_only = request.args.get('unread_only', 'false').lower() == 'true'
     limit = request.args.get('limit', 10, type=int)
     
-    # الحصول على الإشعارات
-    notifications = Notification.get_user_notifications(
-        current_user.id,
-        unread_only=unread_only,
-        limit=limit
-    )
+    state = notification_cache.get(current_user.id)
     
-    # حساب العدد الصحيح للإشعارات غير المقروءة
-    unread_count = Notification.query.filter_by(
-        user_id=current_user.id,
-        is_read=False,
-        is_dismissed=False
-    ).filter(
-        db.or_(
-            Notification.expires_at.is_(None),
-            Notification.expires_at > datetime.utcnow()
-        )
-    ).count()
+    # آخر الإشعارات محفوظة في الكاش، ونستعلم فقط للطلبات الأكبر أو غير المقروءة فقط
+    if not unread_only and limit <= RECENT_LIMIT:
+        notifications = state['recent'][:limit]
+    else:
+        notifications = [n.to_dict() for n in Notification.get_user_notifications(
+            current_user.id,
+            unread_only=unread_only,
+            limit=limit
+        )]
     
     return jsonify({
-        'notifications': [n.to_dict() for n in notifications],
-        'unread_count': unread_count
+        'notifications': notifications,
+        'unread_count': state['unread_count']
     })
 
+@app.route('/api/notifications/stream')
+@login_required
+def api_notifications_stream():
+    """دفع الإشعارات الجديدة وتغيرات العداد عبر Server-Sent Events"""
+    # 204 يجعل المتصفح يتوقف عن إعادة الاتصال ويعود للاستعلام الدوري
+    # (البث معطل، أو كل الأماكن مشغولة حتى تبقى خيوط للطلبات العادية)
+    if not app.config.get('NOTIFICATION_STREAM_ENABLED', True) or not broker.acquire():
+        return '', 204
+    
+    user_id = current_user.id
+    
+    def load_state():
+        state = notification_cache.get(user_id)
+        # عدم الاحتفاظ باتصال قاعدة البيانات طوال مدة البث
+        db.session.remove()
+        return {
+            'notifications': state['recent'][:5],
+            'unread_count': state['unread_count']
+        }
+    
+    stream = notification_stream(
+        user_id,
+        load_state,
+        heartbeat=app.config.get('NOTIFICATION_STREAM_HEARTBEAT', 15),
+        timeout=app.config.get('NOTIFICATION_STREAM_TIMEOUT', 300)
+    )
+    response = app.response_class(stream_with_context(stream), mimetype='text/event-stream')
+    response.call_on_close(broker.release)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
 @app.route('/notifications/<int:notification_id>/read', methods=['POST'])
 @login_required
 def mark_notification_read(notification_id):
@@ -2458,6 +2110,8 @@ def mark_all_notifications_read():
     ).update({'is_read': True, 'read_at': datetime.utcnow()})
     
     db.session.commit()
+    # التحديث الجماعي لا يمر بأحداث النموذج
+    notification_cache.invalidate(current_user.id)
     
     return jsonify({'success': True})
 
@@ -2507,15 +2161,13 @@ def send_notification():
     
     if form.validate_on_submit():
         try:
-            recipients = []
+            recipients = None
             
             # تحديد المستلمين حسب النوع
             if form.recipient_type.data == 'single':
                 if form.recipient_user.data and form.recipient_user.data != 0:
-                    user = User.query.get(form.recipient_user.data)
-                    if user:
-                        recipients = [user]
-                    else:
+                    recipients = User.query.filter_by(id=form.recipient_user.data)
+                    if not recipients.first():
                         flash('المستخدم المحدد غير موجود', 'error')
                         return render_template('notifications/send.html', form=form)
                 else:
@@ -2524,53 +2176,34 @@ def send_notification():
                     
             elif form.recipient_type.data == 'role':
                 if form.recipient_role.data:
-                    recipients = User.query.filter_by(role=form.recipient_role.data).all()
+                    recipients = [form.recipient_role.data]
                 else:
                     flash('يرجى اختيار الدور', 'error')
                     return render_template('notifications/send.html', form=form)
-                    
-            elif form.recipient_type.data == 'all':
-                recipients = User.query.all()
             
-            if not recipients:
-                flash('لم يتم العثور على مستلمين', 'error')
-                return render_template('notifications/send.html', form=form)
+            expires_at = None
+            if form.expires_at.data:
+                expires_at = datetime.combine(form.expires_at.data, datetime.min.time())
             
-            # إرسال الإشعار لكل مستلم
-            sent_count = 0
-            for recipient in recipients:
-                try:
-                    expires_at = None
-                    if form.expires_at.data:
-                        expires_at = datetime.combine(form.expires_at.data, datetime.min.time())
-                    
-                    notification = Notification.create_notification(
-                        user_id=recipient.id,
-                        title=form.title.data,
-                        message=form.message.data,
-                        notification_type=form.notification_type.data,
-                        priority=form.priority.data,
-                        action_url=form.action_url.data if form.action_url.data else None,
-                        action_text=form.action_text.data if form.action_text.data else None,
-                        expires_at=expires_at,
-                        source_type='admin_message',
-                        source_id=current_user.id
-                    )
-                    
-                    if notification:
-                        db.session.add(notification)
-                        sent_count += 1
-                        
-                except Exception as e:
-                    print(f'خطأ في إرسال الإشعار للمستخدم {recipient.username}: {str(e)}')
-                    continue
+            # إدراج جميع الإشعارات في معاملة واحدة (أو في الخلفية للأعداد الكبيرة)
+            sent_count = fan_out_notification(
+                recipients,
+                title=form.title.data,
+                message=form.message.data,
+                notification_type=form.notification_type.data,
+                priority=form.priority.data,
+                action_url=form.action_url.data if form.action_url.data else None,
+                action_text=form.action_text.data if form.action_text.data else None,
+                expires_at=expires_at,
+                source_type='admin_message',
+                source_id=current_user.id
+            )
             
             if sent_count > 0:
-                db.session.commit()
                 flash(f'تم إرسال الإشعار بنجاح إلى {sent_count} مستخدم', 'success')
                 return redirect(url_for('notifications'))
             else:
-                flash('فشل في إرسال الإشعار', 'error')
+                flash('لم يتم العثور على مستلمين', 'error')
                 
         except Exception as e:
             db.session.rollback()
@@ -2583,13 +2216,8 @@ def send_notification():
 @login_required
 @role_required('admin')
 def create_backup():
-    try:
-        from google_drive_backup import get_backup_manager
-        backup_manager = get_backup_manager()
-        result = backup_manager.create_database_backup()
-        return jsonify({'success': True, 'message': 'تم إنشاء النسخة الاحتياطية بنجاح'})
-    except Exception as e:
-        return jsonify({'success': False, 'message': f'خطأ في إنشاء النسخة الاحتياطية: {str(e)}'})
+    job = submit_job('create_backup', user_id=current_user.id)
+    return job_response(job)
 
 @app.route('/backup/setup-drive')
 @login_required
@@ -2608,57 +2236,64 @@ def setup_drive():
 @login_required
 @role_required('admin')
 def export_all_data():
-    try:
-        # إنشاء ملف Excel متعدد الأوراق
-        output = io.BytesIO()
-        
-        with pd.ExcelWriter(output, engine='openpyxl') as writer:
-            # تصدير الموظفين
-            employees = Employee.query.all()
-            emp_data = [{
-                'ID': emp.id,
-                'الاسم': emp.name_arabic,
-                'الهاتف': emp.phone,
-                'القسم': emp.department,
-                'الراتب': emp.salary
-            } for emp in employees]
-            pd.DataFrame(emp_data).to_excel(writer, sheet_name='الموظفين', index=False)
-            
-            # تصدير الحضور
-            attendance = Attendance.query.all()
-            att_data = [{
-                'الموظف': att.employee.name_arabic if att.employee else '',
-                'التاريخ': att.date,
-                'الحالة': att.status,
-                'دخول': att.check_in,
-                'خروج': att.check_out
-            } for att in attendance]
-            pd.DataFrame(att_data).to_excel(writer, sheet_name='الحضور', index=False)
-            
-            # تصدير الرواتب
-            payrolls = Payroll.query.all()
-            pay_data = [{
-                'الموظف': pay.employee.name_arabic if pay.employee else '',
-                'الشهر': pay.month,
-                'السنة': pay.year,
-                'الراتب الإجمالي': pay.total_salary
-            } for pay in payrolls]
-            pd.DataFrame(pay_data).to_excel(writer, sheet_name='الرواتب', index=False)
-        
-        output.seek(0)
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        
-        return send_file(
-            output,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=f'raizo_complete_backup_{timestamp}.xlsx'
-        )
-        
-    except Exception as e:
-        flash(f'حدث خطأ أثناء تصدير البيانات: {str(e)}', 'error')
-        return redirect(url_for('settings'))
+    # xlsx: ملف Excel بعدة أوراق، zip: ملف CSV لكل جدول
+    export_format = request.args.get('format', 'xlsx')
+    if export_format not in DATA_EXPORT_FORMATS:
+        abort(400)
+    job = submit_job('export_all_data', params={'export_format': export_format}, user_id=current_user.id)
+    return job_response(job)
+
+# ===== المهام الخلفية =====
+def job_response(job):
+    """الرد على طلب بدء مهمة: JSON لطلبات API وإلا صفحة متابعة المهمة"""
+    if request.accept_mimetypes.best == 'application/json' or request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+        return jsonify({
+            'success': True,
+            'message': 'تم بدء المهمة في الخلفية',
+            'job': job.to_dict(),
+            'status_url': url_for('job_status', job_id=job.id)
+        }), 202
+    return redirect(url_for('job_view', job_id=job.id))
+
+def get_user_job(job_id):
+    """جلب مهمة يملكها المستخدم الحالي (أو أي مهمة لمدير النظام)"""
+    job = Job.query.get_or_404(job_id)
+    if job.created_by != current_user.id and current_user.role != 'admin':
+        abort(404)
+    return job
+
+@app.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    """حالة المهمة ونسبة الإنجاز"""
+    job = get_user_job(job_id)
+    data = job.to_dict()
+    if job.result_path:
+        data['download_url'] = url_for('job_download', job_id=job.id)
+    return jsonify(data)
+
+@app.route('/jobs/<job_id>/view')
+@login_required
+def job_view(job_id):
+    """صفحة متابعة المهمة"""
+    job = get_user_job(job_id)
+    return render_template('jobs/view.html', job=job)
+
+@app.route('/jobs/<job_id>/download')
+@login_required
+def job_download(job_id):
+    """تحميل ملف نتيجة المهمة"""
+    job = get_user_job(job_id)
+    if job.status != 'succeeded' or not job.result_path or not os.path.exists(job.result_path):
+        abort(404)
+    return send_file(
+        job.result_path,
+        mimetype=job.result_mimetype or 'application/octet-stream',
+        as_attachment=True,
+        download_name=job.result_name or os.path.basename(job.result_path)
+    )
 
 if __name__ == '__main__':
     # للتطوير المحلي فقط
+    init_scheduler(app)
     app.run(debug=False, host='0.0.0.0', port=5000)
\ No newline at end of file
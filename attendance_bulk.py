@@ -0,0 +1,212 @@
+from datetime import datetime
+
+from sqlalchemy import func, inspect, insert, select, text, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
+
+from models import db, Employee, Attendance
+
+# عدد الصفوف في كل دفعة إدراج/تحديث
+CHUNK_SIZE = 500
+
+UNIQUE_INDEX_NAME = 'uq_attendance_employee_date'
+UNIQUE_COLUMNS = ['employee_id', 'date']
+
+# نتيجة فحص وجود القيد الفريد لكل محرك قاعدة بيانات
+_native_upsert_support = {}
+
+
+def ensure_unique_index():
+    """إضافة الفهرس الفريد (employee_id, date) لقواعد البيانات القديمة"""
+    if _has_unique_index():
+        return True
+    try:
+        db.session.execute(text(
+            f'CREATE UNIQUE INDEX IF NOT EXISTS {UNIQUE_INDEX_NAME} ON attendance (employee_id, date)'
+        ))
+        db.session.commit()
+        _native_upsert_support.pop(str(db.engine.url), None)
+        return True
+    except (IntegrityError, OperationalError, ProgrammingError) as e:
+        # توجد سجلات مكررة لنفس الموظف في نفس اليوم، نستمر بدون الحفظ الأصلي
+        db.session.rollback()
+        print(f"تحذير: تعذر إنشاء الفهرس الفريد لجدول الحضور: {e}")
+        return False
+
+
+def _has_unique_index():
+    inspector = inspect(db.engine)
+    for constraint in inspector.get_unique_constraints('attendance'):
+        if sorted(constraint['column_names']) == UNIQUE_COLUMNS:
+            return True
+    for index in inspector.get_indexes('attendance'):
+        if index.get('unique') and sorted(index['column_names']) == UNIQUE_COLUMNS:
+            return True
+    return False
+
+
+def supports_native_upsert():
+    """هل يدعم المحرك الحالي ON CONFLICT (employee_id, date)؟"""
+    key = str(db.engine.url)
+    if key not in _native_upsert_support:
+        _native_upsert_support[key] = (
+            db.engine.dialect.name in ('sqlite', 'postgresql') and _has_unique_index()
+        )
+    return _native_upsert_support[key]
+
+
+def _parse_time(value):
+    if not value:
+        return None
+    return datetime.strptime(value, '%H:%M').time()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _parse_rows(attendance_data, attendance_date, report):
+    """تحويل بيانات JSON إلى صفوف جاهزة للحفظ مع تسجيل أخطاء التحويل
+
+    المفاتيح التي تشير لنفس الموظف ("1" و"01") تدمج في صف واحد (الأخير يطبق)،
+    لأن تكرار (employee_id, date) في نفس الدفعة يفشل ON CONFLICT ويضيف سجلين بدونه.
+    """
+    rows = {}
+    for employee_key, emp_data in attendance_data.items():
+        try:
+            employee_id = int(employee_key)
+            substitute_id = emp_data.get('substitute_id')
+            rows[employee_id] = {
+                'employee_id': employee_id,
+                'date': attendance_date,
+                'status': emp_data.get('status'),
+                'check_in': _parse_time(emp_data.get('check_in')),
+                'check_out': _parse_time(emp_data.get('check_out')),
+                'notes': emp_data.get('notes'),
+                'substitute_for_employee_id': substitute_id,
+                'employee_type': 'substitute' if substitute_id else 'primary'
+            }
+        except (ValueError, TypeError, AttributeError) as e:
+            report.append({
+                'employee_id': employee_key,
+                'action': 'error',
+                'message': f'بيانات غير صالحة: {e}'
+            })
+    return list(rows.values())
+
+
+def _upsert_statement(dialect_name):
+    """جملة INSERT ... ON CONFLICT (employee_id, date) DO UPDATE"""
+    dialect_insert = postgresql.insert if dialect_name == 'postgresql' else sqlite.insert
+    stmt = dialect_insert(Attendance.__table__)
+    table = Attendance.__table__
+    return stmt.on_conflict_do_update(
+        index_elements=UNIQUE_COLUMNS,
+        set_={
+            'status': stmt.excluded.status,
+            # الإبقاء على الأوقات المسجلة سابقاً إذا لم ترسل أوقات جديدة
+            'check_in': func.coalesce(stmt.excluded.check_in, table.c.check_in),
+            'check_out': func.coalesce(stmt.excluded.check_out, table.c.check_out),
+            'notes': stmt.excluded.notes,
+            'substitute_for_employee_id': stmt.excluded.substitute_for_employee_id,
+            'employee_type': stmt.excluded.employee_type,
+            'data_completeness': stmt.excluded.data_completeness
+        }
+    )
+
+
+def bulk_upsert_attendance(attendance_date, attendance_data, chunk_size=CHUNK_SIZE):
+    """حفظ حالة الحضور لمجموعة كبيرة من الموظفين دفعة واحدة
+
+    يعيد قاموساً يحتوي على أعداد السجلات المضافة والمحدثة والفاشلة
+    وتقريراً لكل صف. لا يقوم بعمل commit.
+    """
+    report = []
+    rows = _parse_rows(attendance_data, attendance_date, report)
+    native = supports_native_upsert()
+    upsert_stmt = _upsert_statement(db.engine.dialect.name) if native else None
+
+    for chunk in _chunks(rows, chunk_size):
+        employee_ids = [row['employee_id'] for row in chunk]
+
+        # استعلام IN واحد للتحقق من وجود الموظفين
+        known_ids = set(db.session.scalars(
+            select(Employee.id).where(Employee.id.in_(employee_ids))
+        ))
+
+        # استعلام IN واحد لجلب السجلات الموجودة لهذا اليوم
+        existing = {
+            record.employee_id: record
+            for record in db.session.execute(
+                select(
+                    Attendance.id,
+                    Attendance.employee_id,
+                    Attendance.check_in,
+                    Attendance.check_out,
+                    Attendance.report_file
+                ).where(
+                    Attendance.date == attendance_date,
+                    Attendance.employee_id.in_(employee_ids)
+                )
+            )
+        }
+
+        to_insert = []
+        to_update = []
+        for row in chunk:
+            employee_id = row['employee_id']
+            if employee_id not in known_ids:
+                report.append({
+                    'employee_id': employee_id,
+                    'action': 'error',
+                    'message': 'الموظف غير موجود'
+                })
+                continue
+
+            current = existing.get(employee_id)
+            if current:
+                # نفس منطق التحديث السابق: الأوقات الفارغة لا تمسح الأوقات المسجلة
+                check_in = row['check_in'] or current.check_in
+                check_out = row['check_out'] or current.check_out
+                report_file = current.report_file
+            else:
+                check_in, check_out, report_file = row['check_in'], row['check_out'], None
+
+            row['data_completeness'] = Attendance.evaluate_completeness(
+                row['status'], check_in, check_out, report_file
+            )
+
+            if current:
+                if not native:
+                    update_row = dict(row, id=current.id, check_in=check_in, check_out=check_out)
+                    to_update.append(update_row)
+                report.append({
+                    'employee_id': employee_id,
+                    'action': 'updated',
+                    'data_completeness': row['data_completeness']
+                })
+            else:
+                report.append({
+                    'employee_id': employee_id,
+                    'action': 'inserted',
+                    'data_completeness': row['data_completeness']
+                })
+            if native or not current:
+                to_insert.append(row)
+
+        if native:
+            if to_insert:
+                db.session.execute(upsert_stmt, to_insert)
+        else:
+            if to_insert:
+                db.session.execute(insert(Attendance), to_insert)
+            if to_update:
+                db.session.execute(update(Attendance), to_update)
+
+    return {
+        'inserted': sum(1 for item in report if item['action'] == 'inserted'),
+        'updated': sum(1 for item in report if item['action'] == 'updated'),
+        'failed': sum(1 for item in report if item['action'] == 'error'),
+        'rows': report
+    }
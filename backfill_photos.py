@@ -0,0 +1,20 @@
+"""إنشاء المقاسات المصغرة (WebP/JPEG) لصور الموظفين الموجودة مسبقاً
+
+الاستخدام:
+    python backfill_photos.py          # الصور التي ليس لها مقاسات فقط
+    python backfill_photos.py --force  # إعادة إنشاء جميع المقاسات
+"""
+import sys
+
+from photo_variants import backfill_variants
+
+
+def main(args):
+    created, errors = backfill_variants(force='--force' in args)
+    print(f"تم إنشاء المقاسات لـ {created} صورة")
+    for error in errors:
+        print(f"خطأ: {error}")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
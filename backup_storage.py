@@ -0,0 +1,407 @@
+import json
+import os
+import random
+import shutil
+import socket
+import threading
+import time
+from datetime import datetime
+
+from config import Config
+
+try:
+    import boto3
+except ImportError:  # مطلوب فقط عند استخدام تخزين S3
+    boto3 = None
+
+DEFAULT_RETRIES = 5
+
+# امتداد ملف حالة الرفع المحفوظ بجانب ملف النسخة
+RESUME_SUFFIX = '.upload.json'
+
+# عدد محاولات رفع النسخة المتبقية، والامتداد الذي يضاف لها عند التوقف عن رفعها
+ATTEMPTS_SUFFIX = '.attempts'
+FAILED_SUFFIX = '.failed'
+
+# أخطاء الاتصال في httplib2 وbotocore (بدون استيراد المكتبتين هنا)
+TRANSIENT_ERRORS = (
+    'HttpLib2Error', 'ServerNotFoundError', 'EndpointConnectionError',
+    'ConnectionClosedError', 'ReadTimeoutError'
+)
+
+
+class UploadError(Exception):
+    """تعذر إعداد مكان حفظ النسخ الاحتياطية"""
+
+
+def _error_status(error):
+    """رمز حالة HTTP من أخطاء googleapiclient أو botocore إن وجد"""
+    resp = getattr(error, 'resp', None)  # googleapiclient HttpError
+    if resp is not None and getattr(resp, 'status', None):
+        return int(resp.status)
+    response = getattr(error, 'response', None)  # botocore ClientError
+    if isinstance(response, dict):
+        return response.get('ResponseMetadata', {}).get('HTTPStatusCode')
+    return None
+
+
+def _is_transient(error):
+    """الأخطاء المؤقتة التي تستحق إعادة المحاولة (الشبكة، 429، 5xx)"""
+    if isinstance(error, (ConnectionError, TimeoutError, socket.timeout, socket.gaierror)):
+        return True
+    status = _error_status(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return error.__class__.__name__ in TRANSIENT_ERRORS
+
+
+def with_retry(func, retries=DEFAULT_RETRIES, base_delay=1.0, max_delay=60.0):
+    """تنفيذ الدالة مع إعادة المحاولة للأخطاء المؤقتة (تأخير أسي عشوائي)"""
+    attempt = 0
+    while True:
+        try:
+            return func()
+        except Exception as e:
+            attempt += 1
+            if attempt > retries or not _is_transient(e):
+                raise
+            delay = min(max_delay, base_delay * 2 ** (attempt - 1)) * (0.5 + random.random() / 2)
+            print(f"تحذير: فشل رفع جزء من النسخة ({e})، إعادة المحاولة {attempt}/{retries} بعد {delay:.1f} ثانية")
+            time.sleep(delay)
+
+
+class ResumeToken:
+    """حالة رفع ملف محفوظة على القرص لاستكمال الرفع بعد انقطاع أو إعادة تشغيل
+
+    الحالة تبقى صالحة فقط لنفس الملف (نفس الحجم ووقت التعديل) ونفس مكان الحفظ.
+    enabled=False للملفات الصغيرة التي لا تحتاج استكمالاً (لا يكتب شيئاً على القرص).
+    """
+
+    def __init__(self, file_path, storage_name, enabled=True):
+        self.path = file_path + RESUME_SUFFIX
+        self.enabled = enabled
+        stat = os.stat(file_path)
+        self.identity = {'storage': storage_name, 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+        self.state = {}
+        if enabled and os.path.exists(self.path):
+            try:
+                with open(self.path, encoding='utf-8') as f:
+                    saved = json.load(f)
+                if all(saved.get(key) == value for key, value in self.identity.items()):
+                    self.state = saved.get('state', {})
+            except (OSError, ValueError) as e:
+                print(f"تحذير: تعذر قراءة حالة الرفع السابقة: {e}")
+
+    def save(self, **state):
+        self.state.update(state)
+        if not self.enabled:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump(dict(self.identity, state=self.state), f)
+        os.replace(temp_path, self.path)
+
+    def clear(self):
+        self.state = {}
+        if self.enabled and os.path.exists(self.path):
+            os.remove(self.path)
+
+
+class BackupStorage:
+    """واجهة مكان حفظ النسخ الاحتياطية
+
+    upload: رفع الملف ويعيد معرفه في مكان الحفظ (resume=False بدون حفظ حالة الرفع).
+    download: تحميل ملف محفوظ بمعرفه إلى مسار محلي.
+    list_backups: قائمة النسخ (id، name، created) من الأحدث للأقدم.
+    """
+
+    name = None
+
+    # هل يمكن الرفع من أكثر من خيط في نفس الوقت
+    thread_safe = True
+
+    def __init__(self, chunk_size=None, retries=None, retry_delay=1.0):
+        self.chunk_size = chunk_size or Config.BACKUP_UPLOAD_CHUNK_SIZE
+        self.retries = DEFAULT_RETRIES if retries is None else retries
+        self.retry_delay = retry_delay
+
+    def _retry(self, func):
+        return with_retry(func, self.retries, base_delay=self.retry_delay)
+
+    def upload(self, file_path, file_name, progress=None, resume=True):
+        raise NotImplementedError
+
+    def download(self, backup_id, target_path):
+        raise NotImplementedError
+
+    def list_backups(self, prefix='raizo_backup_'):
+        raise NotImplementedError
+
+    def delete(self, backup_id):
+        raise NotImplementedError
+
+    def cleanup(self, keep_count=10):
+        """حذف النسخ الزائدة عن keep_count (الاحتفاظ بالأحدث)"""
+        backups = self.list_backups()
+        for backup in backups[keep_count:]:
+            self.delete(backup['id'])
+            print(f"تم حذف النسخة القديمة: {backup['name']}")
+        return max(len(backups) - keep_count, 0)
+
+
+class LocalStorage(BackupStorage):
+    """حفظ النسخ في مجلد محلي أو مركب (للاختبارات والمواقع بدون إنترنت)"""
+
+    name = 'local'
+
+    def __init__(self, directory, **kwargs):
+        super().__init__(**kwargs)
+        self.directory = directory
+
+    def upload(self, file_path, file_name, progress=None, resume=True):
+        os.makedirs(self.directory, exist_ok=True)
+        target = os.path.join(self.directory, file_name)
+        partial = target + '.part'
+        total = os.path.getsize(file_path)
+
+        # الاستكمال من حجم الملف الجزئي الموجود
+        offset = os.path.getsize(partial) if resume and os.path.exists(partial) else 0
+        if offset > total:
+            offset = 0
+        with open(file_path, 'rb') as source, open(partial, 'ab' if offset else 'wb') as output:
+            source.seek(offset)
+            while True:
+                chunk = source.read(self.chunk_size)
+                if not chunk:
+                    break
+                output.write(chunk)
+                output.flush()
+                offset += len(chunk)
+                if progress:
+                    progress(offset, total)
+        os.replace(partial, target)
+        return file_name
+
+    def list_backups(self, prefix='raizo_backup_'):
+        if not os.path.isdir(self.directory):
+            return []
+        backups = []
+        for name in os.listdir(self.directory):
+            if name.startswith(prefix) and not name.endswith('.part'):
+                modified = os.path.getmtime(os.path.join(self.directory, name))
+                backups.append({'id': name, 'name': name, 'created': datetime.fromtimestamp(modified)})
+        return sorted(backups, key=lambda b: b['created'], reverse=True)
+
+    def download(self, backup_id, target_path):
+        shutil.copyfile(os.path.join(self.directory, backup_id), target_path)
+
+    def delete(self, backup_id):
+        os.remove(os.path.join(self.directory, backup_id))
+
+
+class S3Storage(BackupStorage):
+    """حفظ النسخ في S3 أو خدمة متوافقة (MinIO...) عبر الرفع متعدد الأجزاء"""
+
+    name = 's3'
+
+    def __init__(self, bucket, prefix='', endpoint_url=None, client=None, **kwargs):
+        super().__init__(**kwargs)
+        if client is None:
+            if boto3 is None:
+                raise UploadError('مكتبة boto3 غير مثبتة')
+            client = boto3.client('s3', endpoint_url=endpoint_url)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def upload(self, file_path, file_name, progress=None, resume=True):
+        key = self.prefix + file_name
+        total = os.path.getsize(file_path)
+
+        if total <= self.chunk_size:
+            # الملفات الصغيرة ترفع في طلب واحد
+            with open(file_path, 'rb') as source:
+                data = source.read()
+            self._retry(lambda: self.client.put_object(Bucket=self.bucket, Key=key, Body=data))
+            if progress:
+                progress(total, total)
+            return key
+
+        token = ResumeToken(file_path, f'{self.name}:{self.bucket}/{key}:{self.chunk_size}', enabled=resume)
+
+        upload_id = token.state.get('upload_id')
+        parts = token.state.get('parts', [])
+        if not upload_id:
+            upload_id = self._retry(
+                lambda: self.client.create_multipart_upload(Bucket=self.bucket, Key=key)['UploadId']
+            )
+            parts = []
+            token.save(upload_id=upload_id, parts=parts)
+
+        offset = len(parts) * self.chunk_size
+        with open(file_path, 'rb') as source:
+            while offset < total or not parts:
+                source.seek(offset)
+                chunk = source.read(self.chunk_size)
+                part_number = len(parts) + 1
+                response = self._retry(lambda: self.client.upload_part(
+                    Bucket=self.bucket, Key=key, UploadId=upload_id,
+                    PartNumber=part_number, Body=chunk
+                ))
+                parts.append({'PartNumber': part_number, 'ETag': response['ETag']})
+                token.save(parts=parts)
+                offset += len(chunk)
+                if progress:
+                    progress(min(offset, total), total)
+
+        self._retry(lambda: self.client.complete_multipart_upload(
+            Bucket=self.bucket, Key=key, UploadId=upload_id, MultipartUpload={'Parts': parts}
+        ))
+        token.clear()
+        return key
+
+    def list_backups(self, prefix='raizo_backup_'):
+        backups = []
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket, Prefix=self.prefix + prefix):
+            for item in page.get('Contents', []):
+                backups.append({
+                    'id': item['Key'],
+                    'name': item['Key'][len(self.prefix):],
+                    'created': item['LastModified']
+                })
+        return sorted(backups, key=lambda b: b['created'], reverse=True)
+
+    def download(self, backup_id, target_path):
+        self._retry(lambda: self.client.download_file(self.bucket, backup_id, target_path))
+
+    def delete(self, backup_id):
+        self.client.delete_object(Bucket=self.bucket, Key=backup_id)
+
+
+class GoogleDriveStorage(BackupStorage):
+    """حفظ النسخ في مجلد Google Drive عبر جلسات الرفع القابلة للاستكمال"""
+
+    name = 'google_drive'
+
+    def __init__(self, service, folder_id, credentials=None, **kwargs):
+        super().__init__(**kwargs)
+        self.service = service
+        self.folder_id = folder_id
+        self.credentials = credentials
+        # httplib2 لا يدعم الخيوط، لذلك يلزم اتصال مستقل لكل خيط (يتطلب بيانات الاعتماد)
+        self.thread_safe = credentials is not None
+        self._local = threading.local()
+
+    def _http(self):
+        """اتصال HTTP خاص بالخيط الحالي (أو اتصال الخدمة الافتراضي)"""
+        if self.credentials is None:
+            return None
+        if not hasattr(self._local, 'http'):
+            import httplib2
+            from google_auth_httplib2 import AuthorizedHttp
+            self._local.http = AuthorizedHttp(self.credentials, http=httplib2.Http())
+        return self._local.http
+
+    def upload(self, file_path, file_name, progress=None, resume=True):
+        from googleapiclient.http import MediaFileUpload
+
+        total = os.path.getsize(file_path)
+        token = ResumeToken(file_path, f'{self.name}:{self.folder_id}', enabled=resume)
+
+        # القراءة من القرص جزءاً بجزء بدلاً من تحميل الملف كاملاً في الذاكرة
+        media = MediaFileUpload(
+            file_path, mimetype='application/octet-stream',
+            chunksize=self.chunk_size, resumable=True
+        )
+        request = self.service.files().create(
+            body={'name': file_name, 'parents': [self.folder_id]},
+            media_body=media,
+            fields='id'
+        )
+        resumed = bool(token.state.get('session'))
+        if resumed:
+            # استكمال جلسة رفع سابقة من آخر جزء أكده الخادم
+            request.resumable_uri = token.state['session']
+            request.resumable_progress = token.state.get('offset', 0)
+
+        response = None
+        while response is None:
+            try:
+                status, response = self._retry(lambda: request.next_chunk(http=self._http()))
+            except Exception as e:
+                if resumed and _error_status(e) in (404, 410):
+                    # انتهت صلاحية الجلسة السابقة، يبدأ الرفع من جديد
+                    token.clear()
+                    return self.upload(file_path, file_name, progress, resume)
+                raise
+            if response is None:
+                token.save(session=request.resumable_uri, offset=request.resumable_progress)
+                if progress:
+                    progress(request.resumable_progress, total)
+
+        token.clear()
+        if progress:
+            progress(total, total)
+        return response.get('id')
+
+    def list_backups(self, prefix='raizo_backup_'):
+        backups = []
+        page_token = None
+        while True:
+            results = self.service.files().list(
+                q=f"'{self.folder_id}' in parents and name contains '{prefix}' and trashed = false",
+                orderBy='createdTime desc',
+                fields='nextPageToken, files(id, name, createdTime)',
+                pageSize=1000,
+                pageToken=page_token
+            ).execute(http=self._http())
+            backups.extend(
+                {'id': f['id'], 'name': f['name'], 'created': f.get('createdTime')}
+                for f in results.get('files', [])
+                # "contains" في Drive تطابق أجزاء الكلمات، لذلك يتم التحقق من البادئة هنا
+                if f['name'].startswith(prefix)
+            )
+            page_token = results.get('nextPageToken')
+            if not page_token:
+                return backups
+
+    def download(self, backup_id, target_path):
+        from googleapiclient.http import MediaIoBaseDownload
+
+        request = self.service.files().get_media(fileId=backup_id)
+        if self.credentials is not None:
+            request.http = self._http()
+        with open(target_path, 'wb') as output:
+            downloader = MediaIoBaseDownload(output, request, chunksize=self.chunk_size)
+            done = False
+            while not done:
+                status, done = self._retry(downloader.next_chunk)
+
+    def delete(self, backup_id):
+        self.service.files().delete(fileId=backup_id).execute(http=self._http())
+
+
+def get_backup_storage():
+    """مكان الحفظ المحدد في الإعدادات (BACKUP_STORAGE)"""
+    storage = Config.BACKUP_STORAGE
+    if storage == 'local':
+        return LocalStorage(Config.BACKUP_LOCAL_FOLDER)
+    if storage == 's3':
+        return S3Storage(
+            Config.BACKUP_S3_BUCKET,
+            prefix=Config.BACKUP_S3_PREFIX,
+            endpoint_url=Config.BACKUP_S3_ENDPOINT_URL
+        )
+    from google_drive_backup import get_backup_manager
+    return get_backup_manager().storage()
+
+
+def pending_uploads(backup_dir, prefix='raizo_backup_'):
+    """ملفات نسخ محلية لم يكتمل رفعها (الملف المحلي يحذف فقط بعد نجاح الرفع)"""
+    if not os.path.isdir(backup_dir):
+        return []
+    return sorted(
+        os.path.join(backup_dir, name) for name in os.listdir(backup_dir)
+        if name.startswith(prefix) and not name.endswith((RESUME_SUFFIX, ATTEMPTS_SUFFIX, FAILED_SUFFIX, '.tmp'))
+    )
@@ -0,0 +1,129 @@
+"""مقارنة توليد الأرقام الوظيفية: المحاولات العشوائية (الطريقة القديمة) مقابل العداد
+
+يملأ قاعدة SQLite مؤقتة بنسب مختلفة من الأرقام الوظيفية (6 أرقام) موزعة عشوائياً
+كما في البيانات القديمة، بنفس الأرقام لكل الطرق، ثم يقيس لكل نسبة متوسط زمن الرقم
+الواحد وعدد الاستعلامات له:
+    random  : رقم عشوائي واستعلام تحقق لكل محاولة (Employee.generate_employee_id القديمة)
+    counter : رقم واحد من العداد (إضافة موظف)
+    block   : أرقام دفعة استيراد كاملة من العداد (allocate_employee_ids)
+
+الاستخدام:
+    python benchmark_employee_ids.py [--fill 0.1 0.5 0.9] [--count 200] [--block 500] [--seed 1]
+"""
+import argparse
+import os
+import random
+import shutil
+import string
+import tempfile
+import time
+
+from flask import Flask
+from sqlalchemy import Date, Float, event
+
+from employee_ids import COUNTER_NAME, allocate_employee_ids, free_ratio, initial_position, next_employee_id
+from models import db, Employee, IdCounter
+
+
+def _legacy_generate_employee_id():
+    """الطريقة القديمة: محاولات عشوائية حتى إيجاد رقم غير مستخدم"""
+    while True:
+        employee_id = ''.join(random.choices(string.digits, k=6))
+        if not Employee.query.filter_by(employee_id=employee_id).first():
+            return employee_id
+
+
+def _seed(employee_ids):
+    """إدراج موظفين بالأرقام المحددة (الأعمدة الإلزامية فقط بقيم ثابتة)"""
+    columns = [c for c in Employee.__table__.columns
+               if not c.nullable and c.default is None and not c.primary_key]
+    names = [c.name for c in columns]
+
+    def constant(column):
+        if isinstance(column.type, Date):
+            return '2020-01-01'
+        if isinstance(column.type, Float):
+            return 0
+        return '-'
+
+    values = [constant(c) for c in columns]
+    id_index, national_index = names.index('employee_id'), names.index('national_id')
+    rows = []
+    for employee_id in employee_ids:
+        row = list(values)
+        row[id_index] = row[national_index] = employee_id
+        rows.append(row)
+
+    connection = db.engine.raw_connection()
+    try:
+        connection.execute('PRAGMA synchronous=OFF')
+        connection.executemany(
+            f'INSERT INTO employee ({", ".join(names)}) VALUES ({", ".join("?" * len(names))})', rows
+        )
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def _measure(function, runs):
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    started = time.perf_counter()
+    try:
+        produced = 0
+        for _ in range(runs):
+            produced += len(function())
+            db.session.commit()
+    finally:
+        elapsed = time.perf_counter() - started
+        event.remove(db.engine, 'before_cursor_execute', count)
+    return elapsed * 1000 / produced, len(statements) / produced
+
+
+def run(mode, fill, count, block, seed):
+    directory = tempfile.mkdtemp()
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{os.path.join(directory, "benchmark.db")}'
+    db.init_app(app)
+    try:
+        with app.app_context():
+            db.metadata.create_all(db.engine, tables=[Employee.__table__, IdCounter.__table__])
+            # نفس الأرقام القديمة لكل الطرق، موزعة عشوائياً على كل المجال (000000 - 999999)
+            _seed(f'{n:06d}' for n in random.Random(seed).sample(range(10 ** 6), int(10 ** 6 * fill)))
+            free_ratio.reset()
+            if mode == 'random':
+                return _measure(lambda: [_legacy_generate_employee_id()], count)
+            # إنشاء العداد (البحث عن أكبر فجوة) يحدث مرة واحدة فقط، لذلك لا يدخل في القياس
+            db.session.add(IdCounter(name=COUNTER_NAME, value=initial_position(db.session)))
+            db.session.commit()
+            if mode == 'counter':
+                return _measure(lambda: [next_employee_id()], count)
+            return _measure(lambda: allocate_employee_ids(block), max(1, count // 20))
+    finally:
+        with app.app_context():
+            db.engine.dispose()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='مقارنة توليد الأرقام الوظيفية')
+    parser.add_argument('--fill', type=float, nargs='+', default=[0.1, 0.5, 0.9],
+                        help='نسب امتلاء الأرقام الوظيفية')
+    parser.add_argument('--count', type=int, default=200, help='عدد الأرقام المطلوبة في كل قياس')
+    parser.add_argument('--block', type=int, default=500, help='حجم دفعة الاستيراد')
+    parser.add_argument('--seed', type=int, default=1, help='بذرة توزيع الأرقام القديمة')
+    args = parser.parse_args()
+
+    print(f"{'الامتلاء':<10}{'الطريقة':<10}{'ms/رقم':>10}{'استعلام/رقم':>14}")
+    for fill in args.fill:
+        for mode in ('random', 'counter', 'block'):
+            ms, queries = run(mode, fill, args.count, args.block, args.seed)
+            print(f"{fill:<10.0%}{mode:<10}{ms:>10.3f}{queries:>14.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+"""مقارنة أداء SQLite بالإعدادات الافتراضية وبإعدادات WAL (Config.SQLITE_PRAGMAS)
+
+يشغل عدة عمليات كتابة (حفظ حضور) وعدة عمليات قراءة (تقارير الحضور) في نفس
+الوقت على قاعدة مؤقتة، كما يحدث مع عدة عمال gunicorn، ثم يعرض عدد العمليات
+في الثانية وأخطاء database is locked لكل وضع.
+
+الاستخدام:
+    python benchmark_sqlite.py [--writers 4] [--readers 4] [--seconds 10]
+"""
+import argparse
+import multiprocessing
+import os
+import random
+import shutil
+import tempfile
+import time
+from datetime import date, timedelta
+
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.exc import OperationalError
+
+from config import Config
+from db_engine import configure_engine
+from models import Attendance
+
+EMPLOYEES = 200
+DAYS = 60
+ROWS_PER_SAVE = 20  # عدد الموظفين في كل حفظ حضور
+START_DATE = date(2026, 1, 1)
+STATUSES = ['present', 'absent', 'late', 'leave']
+
+
+def _engine(path, tuned):
+    # timeout=5 هو الافتراضي في sqlite3 ويطبق على الوضعين
+    engine = create_engine(f'sqlite:///{path}', connect_args={'timeout': 5})
+    if tuned:
+        configure_engine(engine, Config.SQLITE_PRAGMAS)
+    return engine
+
+
+def _seed(path, tuned):
+    engine = _engine(path, tuned)
+    Attendance.__table__.create(engine)
+    rows = [
+        {'employee_id': employee_id, 'date': START_DATE + timedelta(days=day),
+         'status': random.choice(STATUSES)}
+        for employee_id in range(1, EMPLOYEES + 1)
+        for day in range(DAYS)
+    ]
+    with engine.begin() as connection:
+        connection.execute(insert(Attendance.__table__), rows)
+    engine.dispose()
+
+
+def _save_attendance(connection):
+    day = START_DATE + timedelta(days=random.randrange(DAYS))
+    rows = [
+        {'employee_id': employee_id, 'date': day, 'status': random.choice(STATUSES)}
+        for employee_id in random.sample(range(1, EMPLOYEES + 1), ROWS_PER_SAVE)
+    ]
+    stmt = insert(Attendance.__table__).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['employee_id', 'date'], set_={'status': stmt.excluded.status}
+    )
+    connection.execute(stmt)
+
+
+def _attendance_report(connection):
+    day = START_DATE + timedelta(days=random.randrange(DAYS - 7))
+    attendance = Attendance.__table__
+    connection.execute(
+        select(attendance.c.status, func.count())
+        .where(attendance.c.date.between(day, day + timedelta(days=7)))
+        .group_by(attendance.c.status)
+    ).all()
+
+
+def _worker(path, tuned, role, seconds):
+    engine = _engine(path, tuned)
+    deadline = time.monotonic() + seconds
+    operations, errors, latencies = 0, 0, []
+    while time.monotonic() < deadline:
+        started = time.monotonic()
+        try:
+            if role == 'write':
+                with engine.begin() as connection:
+                    _save_attendance(connection)
+            else:
+                with engine.connect() as connection:
+                    _attendance_report(connection)
+            operations += 1
+            latencies.append(time.monotonic() - started)
+        except OperationalError as e:
+            if 'locked' not in str(e):
+                raise
+            errors += 1
+    engine.dispose()
+    return role, operations, errors, latencies
+
+
+def _percentile(values, percent):
+    if not values:
+        return 0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * percent / 100))]
+
+
+def run(tuned, writers, readers, seconds):
+    directory = tempfile.mkdtemp()
+    path = os.path.join(directory, 'benchmark.db')
+    try:
+        _seed(path, tuned)
+        roles = ['write'] * writers + ['read'] * readers
+        with multiprocessing.Pool(len(roles)) as pool:
+            results = pool.starmap(_worker, [(path, tuned, role, seconds) for role in roles])
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+    summary = {}
+    for role in ('write', 'read'):
+        role_results = [r for r in results if r[0] == role]
+        latencies = [latency for r in role_results for latency in r[3]]
+        summary[role] = {
+            'per_second': sum(r[1] for r in role_results) / seconds,
+            'errors': sum(r[2] for r in role_results),
+            'p95_ms': _percentile(latencies, 95) * 1000
+        }
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='مقارنة أداء SQLite قبل وبعد إعدادات WAL')
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--seconds', type=float, default=10)
+    args = parser.parse_args()
+
+    print(f"{args.writers} عمليات كتابة و {args.readers} عمليات قراءة لمدة {args.seconds} ثانية")
+    print(f"{'الوضع':<10}{'كتابة/ث':>10}{'p95 كتابة':>12}{'قراءة/ث':>10}{'p95 قراءة':>12}{'locked':>8}")
+    for name, tuned in (('default', False), ('wal', True)):
+        result = run(tuned, args.writers, args.readers, args.seconds)
+        write, read = result['write'], result['read']
+        print(f"{name:<10}{write['per_second']:>10.1f}{write['p95_ms']:>10.1f}ms"
+              f"{read['per_second']:>10.1f}{read['p95_ms']:>10.1f}ms"
+              f"{write['errors'] + read['errors']:>8}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+import os
+import shutil
+import tempfile
+from datetime import date
+from uuid import uuid4
+
+import pytest
+
+# قبل استيراد التطبيق: الإعدادات وإنشاء الجداول يحدثان عند الاستيراد،
+# لذلك تعمل كل الاختبارات على قاعدة مؤقتة ولا تلمس instance/raizo_hr.db
+TEST_FOLDER = tempfile.mkdtemp(prefix='raizo-tests-')
+os.environ['APP_ENV'] = 'testing'
+os.environ['RAIZO_TEST_FOLDER'] = TEST_FOLDER
+
+
+@pytest.fixture(scope='session', autouse=True)
+def test_folder():
+    # استيراد التطبيق أولاً: اختبارات النسخة المقروءة تضيف bind باسم replica لـ db،
+    # وإنشاء الجداول عند استيراد التطبيق بعدها يفشل لعدم وجوده في إعداداته
+    from app import app, db
+    yield TEST_FOLDER
+    with app.app_context():
+        db.engine.dispose()
+    shutil.rmtree(TEST_FOLDER, ignore_errors=True)
+
+
+@pytest.fixture
+def make_user():
+    """إنشاء مستخدم بكلمة مرور عشوائية، ويعيد (المستخدم، كلمة المرور)"""
+    from app import app, db
+    from models import User
+
+    def create(role='admin'):
+        username = f'test_{role}_{uuid4().hex[:8]}'
+        password = uuid4().hex
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com', role=role)
+            user.set_password(password)
+            db.session.add(user)
+            db.session.commit()
+            db.session.refresh(user)
+            db.session.expunge(user)
+        return user, password
+
+    return create
+
+
+@pytest.fixture
+def client(make_user):
+    """عميل مسجل الدخول بمستخدم مدير خاص بالاختبار"""
+    from app import app
+
+    user, password = make_user('admin')
+    client = app.test_client()
+    client.post('/login', data={'username': user.username, 'password': password},
+                base_url='https://localhost')
+    return client
+
+
+@pytest.fixture
+def make_employee():
+    """إنشاء موظف بكل الحقول الإلزامية (داخل سياق التطبيق والجلسة الحالية)"""
+    from app import db
+    from models import Employee
+
+    def create(employee_id=None, **values):
+        number = employee_id or uuid4().hex[:10]
+        fields = dict(
+            employee_id=number, name_arabic=f'موظف اختبار {number}',
+            national_id=number, id_validity='سارية', id_expiry_date=date(2030, 1, 1),
+            birth_date=date(1990, 1, 1), nationality='سعودي', gender='ذكر',
+            phone='0500000000', salary=3000, contract_signing_date=date(2024, 1, 1),
+            contract_end_date=date(2030, 1, 1), contract_duration='سنة',
+            job_title='حارس', contract_type='دائم', uniform_provision='نعم',
+            operating_company='رايزو', internet_provision='لا', department='الأمن',
+            work_shift='صباحية', employee_type='الحراسات الأمنية', hire_date=date(2024, 1, 1)
+        )
+        fields.update(values)
+        employee = Employee(**fields)
+        db.session.add(employee)
+        db.session.flush()
+        return employee
+
+    return create
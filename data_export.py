@@ -0,0 +1,140 @@
+import csv
+import io
+import zipfile
+
+from openpyxl import Workbook
+from sqlalchemy import func, select
+
+from models import db, Employee, Attendance, Payroll
+
+# عدد الصفوف المقروءة من قاعدة البيانات في كل دفعة
+BATCH_SIZE = 5000
+
+# أقصى عدد صفوف في ورقة Excel (مع صف العناوين)
+XLSX_MAX_ROWS = 1048576
+
+EXPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'zip': ('application/zip', 'zip'),
+}
+
+
+def _sheets():
+    """أوراق التصدير الشامل: (اسم الورقة، اسم ملف CSV، الجدول، العناوين، الاستعلام)
+
+    العمود الأول في كل استعلام هو المفتاح الأساسي للجدول ويستخدم للتقسيم إلى دفعات
+    ولا يتم تصديره. الحضور والرواتب مربوطة بالموظف في نفس الاستعلام (بدون N+1).
+    """
+    return [
+        ('الموظفين', 'employees.csv', Employee,
+         ['ID', 'الاسم', 'الهاتف', 'القسم', 'الراتب'],
+         select(Employee.id, Employee.id, Employee.name_arabic, Employee.phone,
+                Employee.department, Employee.salary)),
+        ('الحضور', 'attendance.csv', Attendance,
+         ['الموظف', 'التاريخ', 'الحالة', 'دخول', 'خروج'],
+         select(Attendance.id, Employee.name_arabic, Attendance.date, Attendance.status,
+                Attendance.check_in, Attendance.check_out)
+         .outerjoin(Employee, Attendance.employee_id == Employee.id)),
+        ('الرواتب', 'payroll.csv', Payroll,
+         ['الموظف', 'الشهر', 'السنة', 'الراتب الإجمالي'],
+         select(Payroll.id, Employee.name_arabic, Payroll.month, Payroll.year,
+                Payroll.total_salary)
+         .outerjoin(Employee, Payroll.employee_id == Employee.id)),
+    ]
+
+
+def _iter_batches(stmt, model, batch_size=BATCH_SIZE):
+    """قراءة نتائج الاستعلام على دفعات حسب المفتاح الأساسي (id > آخر رقم)"""
+    last_id = None
+    while True:
+        batch_stmt = stmt.order_by(model.id).limit(batch_size)
+        if last_id is not None:
+            batch_stmt = batch_stmt.where(model.id > last_id)
+        rows = db.session.execute(batch_stmt).all()
+        if not rows:
+            return
+        last_id = rows[-1][0]
+        yield [tuple(row[1:]) for row in rows]
+        if len(rows) < batch_size:
+            return
+
+
+class _SheetWriter:
+    """كتابة صفوف ورقة Excel مع الانتقال لورقة جديدة (الحضور_2، الحضور_3...) عند بلوغ حد الصفوف"""
+
+    def __init__(self, workbook, name, headers):
+        self.workbook = workbook
+        self.name = name
+        self.headers = headers
+        self.part = 0
+        self._new_sheet()
+
+    def _new_sheet(self):
+        self.part += 1
+        self.sheet = self.workbook.create_sheet(self.name if self.part == 1 else f'{self.name}_{self.part}')
+        self.sheet.append(self.headers)
+        self.rows = 1
+
+    def append(self, row):
+        if self.rows >= XLSX_MAX_ROWS:
+            self._new_sheet()
+        self.sheet.append(row)
+        self.rows += 1
+
+
+def _csv_value(value):
+    return '' if value is None else value
+
+
+def export_all_data_file(path, export_format='xlsx', progress=None):
+    """تصدير الموظفين والحضور والرواتب إلى ملف واحد في مرور واحد
+
+    xlsx: ملف Excel بعدة أوراق (وضع الكتابة فقط)، والجدول الذي يتجاوز حد صفوف Excel
+    يقسم على عدة أوراق. zip: ملف CSV لكل جدول (بدون حد للصفوف).
+    progress: دالة اختيارية تستدعى بعد كل دفعة بـ (الصفوف المصدرة، إجمالي الصفوف).
+    يعيد قاموساً بعدد الصفوف المصدرة لكل ورقة.
+    """
+    sheets = _sheets()
+    total = sum(db.session.scalar(select(func.count()).select_from(model)) or 0
+                for _, _, model, _, _ in sheets)
+    done = 0
+    counts = {}
+
+    if export_format == 'zip':
+        archive = zipfile.ZipFile(path, 'w', compression=zipfile.ZIP_DEFLATED)
+    else:
+        archive = None
+        workbook = Workbook(write_only=True)
+
+    try:
+        for sheet_name, csv_name, model, headers, stmt in sheets:
+            counts[sheet_name] = 0
+            if archive is not None:
+                entry = archive.open(csv_name, 'w', force_zip64=True)
+                text = io.TextIOWrapper(entry, encoding='utf-8-sig', newline='')
+                writer = csv.writer(text)
+
+                def append(row, writer=writer):
+                    writer.writerow([_csv_value(v) for v in row])
+                append(headers)
+            else:
+                text = None
+                append = _SheetWriter(workbook, sheet_name, headers).append
+
+            for rows in _iter_batches(stmt, model):
+                for row in rows:
+                    append(row)
+                counts[sheet_name] += len(rows)
+                done += len(rows)
+                if progress:
+                    progress(done, total)
+
+            if text is not None:
+                text.close()
+    finally:
+        if archive is not None:
+            archive.close()
+
+    if archive is None:
+        workbook.save(path)
+    return counts
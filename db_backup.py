@@ -0,0 +1,285 @@
+import gzip
+import os
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from datetime import datetime
+
+from config import Config
+from models import db, BackupLog
+from backup_storage import ATTEMPTS_SUFFIX, FAILED_SUFFIX, pending_uploads
+
+try:
+    import zstandard
+except ImportError:  # zstd اختياري، gzip هو الافتراضي
+    zstandard = None
+
+# حجم الكتلة عند الضغط أو قراءة مخرجات pg_dump
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# عدد مرات إعادة نسخ SQLite من البداية (بسبب الكتابة أثناء النسخ) قبل النسخ في خطوة واحدة
+MAX_BACKUP_RESTARTS = 3
+
+# الانتظار قبل إعادة المحاولة إذا كانت القاعدة مقفلة بعملية كتابة (بالثواني)
+BUSY_RETRY_SLEEP = 0.05
+
+
+class BackupError(Exception):
+    """فشل إنشاء النسخة الاحتياطية أو التحقق منها"""
+
+
+class _BackupRestarted(Exception):
+    pass
+
+
+def _open_compressed(path, compression):
+    if compression == 'zstd':
+        return zstandard.ZstdCompressor(level=3).stream_writer(open(path, 'wb'), closefd=True)
+    return gzip.open(path, 'wb', compresslevel=6)
+
+
+def _compression(requested):
+    if requested == 'zstd' and zstandard is None:
+        print("تحذير: مكتبة zstandard غير مثبتة، سيتم استخدام gzip")
+        return 'gzip'
+    return requested if requested in ('gzip', 'zstd') else 'gzip'
+
+
+def _extension(compression):
+    return '.zst' if compression == 'zstd' else '.gz'
+
+
+def _sqlite_backup(database_path, target_path, pages_per_step, step_sleep):
+    """نسخ قاعدة SQLite أثناء عملها عبر واجهة backup
+
+    يتم النسخ على خطوات (pages_per_step صفحة في كل خطوة) مع توقف قصير بين
+    الخطوات حتى لا تنتظر عمليات الكتابة حتى انتهاء النسخ كاملاً.
+    إذا تغيرت القاعدة أثناء النسخ يعيد SQLite النسخ من البداية، لذلك بعد
+    MAX_BACKUP_RESTARTS إعادة يتم النسخ في خطوة واحدة.
+    """
+    state = {'remaining': None, 'restarts': 0}
+
+    def throttle(status, remaining, total):
+        if state['remaining'] is not None and remaining > state['remaining']:
+            state['restarts'] += 1
+            if state['restarts'] > MAX_BACKUP_RESTARTS:
+                raise _BackupRestarted()
+        state['remaining'] = remaining
+        if remaining and step_sleep:
+            time.sleep(step_sleep)
+
+    source = sqlite3.connect(f'file:{database_path}?mode=ro', uri=True)
+    target = sqlite3.connect(target_path)
+    try:
+        try:
+            source.backup(target, pages=pages_per_step, progress=throttle)
+        except _BackupRestarted:
+            print("تحذير: قاعدة البيانات تتغير باستمرار، سيتم النسخ في خطوة واحدة")
+            source.backup(target, sleep=BUSY_RETRY_SLEEP)
+        result = target.execute('PRAGMA integrity_check').fetchone()[0]
+        if result != 'ok':
+            raise BackupError(f'فشل التحقق من سلامة النسخة: {result}')
+    finally:
+        target.close()
+        source.close()
+
+
+def _postgres_dump(url, output):
+    """تشغيل pg_dump وكتابة مخرجاته تدريجياً في ملف مضغوط"""
+    if shutil.which('pg_dump') is None:
+        raise BackupError('أداة pg_dump غير مثبتة على الخادم')
+
+    env = dict(os.environ)
+    if url.password:
+        env['PGPASSWORD'] = url.password
+    command = ['pg_dump', '--no-owner', '--no-privileges', '--dbname', url.database]
+    if url.host:
+        command += ['--host', url.host]
+    if url.port:
+        command += ['--port', str(url.port)]
+    if url.username:
+        command += ['--username', url.username]
+
+    # stderr في ملف مؤقت وليس pipe: إذا امتلأ pipe الأخطاء (تحذيرات كثيرة) أثناء قراءة
+    # stdout تتوقف pg_dump عن الكتابة وتنتظر العمليتان بعضهما للأبد
+    with tempfile.TemporaryFile() as errors:
+        process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=errors, env=env)
+        try:
+            shutil.copyfileobj(process.stdout, output, COPY_BUFFER_SIZE)
+        except BaseException:
+            process.kill()
+            process.wait()
+            raise
+        finally:
+            process.stdout.close()
+        if process.wait() != 0:
+            errors.seek(0)
+            stderr = errors.read().decode('utf-8', errors='replace')
+            raise BackupError(f'فشل pg_dump: {stderr.strip()}')
+
+
+def create_database_dump(engine, backup_dir=None, compression=None,
+                         pages_per_step=None, step_sleep=None):
+    """إنشاء نسخة احتياطية مضغوطة ومتسقة من قاعدة البيانات دون إيقافها
+
+    SQLite: واجهة sqlite3 backup مع التحقق من السلامة ثم الضغط.
+    PostgreSQL: مخرجات pg_dump مضغوطة مباشرة أثناء القراءة.
+    يعيد قاموساً بمسار الملف واسمه وحجمه ومدة النسخ، ويرفع BackupError عند الفشل.
+    """
+    compression = _compression(compression or Config.BACKUP_COMPRESSION)
+    pages_per_step = pages_per_step or Config.BACKUP_PAGES_PER_STEP
+    step_sleep = Config.BACKUP_STEP_SLEEP if step_sleep is None else step_sleep
+    backup_dir = backup_dir or Config.BACKUP_FOLDER
+    url = engine.url
+    os.makedirs(backup_dir, exist_ok=True)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    started = time.monotonic()
+
+    if url.get_backend_name() == 'sqlite':
+        if not url.database or url.database == ':memory:':
+            raise BackupError('لا يمكن نسخ قاعدة بيانات في الذاكرة')
+        filename = f'raizo_backup_{timestamp}.db{_extension(compression)}'
+        path = os.path.join(backup_dir, filename)
+
+        fd, snapshot_path = tempfile.mkstemp(suffix='.db', dir=backup_dir)
+        os.close(fd)
+        try:
+            _sqlite_backup(url.database, snapshot_path, pages_per_step, step_sleep)
+            raw_size = os.path.getsize(snapshot_path)
+            # الضغط في ملف مؤقت حتى لا يبقى ملف ناقص باسم النسخة عند التوقف
+            with open(snapshot_path, 'rb') as source, _open_compressed(path + '.tmp', compression) as output:
+                shutil.copyfileobj(source, output, COPY_BUFFER_SIZE)
+            os.replace(path + '.tmp', path)
+        finally:
+            os.remove(snapshot_path)
+
+    elif url.get_backend_name() == 'postgresql':
+        filename = f'raizo_backup_{timestamp}.sql{_extension(compression)}'
+        path = os.path.join(backup_dir, filename)
+        try:
+            with _open_compressed(path + '.tmp', compression) as output:
+                _postgres_dump(url, output)
+            os.replace(path + '.tmp', path)
+        except Exception:
+            if os.path.exists(path + '.tmp'):
+                os.remove(path + '.tmp')
+            raise
+        raw_size = None
+
+    else:
+        raise BackupError(f'نوع قاعدة البيانات غير مدعوم للنسخ الاحتياطي: {url.get_backend_name()}')
+
+    report = {
+        'path': path,
+        'filename': filename,
+        'backend': url.get_backend_name(),
+        'compression': compression,
+        'raw_size': raw_size,
+        'size': os.path.getsize(path),
+        'duration': round(time.monotonic() - started, 3)
+    }
+    print(f"تم إنشاء نسخة احتياطية {filename}: {report['size']} بايت في {report['duration']} ثانية")
+    return report
+
+
+def record_backup(report, location=None, remote_id=None):
+    """حفظ حجم ومدة النسخة في سجل النسخ الاحتياطية لمتابعة نموها"""
+    log = BackupLog(
+        filename=report['filename'],
+        backend=report['backend'],
+        compression=report['compression'],
+        raw_size=report['raw_size'],
+        size=report['size'],
+        duration=report['duration'],
+        location=location,
+        remote_id=remote_id
+    )
+    db.session.add(log)
+    db.session.commit()
+    return log
+
+
+def _upload(storage, report, progress=None):
+    """رفع ملف النسخة ثم حذفه محلياً وتسجيله (يبقى الملف لاستكمال الرفع عند الفشل)"""
+    remote_id = storage.upload(report['path'], report['filename'], progress=progress)
+    os.remove(report['path'])
+    record_backup(report, location=storage.name, remote_id=remote_id)
+    return remote_id
+
+
+def _failed_attempt(path):
+    """زيادة عدد محاولات الرفع الفاشلة للملف ويعيد العدد الجديد"""
+    attempts_path = path + ATTEMPTS_SUFFIX
+    try:
+        with open(attempts_path, encoding='utf-8') as f:
+            attempts = int(f.read().strip() or 0) + 1
+    except (OSError, ValueError):
+        attempts = 1
+    with open(attempts_path, 'w', encoding='utf-8') as f:
+        f.write(str(attempts))
+    return attempts
+
+
+def retry_pending_uploads(storage, backup_dir, max_attempts=None):
+    """استكمال رفع النسخ السابقة التي لم يكتمل رفعها
+
+    فشل أي ملف لا يوقف باقي الملفات ولا النسخة الجديدة. بعد max_attempts
+    محاولة يعاد تسمية الملف بامتداد .failed ويبقى محلياً للتعامل معه يدوياً.
+    """
+    max_attempts = Config.BACKUP_MAX_UPLOAD_ATTEMPTS if max_attempts is None else max_attempts
+    uploaded = 0
+    for path in pending_uploads(backup_dir):
+        filename = os.path.basename(path)
+        print(f"استكمال رفع نسخة سابقة: {filename}")
+        try:
+            _upload(storage, {
+                'path': path,
+                'filename': filename,
+                'backend': None,
+                'compression': 'zstd' if path.endswith('.zst') else 'gzip',
+                'raw_size': None,
+                'size': os.path.getsize(path),
+                'duration': None
+            })
+        except Exception as e:
+            if not os.path.exists(path):
+                # الرفع اكتمل وفشل تسجيله فقط
+                print(f"خطأ في تسجيل النسخة {filename}: {e}")
+                continue
+            attempts = _failed_attempt(path)
+            print(f"خطأ في استكمال رفع {filename} (المحاولة {attempts} من {max_attempts}): {e}")
+            if attempts >= max_attempts:
+                os.replace(path, path + FAILED_SUFFIX)
+                os.remove(path + ATTEMPTS_SUFFIX)
+                print(f"تحذير: تم التوقف عن رفع {filename}، الملف محفوظ في {path + FAILED_SUFFIX}")
+            continue
+        uploaded += 1
+        if os.path.exists(path + ATTEMPTS_SUFFIX):
+            os.remove(path + ATTEMPTS_SUFFIX)
+    return uploaded
+
+
+def backup_database(storage, backup_dir=None, keep_count=None, progress=None):
+    """إنشاء نسخة احتياطية ورفعها إلى مكان الحفظ
+
+    يستكمل أولاً رفع أي نسخ سابقة لم يكتمل رفعها (بدون أن يمنع فشلها النسخة
+    الجديدة)، ثم يحذف النسخ الزائدة عن keep_count في مكان الحفظ. يعيد تقرير النسخة الجديدة.
+    progress: دالة اختيارية تستدعى أثناء الرفع بـ (البايتات المرفوعة، الحجم الكلي).
+    """
+    backup_dir = backup_dir or Config.BACKUP_FOLDER
+    keep_count = Config.BACKUP_KEEP_COUNT if keep_count is None else keep_count
+
+    retry_pending_uploads(storage, backup_dir)
+
+    report = create_database_dump(db.engine, backup_dir=backup_dir)
+    report['remote_id'] = _upload(storage, report, progress=progress)
+
+    if keep_count:
+        try:
+            storage.cleanup(keep_count)
+        except Exception as e:
+            print(f"خطأ في تنظيف النسخ القديمة: {e}")
+    return report
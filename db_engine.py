@@ -0,0 +1,104 @@
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import g
+from sqlalchemy import event, text
+
+from config import Config
+from models import db
+
+# ترتيب التطبيق مهم: busy_timeout أولاً حتى ينتظر تغيير journal_mode أي قفل قائم
+_PRAGMA_ORDER = ['busy_timeout', 'journal_mode', 'synchronous', 'cache_size', 'mmap_size', 'temp_store']
+
+
+def apply_sqlite_pragmas(dbapi_connection, pragmas):
+    """تطبيق إعدادات PRAGMA على اتصال sqlite3 مفتوح"""
+    names = [name for name in _PRAGMA_ORDER if name in pragmas]
+    names += [name for name in pragmas if name not in names]
+    cursor = dbapi_connection.cursor()
+    try:
+        for name in names:
+            cursor.execute(f'PRAGMA {name}={pragmas[name]}')
+    finally:
+        cursor.close()
+
+
+def configure_engine(engine, pragmas=None):
+    """تسجيل مستمع يطبق إعدادات SQLite على كل اتصال جديد (لا يفعل شيئاً لغير SQLite)"""
+    if engine.url.get_backend_name() != 'sqlite':
+        return False
+    pragmas = Config.SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        apply_sqlite_pragmas(dbapi_connection, pragmas)
+
+    return True
+
+
+def init_db_engine(app):
+    """تهيئة محرك قاعدة البيانات (يستدعى بعد db.init_app وقبل أول اتصال)"""
+    with app.app_context():
+        configure_engine(db.engine, app.config.get('SQLITE_PRAGMAS', Config.SQLITE_PRAGMAS))
+
+
+def sqlite_maintenance(engine=None):
+    """دمج ملف WAL في قاعدة البيانات وتحديث إحصائيات الاستعلامات
+
+    بدون checkpoint دوري قد يكبر ملف -wal كثيراً عند وجود قراءة مستمرة.
+    يعيد قاموساً بنتيجة checkpoint (عدد الصفحات في WAL والمنقولة منها).
+    """
+    engine = engine or db.engine
+    if engine.url.get_backend_name() != 'sqlite':
+        return None
+    with engine.connect() as connection:
+        busy, log_pages, checkpointed = connection.execute(text('PRAGMA wal_checkpoint(TRUNCATE)')).one()
+        connection.execute(text('PRAGMA optimize'))
+        connection.commit()
+    return {'busy': bool(busy), 'wal_pages': log_pages, 'checkpointed': checkpointed}
+
+
+@contextmanager
+def use_replica():
+    """توجيه القراءة داخل هذا الجزء إلى النسخة المقروءة (للمهام الخلفية الطويلة مثل التصدير)"""
+    previous = g.get('use_replica', False)
+    g.use_replica = True
+    try:
+        yield
+    finally:
+        g.use_replica = previous
+
+
+@contextmanager
+def use_primary():
+    """القراءة من القاعدة الرئيسية داخل هذا الجزء حتى لو كان الطلب موجهاً للنسخة المقروءة
+
+    لقراءة سطر تمت كتابته للتو (قد لا يكون وصل للنسخة المقروءة بعد).
+    """
+    previous = g.get('use_replica', False)
+    g.use_replica = False
+    try:
+        yield
+    finally:
+        g.use_replica = previous
+
+
+def replica_stream(iterable):
+    """توجيه قراءات استجابة متدفقة فقط للنسخة المقروءة (تستخدم مع stream_with_context)"""
+    with use_replica():
+        yield from iterable
+
+
+def read_replica(view):
+    """تعليم عرض للقراءة فقط (تقارير، تصدير، قوائم) ليقرأ من النسخة المقروءة
+
+    لا يستخدم مع العروض التي تكتب: القراءة بعد commit ستذهب للنسخة المقروءة.
+
+    يبقى التوجيه لباقي الطلب حتى تقرأ الاستجابات المتدفقة (stream_with_context)
+    من نفس القاعدة. لا يؤثر إذا لم تكن replica معرفة في SQLALCHEMY_BINDS.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.use_replica = True
+        return view(*args, **kwargs)
+    return wrapper
@@ -0,0 +1,212 @@
+import csv
+import io
+import zlib
+from datetime import datetime
+
+from openpyxl import Workbook
+from sqlalchemy.orm import load_only
+
+from models import Employee
+from search_index import apply_search
+
+# عدد الصفوف المقروءة من قاعدة البيانات في كل دفعة
+BATCH_SIZE = 1000
+
+# حجم الكتلة المرسلة للمتصفح عند تصدير CSV
+STREAM_BUFFER_SIZE = 64 * 1024
+
+# معاملات البحث المدعومة (نفس أسماء حقول نموذج البحث في قائمة الموظفين)
+EMPLOYEE_FILTERS = (
+    'search_name', 'search_national_id', 'search_employee_id', 'search_department',
+    'search_job_title', 'search_phone', 'search_email', 'date_from', 'date_to',
+    'search_gender', 'search_nationality', 'search_contract_type', 'search_employee_type'
+)
+
+
+def _format_date(value):
+    return value.strftime('%Y-%m-%d') if value else ''
+
+
+# عنوان العمود -> (حقل الموظف، دالة التنسيق)
+EXPORT_COLUMNS = [
+    ('رقم الموظف', 'id', None),
+    ('الاسم بالعربية', 'name_arabic', None),
+    ('الاسم بالإنجليزية', 'name_english', None),
+    ('رقم الهوية', 'national_id', None),
+    ('تاريخ الميلاد', 'birth_date', _format_date),
+    ('الجنسية', 'nationality', None),
+    ('الجنس', 'gender', None),
+    ('رقم الهاتف', 'phone', None),
+    ('البريد الإلكتروني', 'email', None),
+    ('العنوان', 'address', None),
+    ('المسمى الوظيفي', 'job_title', None),
+    ('القسم', 'department', None),
+    ('المركز', 'center', None),
+    ('الراتب الأساسي', 'salary', None),
+    ('تاريخ بداية العقد', 'contract_signing_date', _format_date),
+    ('تاريخ انتهاء العقد', 'contract_end_date', _format_date),
+    ('نوع العقد', 'contract_type', None),
+    ('نوع الموظف', 'employee_type', None),
+    ('نوع البنك', 'bank_type', None),
+    ('رقم الآيبان', 'iban_number', None),
+]
+
+
+
+def export_columns(fields=None):
+    """أعمدة التصدير المسموحة (fields: أسماء حقول الموظف المسموحة، None للكل)"""
+    if fields is None:
+        return EXPORT_COLUMNS
+    return [column for column in EXPORT_COLUMNS if column[1] in fields]
+
+
+EXPORT_FORMATS = {
+    'xlsx': ('application/vnd.openxmlformats-officedocument.spreadsheetml.sheet', 'xlsx'),
+    'csv': ('text/csv; charset=utf-8', 'csv'),
+    'csv.gz': ('application/gzip', 'csv.gz'),
+}
+
+
+def _parse_date(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def filter_employees(query, filters):
+    """تطبيق فلاتر البحث المتقدم على استعلام الموظفين
+
+    filters: قاموس (أو request.args) بأسماء حقول نموذج البحث.
+    """
+    def value(name):
+        return (filters.get(name) or '').strip()
+
+    # البحث بالاسم ورقم الهوية والجوال عبر فهرس البحث
+    query = apply_search(
+        query,
+        name=value('search_name'),
+        national_id=value('search_national_id'),
+        phone=value('search_phone'),
+        ranked=False
+    )
+
+    if value('search_employee_id'):
+        query = query.filter(Employee.id == value('search_employee_id'))
+
+    if value('search_department'):
+        query = query.filter(Employee.department.contains(value('search_department')))
+
+    if value('search_job_title'):
+        query = query.filter(Employee.job_title.contains(value('search_job_title')))
+
+    if value('search_email'):
+        query = query.filter(Employee.email.contains(value('search_email')))
+
+    if value('search_gender'):
+        query = query.filter(Employee.gender == value('search_gender'))
+
+    if value('search_nationality'):
+        query = query.filter(Employee.nationality.contains(value('search_nationality')))
+
+    if value('search_contract_type'):
+        query = query.filter(Employee.contract_type == value('search_contract_type'))
+
+    if value('search_employee_type'):
+        query = query.filter(Employee.employee_type == value('search_employee_type'))
+
+    # فلترة التاريخ (يتم تجاهل التواريخ غير الصالحة)
+    date_from = _parse_date(value('date_from'))
+    if date_from:
+        query = query.filter(Employee.contract_signing_date >= date_from)
+
+    date_to = _parse_date(value('date_to'))
+    if date_to:
+        query = query.filter(Employee.contract_signing_date <= date_to)
+
+    return query
+
+
+def export_filters(args):
+    """فلاتر البحث غير الفارغة فقط (لتمريرها لرابط التصدير أو للمهمة الخلفية)"""
+    return {name: args.get(name).strip() for name in EMPLOYEE_FILTERS if (args.get(name) or '').strip()}
+
+
+def iter_employee_rows(filters=None, batch_size=BATCH_SIZE, columns=EXPORT_COLUMNS):
+    """صفوف التصدير للموظفين النشطين دفعة بدفعة بدون تحميل الجدول كاملاً في الذاكرة
+
+    كل دفعة استعلام مستقل مرتب حسب المفتاح (id > آخر رقم)، لذلك لا يبقى مؤشر
+    مفتوحاً بين الدفعات ويمكن حفظ نسبة الإنجاز (commit) أثناء التصدير.
+    لا تقرأ من القاعدة إلا أعمدة columns (العمود الأول يجب أن يكون id).
+    """
+    query = filter_employees(Employee.query.filter_by(status='active'), filters or {})
+    query = query.options(
+        load_only(*[getattr(Employee, field) for _, field, _ in columns], raiseload=True)
+    ).order_by(Employee.id)
+
+    last_id = None
+    while True:
+        batch_query = query if last_id is None else query.filter(Employee.id > last_id)
+        batch = [
+            [formatter(getattr(employee, field)) if formatter else getattr(employee, field)
+             for _, field, formatter in columns]
+            for employee in batch_query.limit(batch_size)
+        ]
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        yield from batch
+        if len(batch) < batch_size:
+            return
+
+
+def export_headers(columns=EXPORT_COLUMNS):
+    return [header for header, _, _ in columns]
+
+
+def write_employees_xlsx(path, rows, progress=None, columns=EXPORT_COLUMNS):
+    """كتابة الصفوف إلى ملف Excel بوضع الكتابة فقط (الذاكرة ثابتة مهما كان عدد الصفوف)
+
+    يعيد عدد الصفوف المكتوبة.
+    """
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('الموظفين')
+    sheet.append(export_headers(columns))
+    count = 0
+    for row in rows:
+        sheet.append(row)
+        count += 1
+        if progress and count % BATCH_SIZE == 0:
+            progress(count)
+    workbook.save(path)
+    return count
+
+
+def generate_employees_csv(rows, compress=False, columns=EXPORT_COLUMNS):
+    """مولد لمحتوى CSV على شكل كتل بايت (مع ضغط gzip اختياري)"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    # علامة BOM ليتعرف Excel على الترميز العربي
+    buffer.write('\ufeff')
+    writer.writerow(export_headers(columns))
+
+    compressor = zlib.compressobj(wbits=zlib.MAX_WBITS | 16) if compress else None
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate(0)
+        return compressor.compress(data) if compressor else data
+
+    for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= STREAM_BUFFER_SIZE:
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
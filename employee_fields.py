@@ -0,0 +1,51 @@
+from sqlalchemy.orm import load_only
+
+from models import Employee
+
+# أعمدة تحمل دائماً مهما كانت صلاحيات الحقول (المعرفات والاسم والحالة)
+CORE_COLUMNS = frozenset(['id', 'employee_id', 'name_arabic', 'first_name', 'last_name', 'status'])
+
+# أعمدة تتبع مجموعة حقول ولا تظهر في قائمة fields في SYSTEM_MODULES (تفاصيل نفس البيانات)
+RELATED_COLUMNS = {
+    'basic_info': ['id_validity', 'id_expiry_date', 'id_issuer', 'birth_place', 'marital_status',
+                   'has_driving_license', 'license_expiry_date'],
+    'contact_info': ['emergency_contact'],
+    'contract_info': ['start_work_date', 'contract_duration', 'probation_period', 'working_hours',
+                      'uniform_provision', 'internet_provision', 'penalty_clause', 'notes', 'hire_date'],
+    'work_info': ['operating_company'],
+    'bank_info': ['iban_certificate', 'additional_iban', 'beneficiary_phone'],
+}
+
+
+def compile_field_groups(groups):
+    """تحويل مجموعات الحقول (SYSTEM_MODULES['employees']['fields']) إلى أعمدة جدول الموظفين
+
+    يعيد قاموس: اسم المجموعة -> frozenset بأسماء الأعمدة الموجودة فعلاً في النموذج.
+    """
+    columns = {attribute.key for attribute in Employee.__mapper__.column_attrs}
+    return {
+        name: frozenset(
+            field for field in list(group.get('fields', [])) + RELATED_COLUMNS.get(name, [])
+            if field in columns
+        )
+        for name, group in groups.items()
+    }
+
+
+def allowed_columns(field_groups, groups, needed=None):
+    """أعمدة الموظف المسموحة لمجموعات الحقول groups (مقصورة على needed إن حددت)"""
+    columns = set(CORE_COLUMNS)
+    for group in groups:
+        columns |= field_groups.get(group, frozenset())
+    if needed is not None:
+        columns &= set(needed) | CORE_COLUMNS
+    return frozenset(columns)
+
+
+def employee_projection(columns):
+    """خيار تحميل يقرأ الأعمدة المحددة فقط من جدول الموظفين
+
+    قراءة عمود غير محمل ترفع خطأ بدلاً من استعلام إضافي، حتى لا تخرج بيانات
+    مجموعة غير مسموحة (مثل البيانات البنكية) من قاعدة البيانات بالخطأ.
+    """
+    return load_only(*[getattr(Employee, column) for column in sorted(columns)], raiseload=True)
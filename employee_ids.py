@@ -0,0 +1,126 @@
+import math
+
+from sqlalchemy import Sequence, func, select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, Employee, IdCounter
+
+# الرقم الوظيفي 6 أرقام، ويبدأ العداد من 100000 حتى لا تبدأ الأرقام الجديدة بصفر
+ID_DIGITS = 6
+EMPLOYEE_ID_START = 100000
+ID_SPACE = 10 ** ID_DIGITS - EMPLOYEE_ID_START
+
+COUNTER_NAME = 'employee_id'
+
+# أكبر عدد من الأرقام يتم حجزه في استعلام واحد
+MAX_BLOCK = 10000
+
+# في PostgreSQL يستخدم تسلسل (ينشأ مع create_all): nextval لا ينتظر أي قفل ولا يلغى مع المعاملة
+EMPLOYEE_ID_SEQUENCE = Sequence('employee_id_seq', start=EMPLOYEE_ID_START, metadata=db.metadata)
+
+
+def _execute(statement, params=None):
+    # دائماً على القاعدة الرئيسية، حتى داخل العروض المعلمة بـ read_replica
+    return db.session.execute(statement, params, bind_arguments={'bind': db.engine})
+
+
+def initial_position(connection):
+    """أول موقع للعداد عند إنشائه: بداية أكبر فجوة بين الأرقام الوظيفية الموجودة
+
+    الفجوة بعد أكبر رقم تكمل من بداية المجال (العداد يلتف بعد 999999)،
+    لذلك يبدأ العداد من 100000 فقط إذا كانت هي بداية أكبر فجوة فعلاً.
+    """
+    numbers = (
+        int(employee_id) for employee_id in connection.execute(
+            select(Employee.employee_id)
+            .where(func.length(Employee.employee_id) == ID_DIGITS, Employee.employee_id >= str(EMPLOYEE_ID_START))
+            .order_by(Employee.employee_id)
+        ).scalars() if employee_id.isdigit()
+    )
+    first = previous = next(numbers, None)
+    if first is None:
+        return EMPLOYEE_ID_START
+    start, largest = None, 0
+    for number in numbers:
+        if number - previous - 1 > largest:
+            start, largest = previous + 1, number - previous - 1
+        previous = number
+    # الفجوة الملتفة: من بعد أكبر رقم حتى 999999 ثم من 100000 حتى أصغر رقم
+    if start is None or (10 ** ID_DIGITS - 1 - previous) + (first - EMPLOYEE_ID_START) >= largest:
+        return previous + 1
+    return start
+
+
+def _reserve_positions(count):
+    """حجز count موقعاً من العداد (لا يعطى نفس الموقع لعمليتين أبداً)"""
+    if db.engine.dialect.name == 'postgresql':
+        return list(_execute(
+            select(EMPLOYEE_ID_SEQUENCE.next_value()).select_from(func.generate_series(1, count))
+        ).scalars())
+
+    # SQLite: تحديث صف العداد يأخذ قفل الكتابة حتى نهاية المعاملة، فالقراءة بعده آمنة
+    stmt = update(IdCounter).where(IdCounter.name == COUNTER_NAME).values(value=IdCounter.value + count)
+    if _execute(stmt).rowcount == 0:
+        try:
+            with db.session.begin_nested():
+                db.session.add(IdCounter(name=COUNTER_NAME, value=initial_position(db.session)))
+        except IntegrityError:
+            pass  # أنشأته عملية أخرى في نفس الوقت
+        _execute(stmt)
+    end = _execute(select(IdCounter.value).where(IdCounter.name == COUNTER_NAME)).scalar_one()
+    return range(end - count, end)
+
+
+def _format(position):
+    return f'{EMPLOYEE_ID_START + (position - EMPLOYEE_ID_START) % ID_SPACE:0{ID_DIGITS}d}'
+
+
+class _FreeRatio:
+    """تقدير نسبة الأرقام غير المستخدمة في المواقع المحجوزة مؤخراً (لكل عملية)"""
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.reserved = self.free = 0
+
+    def observe(self, reserved, free):
+        # الحجوزات السابقة يقل وزنها للنصف مع كل حجز جديد
+        self.reserved = self.reserved / 2 + reserved
+        self.free = self.free / 2 + free
+
+    def block_size(self, count):
+        """عدد المواقع التي تعطي count رقماً متاحاً في حجز واحد غالباً"""
+        ratio = (self.free + 1) / (self.reserved + 1)
+        # هامش انحرافين معياريين: لا هامش إذا كانت كل الأرقام متاحة
+        margin = 2 * math.sqrt(count * (1 - ratio))
+        return min(max(count, math.ceil((count + margin) / ratio)), MAX_BLOCK)
+
+
+free_ratio = _FreeRatio()
+
+
+def allocate_employee_ids(count):
+    """حجز count رقماً وظيفياً جديداً من العداد
+
+    حجم الحجز يكبر حسب نسبة الأرقام المتاحة (مثلاً 10 مواقع لكل رقم إذا كانت 90%
+    من الأرقام مستخدمة)، واستعلام واحد يتجاهل الأرقام المستخدمة مسبقاً (الأرقام
+    العشوائية القديمة أو المدخلة يدوياً). لذلك يبقى عدد الاستعلامات ثابتاً مهما
+    امتلأت الأرقام. الأرقام المتاحة الزائدة عن الحاجة تعود بعد التفاف العداد.
+    يعمل ضمن معاملة الجلسة الحالية. يرفع ValueError إذا لم تبق أرقام متاحة.
+    """
+    ids, scanned = [], 0
+    while len(ids) < count:
+        if scanned >= ID_SPACE:
+            raise ValueError('لا توجد أرقام وظيفية متاحة')
+        candidates = [_format(position) for position in _reserve_positions(free_ratio.block_size(count - len(ids)))]
+        scanned += len(candidates)
+        used = set(_execute(select(Employee.employee_id).where(Employee.employee_id.in_(candidates))).scalars())
+        free = [employee_id for employee_id in candidates if employee_id not in used]
+        free_ratio.observe(len(candidates), len(free))
+        ids.extend(free[:count - len(ids)])
+    return ids
+
+
+def next_employee_id():
+    return allocate_employee_ids(1)[0]
@@ -0,0 +1,267 @@
+from datetime import date, timedelta
+
+import pandas as pd
+from openpyxl import load_workbook
+from sqlalchemy import insert, select
+
+from models import db, Employee
+from employee_ids import allocate_employee_ids
+from search_index import search_fields
+from facet_cache import facet_cache
+from stats_service import invalidate_stats_cache
+
+# عدد الصفوف في كل دفعة تحويل وإدراج
+CHUNK_SIZE = 1000
+
+# الحد الأقصى لرسائل الأخطاء المحفوظة (العدد الكلي يحسب دائماً)
+MAX_ERROR_DETAILS = 1000
+
+REQUIRED_COLUMNS = ['الاسم بالعربية', 'رقم الهوية']
+
+# عمود Excel -> (حقل الموظف، القيمة الافتراضية للخلايا الفارغة أو العمود المفقود)
+TEXT_COLUMNS = {
+    'الاسم بالإنجليزية': ('name_english', ''),
+    'صلاحية الهوية': ('id_validity', 'سارية'),
+    'الجنسية': ('nationality', 'سعودي'),
+    'مكان الميلاد': ('birth_place', ''),
+    'الحالة الاجتماعية': ('marital_status', 'أعزب'),
+    'الجنس': ('gender', 'ذكر'),
+    'جهة إصدار الهوية': ('id_issuer', ''),
+    'رقم الهاتف': ('phone', ''),
+    'رقم هاتف إضافي': ('additional_phone', ''),
+    'البريد الإلكتروني': ('email', ''),
+    'العنوان': ('address', ''),
+    'رقم الطوارئ': ('emergency_phone', ''),
+    'مدة العقد': ('contract_duration', 'سنة واحدة'),
+    'المسمى الوظيفي': ('job_title', 'موظف'),
+    'نوع العقد': ('contract_type', 'دائم'),
+    'فترة التجربة': ('probation_period', '3 أشهر'),
+    'بند البدلة': ('uniform_provision', 'نعم'),
+    'الشركة المشغلة': ('operating_company', 'شركة رايزو'),
+    'ملاحظات': ('notes', ''),
+    'الشرط الجزائي': ('penalty_clause', ''),
+    'بند الإنترنت': ('internet_provision', 'لا'),
+    'القسم': ('department', 'عام'),
+    'المركز': ('center', ''),
+    'المربع': ('square', ''),
+    'رقم المخيم': ('camp_number', ''),
+    'فترة العمل': ('work_shift', 'صباحية'),
+    'نوع البنك': ('bank_type', ''),
+    'رقم الآيبان': ('iban_number', ''),
+    'شهادة الآيبان': ('iban_certificate', ''),
+    'بنك إضافي': ('additional_bank', ''),
+    'آيبان إضافي': ('additional_iban', ''),
+    'اسم المستفيد': ('beneficiary_name', ''),
+    'رقم المستفيد': ('beneficiary_phone', ''),
+    'نوع الموظف': ('employee_type', 'دائم'),
+    'جهة الطوارئ': ('emergency_contact', ''),
+}
+
+# عمود Excel -> حقل الموظف (التواريخ)
+DATE_COLUMNS = {
+    'تاريخ الميلاد': 'birth_date',
+    'تاريخ بداية العقد': 'contract_signing_date',
+    'تاريخ انتهاء العقد': 'contract_end_date',
+    'تاريخ انتهاء الهوية': 'id_expiry_date',
+    'تاريخ المباشرة': 'start_work_date',
+}
+
+DEFAULT_SALARY = 3000.0
+MAX_SALARY = 1000000
+CAPPED_SALARY = 50000.0
+DEFAULT_WORKING_HOURS = 8
+
+
+def _cell_text(value):
+    """تحويل قيمة الخلية إلى نص (الأرقام الصحيحة بدون .0)"""
+    if value is None:
+        return ''
+    if isinstance(value, float):
+        if pd.isna(value):
+            return ''
+        if value.is_integer():
+            value = int(value)
+    return str(value).strip()
+
+
+def _convert_dates(series):
+    return pd.to_datetime(series, errors='coerce', format='mixed').dt.date
+
+
+def _convert_salaries(series):
+    """نفس قواعد تحويل الراتب السابقة لكن على العمود كاملاً"""
+    cleaned = (
+        series.astype(str)
+        .str.replace(',', '', regex=False)
+        .str.replace('ر.س', '', regex=False)
+        .str.replace('ريال', '', regex=False)
+        .str.strip()
+    )
+    salaries = pd.to_numeric(cleaned, errors='coerce')
+    salaries = salaries.where(salaries >= 0, DEFAULT_SALARY)
+    salaries = salaries.where(salaries <= MAX_SALARY, CAPPED_SALARY)
+    return salaries.fillna(DEFAULT_SALARY).astype(float)
+
+
+def _read_rows(file_storage, filename):
+    """قراءة صفوف الملف تدريجياً: يعيد (العناوين، مولد الصفوف، العدد التقريبي للصفوف)"""
+    if filename.lower().endswith('.xlsx'):
+        workbook = load_workbook(file_storage, read_only=True, data_only=True)
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None) or ()
+
+        def generate():
+            try:
+                yield from rows
+            finally:
+                workbook.close()
+        return [_cell_text(h) for h in header], generate(), sheet.max_row
+
+    # ملفات .xls القديمة لا تدعم القراءة التدريجية
+    frame = pd.read_excel(file_storage, engine='xlrd', dtype=object)
+    header = [_cell_text(h) for h in frame.columns]
+    rows = (tuple(None if pd.isna(v) else v for v in row) for row in frame.itertuples(index=False))
+    return header, rows, len(frame) + 1
+
+
+def _build_chunk(records):
+    """تحويل دفعة من الصفوف الصالحة إلى قواميس جاهزة للإدراج"""
+    frame = pd.DataFrame.from_records([r['values'] for r in records])
+    today = date.today()
+    defaults = {
+        'birth_date': date(1990, 1, 1),
+        'contract_signing_date': today,
+        'contract_end_date': today + timedelta(days=365),
+        'id_expiry_date': today + timedelta(days=3650),
+        'start_work_date': None,
+    }
+
+    converted = {}
+    for column, field in DATE_COLUMNS.items():
+        if column in frame:
+            values = _convert_dates(frame[column])
+            converted[field] = [v if not pd.isna(v) else defaults[field] for v in values]
+        else:
+            converted[field] = [defaults[field]] * len(frame)
+
+    if 'الراتب الأساسي' in frame:
+        converted['salary'] = _convert_salaries(frame['الراتب الأساسي']).tolist()
+    else:
+        converted['salary'] = [DEFAULT_SALARY] * len(frame)
+
+    if 'ساعات العمل' in frame:
+        hours = pd.to_numeric(frame['ساعات العمل'], errors='coerce').fillna(DEFAULT_WORKING_HOURS)
+        converted['working_hours'] = hours.astype(int).tolist()
+    else:
+        converted['working_hours'] = [DEFAULT_WORKING_HOURS] * len(frame)
+
+    # حجز أرقام الدفعة كاملة من العداد دفعة واحدة
+    employee_ids = allocate_employee_ids(len(records))
+
+    rows = []
+    for i, record in enumerate(records):
+        values = record['values']
+        name_arabic = record['name_arabic']
+        row = {
+            'employee_id': employee_ids[i],
+            'name_arabic': name_arabic,
+            'national_id': record['national_id'],
+            # حقول التوافق مع النظام القديم
+            'first_name': name_arabic.split()[0],
+            'last_name': ' '.join(name_arabic.split()[1:]),
+            'status': 'active',
+        }
+        for column, (field, default) in TEXT_COLUMNS.items():
+            row[field] = _cell_text(values.get(column)) or default
+        for field, column_values in converted.items():
+            row[field] = column_values[i]
+        row['hire_date'] = row['contract_signing_date']
+        # الإدراج الجماعي لا يمر بأحداث النموذج، لذا تحسب حقول البحث هنا
+        row.update(search_fields(
+            row['name_arabic'], row['name_english'], row['phone'], row['additional_phone']
+        ))
+        rows.append(row)
+    return rows
+
+
+def import_employees_file(file_storage, filename, chunk_size=CHUNK_SIZE, progress=None):
+    """استيراد الموظفين من ملف Excel على دفعات
+
+    يعيد قاموساً بعدد الموظفين المستوردين والفاشلين وتفاصيل الأخطاء.
+    يرفع ValueError برسالة عربية إذا كان الملف غير صالح. لا يقوم بعمل commit.
+    progress: دالة اختيارية تستدعى بعد كل دفعة بـ (الصفوف المقروءة، إجمالي الصفوف أو None).
+    """
+    try:
+        header, rows, total_rows = _read_rows(file_storage, filename)
+    except Exception as e:
+        raise ValueError(f'خطأ في قراءة ملف Excel: {e}')
+    missing_columns = [c for c in REQUIRED_COLUMNS if c not in header]
+    if missing_columns:
+        raise ValueError(f'الأعمدة التالية مفقودة في الملف: {", ".join(missing_columns)}')
+
+    existing_national_ids = set(db.session.scalars(select(Employee.national_id)))
+    result = {'inserted': 0, 'failed': 0, 'errors': []}
+
+    def fail(row_number, message):
+        result['failed'] += 1
+        if len(result['errors']) < MAX_ERROR_DETAILS:
+            result['errors'].append(f'الصف {row_number}: {message}')
+
+    def flush(pending):
+        try:
+            chunk = _build_chunk(pending)
+            # نقطة حفظ لكل دفعة حتى لا يلغي فشل دفعة واحدة ما سبقها
+            with db.session.begin_nested():
+                db.session.execute(insert(Employee), chunk)
+            result['inserted'] += len(chunk)
+        except Exception as e:
+            for record in pending:
+                fail(record['row_number'], str(e))
+
+    pending = []
+    empty_file = True
+    for row_number, cells in enumerate(rows, start=2):
+        if cells is None or all(c is None or _cell_text(c) == '' for c in cells):
+            continue
+        empty_file = False
+        values = {name: cells[i] for i, name in enumerate(header) if name and i < len(cells)}
+
+        national_id = _cell_text(values.get('رقم الهوية'))
+        if not national_id:
+            fail(row_number, 'رقم الهوية مفقود')
+            continue
+        if national_id in existing_national_ids:
+            fail(row_number, f'رقم الهوية {national_id} موجود مسبقاً')
+            continue
+
+        name_arabic = _cell_text(values.get('الاسم بالعربية'))
+        if not name_arabic:
+            fail(row_number, 'الاسم بالعربية مفقود')
+            continue
+
+        existing_national_ids.add(national_id)
+        pending.append({
+            'row_number': row_number,
+            'values': values,
+            'national_id': national_id,
+            'name_arabic': name_arabic,
+        })
+        if len(pending) >= chunk_size:
+            flush(pending)
+            pending = []
+            if progress:
+                progress(row_number - 1, total_rows and total_rows - 1)
+
+    if pending:
+        flush(pending)
+
+    if empty_file:
+        raise ValueError('الملف فارغ أو لا يحتوي على بيانات صالحة')
+    return result
+
+
+def finish_import():
+    """تحديث الكاش بعد حفظ الاستيراد (الإدراج الجماعي لا يمر بأحداث النموذج)"""
+    facet_cache.invalidate(Employee.__tablename__)
+    invalidate_stats_cache()
@@ -0,0 +1,165 @@
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+
+from db_engine import use_primary
+from models import db, Employee, Document
+
+try:
+    import redis
+except ImportError:  # Redis اختياري
+    redis = None
+
+DEFAULT_TTL = 300  # بالثواني، حد أقصى لعدم التطابق بين العمليات بدون Redis
+DEFAULT_MAX_ENTRIES = 256
+
+# الجداول التي تتم مراقبتها لإبطال قوائم الفلاتر
+WATCHED_MODELS = (Employee, Document)
+
+
+class FacetCache:
+    """تخزين مؤقت لقوائم القيم الفريدة المستخدمة في فلاتر البحث
+
+    طبقة محلية (LRU) داخل العملية مع طبقة Redis اختيارية مشتركة بين العمليات.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, redis_url=None):
+        self._local = OrderedDict()
+        self._lock = threading.Lock()
+        self.configure(ttl, max_entries, redis_url)
+
+    def configure(self, ttl=DEFAULT_TTL, max_entries=DEFAULT_MAX_ENTRIES, redis_url=None):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._redis = None
+        if redis_url and redis is not None:
+            try:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+            except Exception as e:
+                print(f"تحذير: تعذر الاتصال بـ Redis لقوائم الفلاتر: {e}")
+        with self._lock:
+            self._local.clear()
+
+    def _version(self, table_name):
+        """رقم إصدار الجدول في Redis (يتغير عند أي تعديل في أي عملية)"""
+        if not self._redis:
+            return 0
+        try:
+            return int(self._redis.get(f'raizo:facets:version:{table_name}') or 0)
+        except Exception:
+            return None
+
+    def get(self, table_name, key, loader):
+        version = self._version(table_name)
+        local_key = (table_name, key)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._local.get(local_key)
+            if entry and entry[0] > now and entry[1] == version:
+                self._local.move_to_end(local_key)
+                return entry[2]
+
+        value = None
+        redis_key = f'raizo:facets:{table_name}:{version}:{key}'
+        if self._redis and version is not None:
+            try:
+                cached = self._redis.get(redis_key)
+                if cached is not None:
+                    value = json.loads(cached)
+            except Exception:
+                value = None
+
+        if value is None:
+            value = loader()
+            if self._redis and version is not None:
+                try:
+                    self._redis.set(redis_key, json.dumps(value, ensure_ascii=False), ex=self.ttl)
+                except Exception:
+                    pass
+
+        with self._lock:
+            self._local[local_key] = (now + self.ttl, version, value)
+            self._local.move_to_end(local_key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+        return value
+
+    def invalidate(self, table_name=None):
+        """إبطال القوائم المخزنة لجدول معين أو لجميع الجداول"""
+        with self._lock:
+            for local_key in [k for k in self._local if table_name is None or k[0] == table_name]:
+                del self._local[local_key]
+        if self._redis:
+            tables = [table_name] if table_name else [m.__tablename__ for m in WATCHED_MODELS]
+            try:
+                for name in tables:
+                    self._redis.incr(f'raizo:facets:version:{name}')
+            except Exception as e:
+                print(f"تحذير: تعذر إبطال قوائم الفلاتر في Redis: {e}")
+
+
+facet_cache = FacetCache()
+
+
+def init_facet_cache(app):
+    """تهيئة الكاش من إعدادات التطبيق"""
+    facet_cache.configure(
+        ttl=app.config.get('FACET_CACHE_TTL', DEFAULT_TTL),
+        max_entries=app.config.get('FACET_CACHE_MAX_ENTRIES', DEFAULT_MAX_ENTRIES),
+        redis_url=app.config.get('FACET_CACHE_REDIS_URL')
+    )
+
+
+def get_facet(column, with_counts=False, **filters):
+    """القيم الفريدة غير الفارغة لعمود مع فلاتر مساواة اختيارية
+
+    مثال: get_facet(Employee.department, status='active', gender='ذكر')
+    مع with_counts=True تعاد قائمة من [القيمة، العدد].
+    """
+    model = column.class_
+    table_name = model.__tablename__
+    key = json.dumps([column.key, with_counts, sorted(filters.items())], ensure_ascii=False)
+
+    def loader():
+        query = db.session.query(column, func.count()).filter(
+            column.isnot(None),
+            column != ''
+        ).filter_by(**filters).group_by(column).order_by(column)
+        # من القاعدة الرئيسية: القائمة تخزن تحت إصدار الجدول بعد آخر تعديل، والنسخة
+        # المقروءة المتأخرة قد تعيد القيم القديمة فتبقى في الكاش حتى انتهاء TTL
+        with use_primary():
+            rows = query.all()
+        if with_counts:
+            return [[value, count] for value, count in rows]
+        return [value for value, _ in rows]
+
+    return facet_cache.get(table_name, key, loader)
+
+
+def _mark_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault('facet_dirty_tables', set()).add(target.__tablename__)
+
+
+for _model in WATCHED_MODELS:
+    event.listen(_model, 'after_insert', _mark_dirty)
+    event.listen(_model, 'after_update', _mark_dirty)
+    event.listen(_model, 'after_delete', _mark_dirty)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    # الإبطال بعد الحفظ فقط حتى لا تخزن قيم من معاملة قد يتم التراجع عنها
+    for table_name in session.info.pop('facet_dirty_tables', ()):
+        facet_cache.invalidate(table_name)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('facet_dirty_tables', None)
@@ -0,0 +1,221 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from config import Config
+
+# كل ملف يحفظ مرة واحدة باسم بصمته (SHA-256)، وكل لقطة هي قائمة (manifest)
+# بمسارات الملفات وبصماتها، لذلك لا يرفع إلا الجديد أو المعدل
+BLOB_PREFIX = 'files_blob_'
+MANIFEST_PREFIX = 'files_manifest_'
+
+HASH_BUFFER_SIZE = 1024 * 1024
+
+
+def _sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BUFFER_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _load_cache(path):
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_cache(path, files):
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    temp_path = path + '.tmp'
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump(files, f)
+    os.replace(temp_path, path)
+
+
+def scan_files(root, cache=None):
+    """بصمات جميع الملفات تحت المجلد: {المسار النسبي: {sha256, size, mtime}}
+
+    الملفات التي لم يتغير حجمها ووقت تعديلها منذ آخر نسخة لا يعاد حساب بصمتها.
+    """
+    cache = cache or {}
+    files = {}
+    for directory, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(directory, name)
+            relative = os.path.relpath(path, root).replace(os.sep, '/')
+            stat = os.stat(path)
+            cached = cache.get(relative)
+            if cached and cached['size'] == stat.st_size and cached['mtime'] == stat.st_mtime_ns:
+                sha256 = cached['sha256']
+            else:
+                sha256 = _sha256(path)
+            files[relative] = {'sha256': sha256, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+    return files
+
+
+def _workers(storage, workers):
+    workers = workers or Config.FILE_BACKUP_WORKERS
+    return workers if storage.thread_safe else 1
+
+
+def _manifests(storage):
+    """اللقطات المحفوظة من الأحدث للأقدم (الاسم يحتوي التاريخ)"""
+    return sorted(storage.list_backups(MANIFEST_PREFIX), key=lambda m: m['name'], reverse=True)
+
+
+def _read_manifest(storage, manifest):
+    fd, path = tempfile.mkstemp(suffix='.json.gz')
+    os.close(fd)
+    try:
+        storage.download(manifest['id'], path)
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return json.load(f)
+    finally:
+        os.remove(path)
+
+
+def backup_files(storage, root=None, workers=None, keep_count=None):
+    """نسخة تزايدية من ملفات المرفقات (الصور، شهادات الآيبان، المستندات)
+
+    يرفع فقط الملفات التي لا توجد بصمتها في مكان الحفظ (بالتوازي)، ثم يرفع
+    قائمة اللقطة. يعيد قاموساً بعدد الملفات وحجم ما تم رفعه والمدة.
+    """
+    root = root or Config.UPLOAD_FOLDER
+    keep_count = Config.BACKUP_KEEP_COUNT if keep_count is None else keep_count
+    started = time.monotonic()
+
+    cache_path = Config.FILE_BACKUP_CACHE
+    files = scan_files(root, _load_cache(cache_path)) if os.path.isdir(root) else {}
+    stored = {b['name'][len(BLOB_PREFIX):] for b in storage.list_backups(BLOB_PREFIX)}
+
+    # ملف واحد لكل بصمة جديدة (الملفات المتطابقة ترفع مرة واحدة)
+    new_blobs = {}
+    for relative, entry in files.items():
+        if entry['sha256'] not in stored:
+            new_blobs.setdefault(entry['sha256'], relative)
+
+    def upload(item):
+        sha256, relative = item
+        path = os.path.join(root, relative)
+        blob_id = storage.upload(path, BLOB_PREFIX + sha256, resume=False)
+        # الملف تغير أثناء النسخ: المحتوى المرفوع قد لا يطابق البصمة
+        if _sha256(path) != sha256:
+            storage.delete(blob_id)
+            return relative
+        return None
+
+    changed = []
+    with ThreadPoolExecutor(max_workers=_workers(storage, workers)) as executor:
+        for relative in executor.map(upload, new_blobs.items()):
+            if relative:
+                changed.append(relative)
+    for relative in changed:
+        files.pop(relative, None)
+
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S_%f')
+    manifest_name = f'{MANIFEST_PREFIX}{timestamp}.json.gz'
+    fd, manifest_path = tempfile.mkstemp(suffix='.json.gz')
+    os.close(fd)
+    try:
+        with gzip.open(manifest_path, 'wt', encoding='utf-8') as f:
+            json.dump({'created': datetime.utcnow().isoformat(), 'files': files}, f)
+        storage.upload(manifest_path, manifest_name, resume=False)
+    finally:
+        os.remove(manifest_path)
+    _save_cache(cache_path, files)
+
+    if keep_count:
+        try:
+            prune_file_snapshots(storage, keep_count)
+        except Exception as e:
+            print(f"خطأ في تنظيف لقطات الملفات القديمة: {e}")
+
+    report = {
+        'manifest': manifest_name,
+        'files': len(files),
+        'total_size': sum(entry['size'] for entry in files.values()),
+        'uploaded': len(new_blobs) - len(changed),
+        'uploaded_size': sum(files[r]['size'] for r in new_blobs.values() if r in files),
+        'changed_during_backup': changed,
+        'duration': round(time.monotonic() - started, 3)
+    }
+    print(f"تم نسخ الملفات {manifest_name}: {report['uploaded']} ملف جديد من {report['files']} "
+          f"({report['uploaded_size']} بايت) في {report['duration']} ثانية")
+    return report
+
+
+def prune_file_snapshots(storage, keep_count):
+    """حذف اللقطات الزائدة عن keep_count والملفات التي لم تعد أي لقطة تستخدمها"""
+    manifests = _manifests(storage)
+    if len(manifests) <= keep_count:
+        return 0
+
+    referenced = set()
+    for manifest in manifests[:keep_count]:
+        referenced.update(entry['sha256'] for entry in _read_manifest(storage, manifest)['files'].values())
+
+    for manifest in manifests[keep_count:]:
+        storage.delete(manifest['id'])
+    removed = 0
+    for blob in storage.list_backups(BLOB_PREFIX):
+        if blob['name'][len(BLOB_PREFIX):] not in referenced:
+            storage.delete(blob['id'])
+            removed += 1
+    return removed
+
+
+def list_file_snapshots(storage):
+    return [m['name'] for m in _manifests(storage)]
+
+
+def restore_files(storage, target_dir, manifest_name=None, workers=None):
+    """استعادة الملفات كما كانت في لقطة محددة (أو آخر لقطة)
+
+    الملفات الموجودة بنفس البصمة لا يعاد تحميلها. يعيد قاموساً بعدد الملفات
+    المستعادة والمتطابقة.
+    """
+    manifests = _manifests(storage)
+    if manifest_name:
+        manifests = [m for m in manifests if m['name'] == manifest_name]
+    if not manifests:
+        raise ValueError('لا توجد لقطة ملفات للاستعادة')
+    manifest = _read_manifest(storage, manifests[0])
+    blobs = {b['name'][len(BLOB_PREFIX):]: b['id'] for b in storage.list_backups(BLOB_PREFIX)}
+
+    target_root = os.path.abspath(target_dir)
+
+    def restore(item):
+        relative, entry = item
+        path = os.path.abspath(os.path.join(target_root, relative))
+        if not path.startswith(target_root + os.sep):
+            raise ValueError(f'مسار غير صالح في اللقطة: {relative}')
+        if os.path.exists(path) and os.path.getsize(path) == entry['size'] and _sha256(path) == entry['sha256']:
+            return False
+        if entry['sha256'] not in blobs:
+            raise ValueError(f'الملف {relative} غير موجود في مكان الحفظ')
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        storage.download(blobs[entry['sha256']], path + '.tmp')
+        if _sha256(path + '.tmp') != entry['sha256']:
+            os.remove(path + '.tmp')
+            raise ValueError(f'بصمة الملف {relative} لا تطابق اللقطة')
+        os.replace(path + '.tmp', path)
+        return True
+
+    with ThreadPoolExecutor(max_workers=_workers(storage, workers)) as executor:
+        results = list(executor.map(restore, manifest['files'].items()))
+
+    return {
+        'snapshot': manifests[0]['name'],
+        'restored': sum(results),
+        'unchanged': len(results) - sum(results)
+    }
@@ -1,15 +1,10 @@
 import os
-import io
-import shutil
-from datetime import datetime
 from google.auth.transport.requests import Request
 from google.oauth2.credentials import Credentials
 from google_auth_oauthlib.flow import InstalledAppFlow
 from googleapiclient.discovery import build
-from googleapiclient.http import MediaIoBaseUpload
-import schedule
-import time
-import threading
+from db_backup import backup_database
+from backup_storage import GoogleDriveStorage
 # إزالة الاستيراد الدائري
 # from app import app, db
 # from models import Settings
@@ -20,6 +15,7 @@ SCOPES = ['https://www.googleapis.com/auth/drive.file']
 class GoogleDriveBackup:
     def __init__(self):
         self.service = None
+        self.credentials = None
         self.folder_id = None
         self.setup_drive_service()
     
@@ -44,6 +40,7 @@ class GoogleDriveBackup:
             with open('token.json', 'w') as token:
                 token.write(creds.to_json())
         
+        self.credentials = creds
         self.service = build('drive', 'v3', credentials=creds)
         self.create_backup_folder()
     
@@ -79,83 +76,38 @@ class GoogleDriveBackup:
         except Exception as e:
             print(f"خطأ في إنشاء مجلد Google Drive: {e}")
     
+    def storage(self):
+        """مكان الحفظ في Google Drive (رفع على أجزاء قابل للاستكمال)"""
+        return GoogleDriveStorage(self.service, self.folder_id, credentials=self.credentials)
+    
     def upload_backup(self, file_path, file_name):
         """رفع ملف النسخة الاحتياطية إلى Google Drive"""
         try:
-            file_metadata = {
-                'name': file_name,
-                'parents': [self.folder_id]
-            }
-            
-            with open(file_path, 'rb') as file_data:
-                media = MediaIoBaseUpload(
-                    io.BytesIO(file_data.read()),
-                    mimetype='application/octet-stream'
-                )
-            
-            file = self.service.files().create(
-                body=file_metadata,
-                media_body=media,
-                fields='id'
-            ).execute()
-            
-            print(f"تم رفع النسخة الاحتياطية بنجاح: {file.get('id')}")
-            return file.get('id')
+            file_id = self.storage().upload(file_path, file_name)
+            print(f"تم رفع النسخة الاحتياطية بنجاح: {file_id}")
+            return file_id
             
         except Exception as e:
             print(f"خطأ في رفع النسخة الاحتياطية: {e}")
             return None
     
     def create_database_backup(self):
-        """إنشاء نسخة احتياطية من قاعدة البيانات"""
+        """إنشاء نسخة احتياطية من قاعدة البيانات ورفعها
+
+        يعيد تقرير النسخة (الحجم والمدة) عند النجاح أو None عند الفشل.
+        """
         try:
-            # إنشاء مجلد النسخ الاحتياطية المحلي
-            backup_dir = 'backups'
-            if not os.path.exists(backup_dir):
-                os.makedirs(backup_dir)
-            
-            # تاريخ ووقت النسخة
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f'raizo_backup_{timestamp}.db'
-            backup_path = os.path.join(backup_dir, backup_filename)
-            
-            # نسخ قاعدة البيانات
-            db_path = os.path.join('instance', 'raizo_hr.db')
-            if os.path.exists(db_path):
-                shutil.copy2(db_path, backup_path)
-                
-                # رفع إلى Google Drive
-                file_id = self.upload_backup(backup_path, backup_filename)
-                
-                if file_id:
-                    # حذف النسخة المحلية بعد الرفع
-                    os.remove(backup_path)
-                    return True
-            
-            return False
+            # نسخة متسقة ومضغوطة أثناء عمل قاعدة البيانات ثم رفعها على أجزاء
+            return backup_database(self.storage())
             
         except Exception as e:
             print(f"خطأ في إنشاء النسخة الاحتياطية: {e}")
-            return False
+            return None
     
     def cleanup_old_backups(self, keep_count=10):
         """حذف النسخ الاحتياطية القديمة (الاحتفاظ بآخر 10 نسخ)"""
         try:
-            # البحث عن جميع النسخ الاحتياطية
-            results = self.service.files().list(
-                q=f"parents in '{self.folder_id}' and name contains 'raizo_backup_'",
-                orderBy='createdTime desc',
-                fields="files(id, name, createdTime)"
-            ).execute()
-            
-            files = results.get('files', [])
-            
-            # حذف النسخ الزائدة
-            if len(files) > keep_count:
-                for file in files[keep_count:]:
-                    self.service.files().delete(fileId=file['id']).execute()
-                    print(f"تم حذف النسخة القديمة: {file['name']}")
-                    
+            self.storage().cleanup(keep_count)
         except Exception as e:
             print(f"خطأ في تنظيف النسخ القديمة: {e}")
 
@@ -168,51 +120,3 @@ def get_backup_manager():
     if backup_manager is None:
         backup_manager = GoogleDriveBackup()
     return backup_manager
-
-def scheduled_backup():
-    """تنفيذ النسخ الاحتياطي المجدول"""
-    try:
-        manager = get_backup_manager()
-        manager.create_database_backup()
-        print(f"تم إنشاء نسخة احتياطية في {datetime.now()}")
-    except Exception as e:
-        print(f"خطأ في النسخ الاحتياطي المجدول: {e}")
-
-def setup_backup_schedule():
-    """إعداد جدولة النسخ الاحتياطي"""
-    try:
-        manager = get_backup_manager()
-        settings = manager.get_settings()
-        
-        if settings and settings.auto_backup:
-            # مسح الجدولة السابقة
-            schedule.clear()
-            
-            # إعداد الجدولة الجديدة
-            if settings.backup_frequency == 'daily':
-                schedule.every().day.at("02:00").do(scheduled_backup)
-            elif settings.backup_frequency == 'weekly':
-                schedule.every().sunday.at("02:00").do(scheduled_backup)
-            elif settings.backup_frequency == 'monthly':
-                schedule.every().month.do(scheduled_backup)
-            
-            print(f"تم إعداد النسخ الاحتياطي: {settings.backup_frequency}")
-    except Exception as e:
-        print(f"خطأ في إعداد جدولة النسخ الاحتياطي: {e}")
-
-def run_scheduler():
-    """تشغيل المجدول في خيط منفصل"""
-    while True:
-        try:
-            schedule.run_pending()
-            time.sleep(60)  # فحص كل دقيقة
-        except Exception as e:
-            print(f"خطأ في المجدول: {e}")
-            time.sleep(300)  # انتظار 5 دقائق في حالة الخطأ
-
-# بدء المجدول في خيط منفصل
-scheduler_thread = threading.Thread(target=run_scheduler, daemon=True)
-scheduler_thread.start()
-
-# إعداد الجدولة عند بدء التشغيل
-setup_backup_schedule()
\ No newline at end of file
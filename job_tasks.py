@@ -0,0 +1,110 @@
+import os
+from datetime import datetime
+
+from config import Config
+from models import db, Employee
+from jobs import job_task
+from employee_import import import_employees_file, finish_import
+from employee_export import filter_employees, export_columns, iter_employee_rows, write_employees_xlsx
+from data_export import export_all_data_file, EXPORT_FORMATS as DATA_EXPORT_FORMATS
+from db_backup import backup_database
+from backup_storage import get_backup_storage
+from file_backup import backup_files
+from db_engine import use_replica
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+@job_task('import_employees')
+def import_employees_job(context, path, filename):
+    """استيراد الموظفين من ملف Excel مرفوع"""
+    def report(done, total):
+        # كل دفعة تحفظ مع تحديث نسبة الإنجاز
+        percent = done * 100 // total if total else 0
+        context.progress(min(percent, 99), f'تمت معالجة {done} صف')
+
+    try:
+        with open(path, 'rb') as file:
+            result = import_employees_file(file, filename, progress=report)
+        db.session.commit()
+        if result['inserted'] > 0:
+            finish_import()
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+    message = f'تم استيراد {result["inserted"]} موظف بنجاح.'
+    if result['failed'] > 0:
+        message += f' فشل في استيراد {result["failed"]} موظف. التفاصيل: {"; ".join(result["errors"][:5])}'
+    return {'message': message}
+
+
+@job_task('export_employees')
+def export_employees_job(context, filters=None, fields=None):
+    """تصدير بيانات الموظفين النشطين (مع فلاتر البحث) إلى Excel
+
+    fields: حقول الموظف المسموحة لمن طلب التصدير (None لكل الأعمدة).
+    """
+    download_name = f'employees_data_{datetime.now().strftime("%Y%m%d_%H%M%S")}.xlsx'
+    path = context.result_path(download_name)
+
+    # القراءة من النسخة المقروءة إن وجدت (تحديث نسبة الإنجاز يكتب في القاعدة الرئيسية)
+    with use_replica():
+        total = filter_employees(Employee.query.filter_by(status='active'), filters or {}).count()
+
+        def report(done):
+            if total:
+                context.progress(min(done * 100 // total, 99), f'تم تصدير {done} موظف')
+
+        columns = export_columns(fields)
+        count = write_employees_xlsx(path, iter_employee_rows(filters, columns=columns),
+                                     progress=report, columns=columns)
+
+    return {
+        'message': f'تم تصدير {count} موظف',
+        'path': path,
+        'download_name': download_name,
+        'mimetype': XLSX_MIMETYPE
+    }
+
+
+@job_task('export_all_data')
+def export_all_data_job(context, export_format='xlsx'):
+    """تصدير شامل لبيانات النظام (الموظفين، الحضور، الرواتب)"""
+    def report(done, total):
+        if total:
+            context.progress(min(done * 100 // total, 99), f'تم تصدير {done} من {total} سجل')
+
+    mimetype, extension = DATA_EXPORT_FORMATS[export_format]
+    timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    download_name = f'raizo_complete_backup_{timestamp}.{extension}'
+    path = context.result_path(download_name)
+    with use_replica():
+        counts = export_all_data_file(path, export_format, progress=report)
+
+    return {
+        'message': 'تم تصدير جميع البيانات: ' + '، '.join(f'{name} {count}' for name, count in counts.items()),
+        'path': path,
+        'download_name': download_name,
+        'mimetype': mimetype
+    }
+
+
+@job_task('create_backup')
+def create_backup_job(context):
+    """إنشاء نسخة احتياطية ورفعها إلى مكان الحفظ المحدد في الإعدادات"""
+    def report_upload(sent, total):
+        if total:
+            context.progress(min(sent * 100 // total, 99), 'جاري رفع النسخة الاحتياطية')
+
+    context.progress(0, 'جاري إنشاء النسخة الاحتياطية')
+    storage = get_backup_storage()
+    report = backup_database(storage, progress=report_upload)
+    size_mb = report['size'] / (1024 * 1024)
+    message = f'تم إنشاء النسخة الاحتياطية بنجاح ({size_mb:.2f} ميجابايت في {report["duration"]} ثانية)'
+
+    if Config.FILE_BACKUP_ENABLED:
+        context.progress(99, 'جاري نسخ ملفات المرفقات')
+        files = backup_files(storage)
+        message += f'، وتم رفع {files["uploaded"]} ملف جديد من أصل {files["files"]} مرفق'
+    return {'message': message}
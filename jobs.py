@@ -0,0 +1,208 @@
+import json
+import os
+import threading
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, inspect, text
+
+from config import Config
+from db_engine import use_primary
+from models import db, Job
+
+try:
+    from celery import Celery
+except ImportError:  # Celery اختياري (للتشغيل على أكثر من خادم)
+    Celery = None
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_RESULT_FOLDER = os.path.join('instance', 'jobs')
+
+# اسم المهمة -> الدالة المنفذة
+_tasks = {}
+
+_executor = None
+_executor_lock = threading.Lock()
+_settings = {
+    'backend': 'thread',
+    'max_workers': DEFAULT_MAX_WORKERS,
+    'result_folder': DEFAULT_RESULT_FOLDER,
+    'app': None
+}
+
+# تطبيق Celery للتشغيل الموزع: celery -A jobs.celery_app worker
+celery_app = None
+if Celery is not None:
+    celery_app = Celery('raizo_jobs', broker=Config.JOBS_CELERY_BROKER_URL)
+
+
+def job_task(name):
+    """تسجيل دالة كمهمة خلفية
+
+    تستدعى الدالة بـ (context, **params) وتعيد قاموساً اختيارياً:
+    {'message': ..., 'path': ..., 'download_name': ..., 'mimetype': ...}
+    """
+    def decorator(func):
+        _tasks[name] = func
+        return func
+    return decorator
+
+
+class JobContext:
+    """واجهة المهمة أثناء التنفيذ لتحديث نسبة الإنجاز"""
+
+    def __init__(self, job_id, result_folder):
+        self.job_id = job_id
+        self.result_folder = result_folder
+
+    def result_path(self, filename):
+        """مسار ملف نتيجة خاص بهذه المهمة"""
+        os.makedirs(self.result_folder, exist_ok=True)
+        return os.path.abspath(os.path.join(self.result_folder, f'{self.job_id}_{filename}'))
+
+    def progress(self, percent, message=None):
+        """تحديث نسبة الإنجاز (يحفظ أيضاً أي تغييرات معلقة في الجلسة)"""
+        values = {'progress': max(0, min(int(percent), 100))}
+        if message:
+            values['message'] = message
+        Job.query.filter_by(id=self.job_id).update(values)
+        db.session.commit()
+
+
+def init_jobs(app):
+    """تهيئة نظام المهام من إعدادات التطبيق"""
+    _settings['backend'] = app.config.get('JOBS_BACKEND', 'thread')
+    _settings['max_workers'] = app.config.get('JOBS_MAX_WORKERS', DEFAULT_MAX_WORKERS)
+    _settings['result_folder'] = app.config.get('JOBS_RESULT_FOLDER', DEFAULT_RESULT_FOLDER)
+    _settings['app'] = app
+    if _settings['backend'] == 'celery' and celery_app is None:
+        print("تحذير: Celery غير مثبت، سيتم تنفيذ المهام داخل العملية")
+        _settings['backend'] = 'thread'
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=_settings['max_workers'], thread_name_prefix='raizo-job'
+            )
+        return _executor
+
+
+def submit_job(job_type, params=None, user_id=None):
+    """إنشاء مهمة وإرسالها للتنفيذ في الخلفية، ويعيد كائن المهمة فوراً"""
+    if job_type not in _tasks:
+        raise ValueError(f'نوع مهمة غير معروف: {job_type}')
+
+    job = Job(
+        id=uuid.uuid4().hex,
+        job_type=job_type,
+        params=json.dumps(params or {}, ensure_ascii=False, default=str),
+        status='queued',
+        progress=0,
+        created_by=user_id
+    )
+    job_id = job.id
+    db.session.add(job)
+    db.session.commit()
+    # بعد commit يعاد تحميل المهمة من القاعدة الرئيسية (السطر قد لا يكون في النسخة المقروءة بعد)
+    with use_primary():
+        db.session.refresh(job)
+
+    if _settings['backend'] == 'celery':
+        celery_app.send_task('raizo.run_job', args=[job_id])
+    else:
+        _get_executor().submit(run_job, _settings['app'], job_id)
+    return job
+
+
+def run_job(app, job_id):
+    """تنفيذ مهمة محفوظة (من مجمع الخيوط أو من عامل Celery)"""
+    with app.app_context():
+        job = db.session.get(Job, job_id)
+        if job is None or job.status != 'queued':
+            return
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        db.session.commit()
+
+        context = JobContext(job_id, app.config.get('JOBS_RESULT_FOLDER', DEFAULT_RESULT_FOLDER))
+        try:
+            result = _tasks[job.job_type](context, **json.loads(job.params or '{}')) or {}
+            db.session.commit()
+            job = db.session.get(Job, job_id)
+            job.status = 'succeeded'
+            job.progress = 100
+            job.message = result.get('message', job.message)
+            job.result_path = result.get('path')
+            job.result_name = result.get('download_name')
+            job.result_mimetype = result.get('mimetype')
+        except Exception as e:
+            db.session.rollback()
+            print(f"خطأ في تنفيذ المهمة {job_id}: {e}")
+            traceback.print_exc()
+            job = db.session.get(Job, job_id)
+            job.status = 'failed'
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+        db.session.remove()
+
+
+if celery_app is not None:
+    @celery_app.task(name='raizo.run_job')
+    def _celery_run_job(job_id):
+        from app import app
+        run_job(app, job_id)
+
+
+def ensure_job_columns():
+    """إضافة عمود آخر تحديث لجدول المهام في قواعد البيانات القديمة"""
+    existing = {c['name'] for c in inspect(db.engine).get_columns(Job.__tablename__)}
+    if 'updated_at' not in existing:
+        column_type = Job.__table__.c.updated_at.type.compile(dialect=db.engine.dialect)
+        db.session.execute(text(f'ALTER TABLE {Job.__tablename__} ADD COLUMN updated_at {column_type}'))
+        db.session.commit()
+
+
+def fail_stale_jobs(stale_minutes=None):
+    """تحديد المهام المعلقة كفاشلة
+
+    مهمة في الانتظار أو قيد التنفيذ بدون أي تحديث منذ stale_minutes دقيقة توقفت
+    عمليتها (إعادة تشغيل الخادم أو نفاد الذاكرة) ولن تنتهي أبداً، فتبقى الواجهة
+    تنتظرها ولا تحذفها cleanup_jobs. يعيد عدد المهام التي تم تحديدها.
+    """
+    stale_minutes = stale_minutes or Config.JOBS_STALE_MINUTES
+    now = datetime.utcnow()
+    cutoff = now - timedelta(minutes=stale_minutes)
+    count = Job.query.filter(
+        Job.status.in_(['queued', 'running']),
+        func.coalesce(Job.updated_at, Job.started_at, Job.created_at) < cutoff
+    ).update({
+        'status': 'failed',
+        'error': f'توقفت المهمة بدون أي تحديث لأكثر من {stale_minutes} دقيقة (ربما أعيد تشغيل الخادم)، يرجى إعادة المحاولة',
+        'finished_at': now
+    }, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def cleanup_jobs(max_age_days=7):
+    """حذف المهام المنتهية القديمة وملفات نتائجها"""
+    cutoff = datetime.utcnow() - timedelta(days=max_age_days)
+    old_jobs = Job.query.filter(
+        Job.status.in_(['succeeded', 'failed']),
+        Job.finished_at < cutoff
+    ).all()
+    for job in old_jobs:
+        if job.result_path and os.path.exists(job.result_path):
+            try:
+                os.remove(job.result_path)
+            except OSError as e:
+                print(f"تحذير: تعذر حذف ملف نتيجة المهمة {job.id}: {e}")
+        db.session.delete(job)
+    db.session.commit()
+    return len(old_jobs)
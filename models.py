@@ -1,9 +1,29 @@
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
 from flask_login import UserMixin
 from datetime import datetime, date
 from werkzeug.security import generate_password_hash, check_password_hash
 
-db = SQLAlchemy()
+
+class RoutingSession(Session):
+    """جلسة توجه استعلامات القراءة إلى قاعدة النسخة المقروءة (bind باسم replica)
+
+    يتم التوجيه فقط داخل العروض والمهام المعلمة بـ read_replica / use_replica
+    وعند وجود replica في SQLALCHEMY_BINDS. الكتابة (flush أو insert/update/delete)
+    تذهب دائماً إلى القاعدة الرئيسية.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and has_app_context() and g.get('use_replica')
+                and not getattr(clause, 'is_dml', False)):
+            replica = self._db.engines.get('replica')
+            if replica is not None:
+                return replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
 
 class User(UserMixin, db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -88,6 +108,10 @@ class Employee(db.Model):
     status = db.Column(db.String(20), default='active')  # حالة الموظف
     emergency_contact = db.Column(db.String(100))  # جهة الاتصال في الطوارئ
     
+    # حقول البحث المطبّعة (تحدث تلقائياً من search_index)
+    search_name = db.Column(db.String(210))  # الاسم العربي والإنجليزي بعد التطبيع
+    search_phones = db.Column(db.String(50))  # أرقام الجوال بعد التطبيع
+    
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
@@ -109,18 +133,9 @@ class Employee(db.Model):
     
     @staticmethod
     def generate_employee_id():
-        """توليد رقم وظيفي تلقائي"""
-        import random
-        import string
-        
-        while True:
-            # توليد رقم وظيفي من 6 أرقام
-            employee_id = ''.join(random.choices(string.digits, k=6))
-            
-            # التحقق من عدم وجود هذا الرقم مسبقاً
-            existing = Employee.query.filter_by(employee_id=employee_id).first()
-            if not existing:
-                return employee_id
+        """توليد رقم وظيفي تلقائي (6 أرقام) من عداد قاعدة البيانات"""
+        from employee_ids import next_employee_id
+        return next_employee_id()
         
     def set_password(self, password):
         self.password_hash = generate_password_hash(password)
@@ -130,6 +145,10 @@ class Employee(db.Model):
 
 class Attendance(db.Model):
     __tablename__ = 'attendance'
+    __table_args__ = (
+        # سجل واحد لكل موظف في اليوم (يستخدم في الحفظ الجماعي ON CONFLICT)
+        db.UniqueConstraint('employee_id', 'date', name='uq_attendance_employee_date'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     employee_id = db.Column(db.Integer, db.ForeignKey('employee.id'), nullable=False)
@@ -171,22 +190,21 @@ class Attendance(db.Model):
     
     def check_data_completeness(self):
         """فحص اكتمال البيانات"""
-        if self.status in ['absent', 'withdrawn']:
+        self.data_completeness = Attendance.evaluate_completeness(
+            self.status, self.check_in, self.check_out, self.report_file
+        )
+        return self.data_completeness
+    
+    @staticmethod
+    def evaluate_completeness(status, check_in, check_out, report_file):
+        """حساب حالة اكتمال البيانات من القيم مباشرة (يستخدم أيضاً في الحفظ الجماعي)"""
+        if status in ['absent', 'withdrawn']:
             # للغياب والانسحاب: يجب وجود المحضر
-            if self.report_file:
-                self.data_completeness = 'complete'
-            else:
-                self.data_completeness = 'incomplete'
-        elif self.status == 'present':
+            return 'complete' if report_file else 'incomplete'
+        elif status == 'present':
             # للحضور: يجب وجود أوقات الدخول والخروج
-            if self.check_in and self.check_out:
-                self.data_completeness = 'complete'
-            else:
-                self.data_completeness = 'incomplete'
-        else:
-            self.data_completeness = 'incomplete'
-        
-        return self.data_completeness
+            return 'complete' if check_in and check_out else 'incomplete'
+        return 'incomplete'
 
 # إضافة نموذج جديد لأوقات الورديات
 class ShiftTime(db.Model):
@@ -579,4 +597,100 @@ class NotificationSettings(db.Model):
             settings = NotificationSettings(user_id=user_id)
             db.session.add(settings)
             db.session.commit()
-        return settings
\ No newline at end of file
+        return settings
+class Job(db.Model):
+    __tablename__ = 'jobs'
+    
+    id = db.Column(db.String(32), primary_key=True)  # معرف عشوائي (uuid)
+    job_type = db.Column(db.String(50), nullable=False)  # نوع المهمة (import_employees, export_employees...)
+    params = db.Column(db.Text)  # معاملات المهمة بصيغة JSON
+    
+    # الحالة: queued, running, succeeded, failed
+    status = db.Column(db.String(20), default='queued')
+    progress = db.Column(db.Integer, default=0)  # نسبة الإنجاز
+    message = db.Column(db.Text)  # آخر رسالة أو ملخص النتيجة
+    error = db.Column(db.Text)
+    
+    # ملف النتيجة (للتصدير)
+    result_path = db.Column(db.String(500))
+    result_name = db.Column(db.String(200))
+    result_mimetype = db.Column(db.String(100))
+    
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'))
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)  # آخر تحديث للحالة أو الإنجاز
+    
+    @property
+    def is_finished(self):
+        return self.status in ('succeeded', 'failed')
+    
+    def to_dict(self):
+        """تحويل المهمة إلى قاموس"""
+        return {
+            'id': self.id,
+            'type': self.job_type,
+            'status': self.status,
+            'progress': self.progress or 0,
+            'message': self.message,
+            'error': self.error,
+            'has_result': bool(self.result_path),
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+class BackupLog(db.Model):
+    __tablename__ = 'backup_logs'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(200), nullable=False)
+    backend = db.Column(db.String(20))  # sqlite أو postgresql
+    compression = db.Column(db.String(10))  # gzip أو zstd
+    raw_size = db.Column(db.BigInteger)  # حجم قاعدة البيانات قبل الضغط (بالبايت)
+    size = db.Column(db.BigInteger)  # حجم الملف المضغوط (بالبايت)
+    duration = db.Column(db.Float)  # مدة النسخ بالثواني
+    location = db.Column(db.String(50))  # مكان الحفظ (google_drive...)
+    remote_id = db.Column(db.String(200))  # معرف الملف في مكان الحفظ
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    @property
+    def size_mb(self):
+        return round((self.size or 0) / (1024 * 1024), 2)
+
+class ScheduledTaskRun(db.Model):
+    __tablename__ = 'scheduled_task_runs'
+    
+    name = db.Column(db.String(50), primary_key=True)  # اسم المهمة الدورية
+    last_run_at = db.Column(db.DateTime)  # وقت آخر تشغيل (بالتوقيت المحلي للخادم)
+    last_finished_at = db.Column(db.DateTime)
+    last_status = db.Column(db.String(20))  # running, succeeded, failed
+    last_message = db.Column(db.Text)  # ملخص النتيجة أو رسالة الخطأ
+    last_duration = db.Column(db.Float)  # المدة بالثواني
+    next_run_at = db.Column(db.DateTime)  # الموعد القادم المحسوب (للعرض فقط)
+    run_count = db.Column(db.Integer, default=0)
+    
+    def __repr__(self):
+        return f'<ScheduledTaskRun {self.name}: {self.last_status}>'
+
+class IdCounter(db.Model):
+    __tablename__ = 'id_counters'
+    
+    name = db.Column(db.String(50), primary_key=True)  # اسم العداد (employee_id، roles_version)
+    value = db.Column(db.BigInteger, nullable=False)  # للأرقام الوظيفية: أول موقع لم يحجز بعد
+    
+    def __repr__(self):
+        return f'<IdCounter {self.name}: {self.value}>'
+
+class Role(db.Model):
+    __tablename__ = 'roles'
+    
+    key = db.Column(db.String(50), primary_key=True)  # مفتاح الدور (يحفظ في User.role)
+    name = db.Column(db.String(100), nullable=False)
+    modules = db.Column(db.Text, nullable=False)  # صلاحيات الوحدات بصيغة JSON
+    is_system = db.Column(db.Boolean, default=False)  # الأدوار الأساسية لا يمكن حذفها
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def __repr__(self):
+        return f'<Role {self.key}>'
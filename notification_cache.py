@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event, func
+from sqlalchemy.orm import Session, object_session
+
+from models import db, Notification
+
+try:
+    import redis
+except ImportError:  # Redis اختياري
+    redis = None
+
+DEFAULT_TTL = 60  # بالثواني، حد أقصى لعدم التطابق بين العمليات بدون Redis
+RECENT_LIMIT = 10  # عدد الإشعارات الأخيرة المحفوظة لكل مستخدم
+
+
+class NotificationCache:
+    """عداد الإشعارات غير المقروءة وآخر الإشعارات لكل مستخدم
+
+    تتم إعادة البناء من قاعدة البيانات فقط بعد أي تعديل على إشعارات
+    المستخدم أو عند انتهاء صلاحية أحد الإشعارات المعروضة.
+    """
+
+    def __init__(self, ttl=DEFAULT_TTL, redis_url=None):
+        self._local = {}
+        self._lock = threading.Lock()
+        self._listeners = []
+        self.configure(ttl, redis_url)
+
+    def configure(self, ttl=DEFAULT_TTL, redis_url=None):
+        self.ttl = ttl
+        self._redis = None
+        if redis_url and redis is not None:
+            try:
+                self._redis = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+            except Exception as e:
+                print(f"تحذير: تعذر الاتصال بـ Redis لعدادات الإشعارات: {e}")
+        with self._lock:
+            self._local.clear()
+
+    def _load(self, user_id):
+        """حساب حالة المستخدم من قاعدة البيانات (استعلامان فقط)"""
+        now = datetime.utcnow()
+        not_expired = db.or_(Notification.expires_at.is_(None), Notification.expires_at > now)
+
+        unread_count, next_unread_expiry = db.session.query(
+            func.count(Notification.id),
+            func.min(Notification.expires_at)
+        ).filter(
+            Notification.user_id == user_id,
+            Notification.is_read == False,
+            Notification.is_dismissed == False,
+            not_expired
+        ).one()
+
+        recent = Notification.get_user_notifications(user_id, limit=RECENT_LIMIT)
+
+        expiries = [n.expires_at for n in recent if n.expires_at]
+        if next_unread_expiry:
+            expiries.append(next_unread_expiry)
+
+        return {
+            'unread_count': unread_count,
+            'recent': [n.to_dict() for n in recent],
+            'next_expiry': min(expiries).isoformat() if expiries else None
+        }
+
+    def _fresh(self, state):
+        if not state['next_expiry']:
+            return True
+        return datetime.fromisoformat(state['next_expiry']) > datetime.utcnow()
+
+    def get(self, user_id):
+        """حالة المستخدم: {'unread_count', 'recent', 'next_expiry'}"""
+        key = f'raizo:notifications:{user_id}'
+        if self._redis:
+            try:
+                cached = self._redis.get(key)
+                if cached is not None:
+                    state = json.loads(cached)
+                    if self._fresh(state):
+                        return state
+            except Exception:
+                pass
+        else:
+            now = time.monotonic()
+            with self._lock:
+                entry = self._local.get(user_id)
+            if entry and entry[0] > now and self._fresh(entry[1]):
+                return entry[1]
+
+        state = self._load(user_id)
+        if self._redis:
+            try:
+                self._redis.set(key, json.dumps(state, ensure_ascii=False), ex=self.ttl)
+                return state
+            except Exception:
+                pass
+        with self._lock:
+            self._local[user_id] = (time.monotonic() + self.ttl, state)
+        return state
+
+    def unread_count(self, user_id):
+        return self.get(user_id)['unread_count']
+
+    def recent(self, user_id, limit=5):
+        return self.get(user_id)['recent'][:limit]
+
+    def add_listener(self, callback):
+        """تسجيل دالة تستدعى بقائمة المستخدمين بعد كل إبطال"""
+        self._listeners.append(callback)
+
+    def invalidate(self, *user_ids):
+        """إبطال حالة مستخدمين محددين (أو الجميع إذا لم يحدد أحد)"""
+        with self._lock:
+            if user_ids:
+                for user_id in user_ids:
+                    self._local.pop(user_id, None)
+            else:
+                self._local.clear()
+        if self._redis:
+            try:
+                if user_ids:
+                    self._redis.delete(*[f'raizo:notifications:{u}' for u in user_ids])
+                else:
+                    for key in self._redis.scan_iter('raizo:notifications:*'):
+                        self._redis.delete(key)
+            except Exception as e:
+                print(f"تحذير: تعذر إبطال عدادات الإشعارات في Redis: {e}")
+        for callback in self._listeners:
+            try:
+                callback(list(user_ids))
+            except Exception as e:
+                print(f"خطأ في إشعار المستمعين بتغير الإشعارات: {e}")
+
+
+notification_cache = NotificationCache()
+
+
+def init_notification_cache(app):
+    """تهيئة كاش الإشعارات من إعدادات التطبيق"""
+    notification_cache.configure(
+        ttl=app.config.get('NOTIFICATION_CACHE_TTL', DEFAULT_TTL),
+        redis_url=app.config.get('NOTIFICATION_CACHE_REDIS_URL')
+    )
+
+
+def mark_users_dirty(session, user_ids):
+    """تسجيل مستخدمين لإبطال حالتهم بعد commit (للإدراج الجماعي الذي لا يمر بأحداث النموذج)"""
+    session.info.setdefault('notification_dirty_users', set()).update(user_ids)
+
+
+def _mark_user_dirty(mapper, connection, target):
+    session = object_session(target)
+    if session is not None and target.user_id:
+        mark_users_dirty(session, [target.user_id])
+
+
+event.listen(Notification, 'after_insert', _mark_user_dirty)
+event.listen(Notification, 'after_update', _mark_user_dirty)
+event.listen(Notification, 'after_delete', _mark_user_dirty)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_after_commit(session):
+    users = session.info.pop('notification_dirty_users', None)
+    if users:
+        notification_cache.invalidate(*users)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_after_rollback(session):
+    session.info.pop('notification_dirty_users', None)
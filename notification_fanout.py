@@ -0,0 +1,88 @@
+import threading
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import insert, select
+from sqlalchemy.orm import Query
+
+from models import db, User, Notification
+from notification_cache import mark_users_dirty
+
+# عدد الصفوف في كل جملة إدراج
+CHUNK_SIZE = 1000
+
+# عند تجاوز هذا العدد من المستلمين يتم الإرسال في الخلفية
+BACKGROUND_THRESHOLD = 2000
+
+
+def _recipient_ids(recipients):
+    """معرفات المستلمين من قائمة أدوار أو استعلام مستخدمين (None = جميع المستخدمين)"""
+    if recipients is None:
+        stmt = select(User.id)
+    elif isinstance(recipients, (list, tuple, set)):
+        stmt = select(User.id).where(User.role.in_(list(recipients)))
+    elif isinstance(recipients, Query):
+        stmt = recipients.with_entities(User.id).order_by(None).statement
+    else:
+        stmt = recipients.with_only_columns(User.id).order_by(None)
+    return list(db.session.scalars(stmt))
+
+
+def _insert_notifications(user_ids, values):
+    """إدراج الإشعارات لجميع المستلمين في معاملة واحدة"""
+    created_at = datetime.utcnow()
+    for start in range(0, len(user_ids), CHUNK_SIZE):
+        db.session.execute(insert(Notification), [
+            dict(values, user_id=user_id, is_read=False, is_dismissed=False, created_at=created_at)
+            for user_id in user_ids[start:start + CHUNK_SIZE]
+        ])
+    # الإدراج الجماعي لا يمر بأحداث النموذج، لذا نسجل المستخدمين لتحديث عداداتهم
+    mark_users_dirty(db.session, user_ids)
+    db.session.commit()
+
+
+def _run_in_background(app, user_ids, values):
+    with app.app_context():
+        try:
+            _insert_notifications(user_ids, values)
+        except Exception as e:
+            db.session.rollback()
+            print(f"خطأ في إرسال الإشعارات في الخلفية: {e}")
+
+
+def fan_out_notification(recipients, title, message, notification_type='info',
+                         priority='normal', action_url=None, action_text=None,
+                         expires_at=None, source_type=None, source_id=None, background=None):
+    """إرسال نفس الإشعار لمجموعة من المستخدمين دفعة واحدة
+
+    recipients: قائمة أدوار مثل ['admin', 'hr']، أو استعلام مستخدمين،
+    أو None لجميع المستخدمين. يعيد عدد المستلمين.
+    background: None يعني الإرسال في الخلفية تلقائياً للجماهير الكبيرة.
+    """
+    user_ids = _recipient_ids(recipients)
+    if not user_ids:
+        return 0
+
+    values = {
+        'title': title,
+        'message': message,
+        'notification_type': notification_type,
+        'priority': priority,
+        'action_url': action_url,
+        'action_text': action_text,
+        'expires_at': expires_at,
+        'source_type': source_type,
+        'source_id': source_id
+    }
+
+    if background is None:
+        background = len(user_ids) > BACKGROUND_THRESHOLD
+
+    if background:
+        app = current_app._get_current_object()
+        threading.Thread(
+            target=_run_in_background, args=(app, user_ids, values), daemon=True
+        ).start()
+    else:
+        _insert_notifications(user_ids, values)
+    return len(user_ids)
@@ -0,0 +1,184 @@
+import json
+import threading
+import time
+
+from notification_cache import notification_cache
+
+try:
+    import redis
+except ImportError:  # Redis اختياري
+    redis = None
+
+CHANNEL = 'raizo:notifications:events'
+
+DEFAULT_HEARTBEAT = 15  # ثوانٍ بين رسائل الإبقاء على الاتصال
+DEFAULT_STREAM_TIMEOUT = 300  # يعيد المتصفح الاتصال تلقائياً بعد انتهاء المدة
+DEFAULT_MAX_CLIENTS = 50  # الحد الأقصى للاتصالات المفتوحة في كل عملية
+DEFAULT_THREADS = 16  # خيوط عامل gunicorn (--threads)
+DEFAULT_RESERVED_THREADS = 8  # خيوط لا يأخذها البث أبداً
+
+
+class NotificationBroker:
+    """موزع أحداث الإشعارات بين الطلبات المفتوحة
+
+    يحتفظ برقم إصدار لكل مستخدم ويوقظ الاتصالات المنتظرة عند تغيره.
+    مع Redis تُنشر الأحداث لجميع العمليات عبر pub/sub.
+    """
+
+    def __init__(self):
+        self._versions = {}
+        self._condition = threading.Condition()
+        self._clients = 0
+        self._redis = None
+        self._listener = None
+        self.configure()
+
+    def configure(self, redis_url=None, max_clients=DEFAULT_MAX_CLIENTS):
+        self.max_clients = max_clients
+        self._redis = None
+        if redis_url and redis is not None:
+            try:
+                self._redis = redis.Redis.from_url(redis_url)
+            except Exception as e:
+                print(f"تحذير: تعذر الاتصال بـ Redis لأحداث الإشعارات: {e}")
+    
+    @property
+    def shared(self):
+        """هل تصل الأحداث من العمليات الأخرى (Redis)"""
+        return self._redis is not None
+
+    def version(self, user_id):
+        with self._condition:
+            return self._versions.get(user_id, 0)
+
+    def _notify_local(self, user_ids):
+        with self._condition:
+            for user_id in user_ids:
+                self._versions[user_id] = self._versions.get(user_id, 0) + 1
+            self._condition.notify_all()
+
+    def publish(self, user_ids):
+        """إعلام الاتصالات المفتوحة بتغير إشعارات مستخدمين محددين"""
+        user_ids = [u for u in user_ids if u is not None]
+        if not user_ids:
+            return
+        if self._redis:
+            try:
+                # تصل الرسالة لهذه العملية أيضاً عبر المستمع
+                self._redis.publish(CHANNEL, json.dumps(user_ids))
+                if self._listener and self._listener.is_alive():
+                    return
+            except Exception as e:
+                print(f"تحذير: تعذر نشر حدث الإشعارات في Redis: {e}")
+        self._notify_local(user_ids)
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self._redis.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(CHANNEL)
+                for message in pubsub.listen():
+                    try:
+                        self._notify_local(json.loads(message['data']))
+                    except (ValueError, TypeError):
+                        continue
+            except Exception as e:
+                print(f"خطأ في مستمع أحداث الإشعارات: {e}")
+                time.sleep(5)
+
+    def _ensure_listener(self):
+        # يبدأ المستمع عند أول اتصال فقط وليس عند استيراد الوحدة
+        if self._redis and (self._listener is None or not self._listener.is_alive()):
+            with self._condition:
+                if self._listener is None or not self._listener.is_alive():
+                    self._listener = threading.Thread(
+                        target=self._listen, name='notification-events', daemon=True
+                    )
+                    self._listener.start()
+
+    def acquire(self):
+        """حجز مكان لاتصال جديد، ويعيد False عند تجاوز الحد"""
+        with self._condition:
+            if self._clients >= self.max_clients:
+                return False
+            self._clients += 1
+        self._ensure_listener()
+        return True
+
+    def release(self):
+        with self._condition:
+            self._clients = max(self._clients - 1, 0)
+
+    def wait(self, user_id, last_version, timeout):
+        """الانتظار حتى يتغير إصدار المستخدم أو تنتهي المهلة، ويعيد الإصدار الحالي"""
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while self._versions.get(user_id, 0) == last_version:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+            return self._versions.get(user_id, 0)
+
+
+broker = NotificationBroker()
+
+# أي إبطال لحالة المستخدم في الكاش يعني وجود تغيير يجب دفعه
+notification_cache.add_listener(broker.publish)
+
+
+def stream_slots(max_clients, threads, reserved):
+    """عدد الاتصالات المسموح بها في العملية: أقل دائماً من خيوطها بعدد الخيوط المحجوزة"""
+    return max(0, min(max_clients, threads - reserved))
+
+
+def _multi_process(app):
+    # إشعارات تكتبها عملية أخرى: عمال ويب آخرون أو مجدول مستقل أو عمال celery
+    return (
+        app.config.get('WEB_WORKERS', 1) > 1
+        or not app.config.get('SCHEDULER_ENABLED', True)
+        or app.config.get('JOBS_BACKEND') == 'celery'
+    )
+
+
+def init_notification_push(app):
+    """تهيئة قناة الإشعارات الفورية من إعدادات التطبيق
+
+    بدون Redis مع أكثر من عملية لا تصل أحداث العمليات الأخرى للاتصالات المفتوحة،
+    لذلك يرفض البث ويعود المتصفح للاستعلام الدوري.
+    """
+    slots = stream_slots(
+        app.config.get('NOTIFICATION_STREAM_MAX_CLIENTS', DEFAULT_MAX_CLIENTS),
+        app.config.get('WEB_THREADS', DEFAULT_THREADS),
+        app.config.get('NOTIFICATION_STREAM_RESERVED_THREADS', DEFAULT_RESERVED_THREADS)
+    )
+    broker.configure(redis_url=app.config.get('NOTIFICATION_PUSH_REDIS_URL'), max_clients=slots)
+    if not broker.shared and _multi_process(app):
+        print("تحذير: البث المباشر للإشعارات يحتاج Redis مع أكثر من عملية، سيتم الاستعلام الدوري")
+        broker.max_clients = 0
+
+
+def _sse(data, event=None):
+    payload = json.dumps(data, ensure_ascii=False)
+    return (f'event: {event}\n' if event else '') + f'data: {payload}\n\n'
+
+
+def notification_stream(user_id, load_state, heartbeat=DEFAULT_HEARTBEAT, timeout=DEFAULT_STREAM_TIMEOUT):
+    """مولد أحداث SSE: يرسل الحالة الحالية ثم كل تغيير في العداد أو الإشعارات
+
+    load_state: دالة تعيد {'unread_count', 'notifications'} للمستخدم.
+    يجب استدعاء broker.acquire() قبل البدء و broker.release() عند إغلاق الاستجابة.
+    """
+    yield f'retry: {heartbeat * 1000}\n'
+    version = broker.version(user_id)
+    yield _sse(load_state())
+
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        current = broker.wait(user_id, version, min(heartbeat, deadline - time.monotonic()))
+        if current != version:
+            version = current
+            yield _sse(load_state())
+        else:
+            yield ': keep-alive\n\n'
+    yield _sse({}, event='reconnect')
@@ -0,0 +1,159 @@
+import base64
+import binascii
+import json
+import math
+import threading
+import time
+from datetime import date, datetime
+
+from flask import request, url_for
+from sqlalchemy import tuple_
+
+DEFAULT_PER_PAGE = 20
+
+# مدة تخزين العدد التقريبي للسجلات (بالثواني)
+TOTAL_CACHE_TTL = 60
+
+_total_cache = {}
+_total_cache_lock = threading.Lock()
+
+
+class KeysetPage:
+    """صفحة نتائج بالتقسيم حسب المفتاح (بدون OFFSET)"""
+
+    def __init__(self, items, page, per_page, next_cursor, prev_cursor, total=None):
+        self.items = items
+        self.page = page
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+    @property
+    def pages(self):
+        """عدد الصفحات التقريبي (None إذا لم يطلب العدد الإجمالي)"""
+        if self.total is None:
+            return None
+        return max(1, math.ceil(self.total / self.per_page))
+
+    def iter_pages(self):
+        """أرقام الصفحات المتاحة للتنقل: السابقة والحالية والتالية مع رابط كل منها"""
+        if self.has_prev:
+            yield self.page - 1, self.prev_cursor
+        yield self.page, None
+        if self.has_next:
+            yield self.page + 1, self.next_cursor
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    if isinstance(value, date):
+        return {'d': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict):
+        if 'dt' in value:
+            return datetime.fromisoformat(value['dt'])
+        if 'd' in value:
+            return date.fromisoformat(value['d'])
+    return value
+
+
+def encode_cursor(values, direction, page):
+    payload = {'k': [_encode_value(v) for v in values], 'd': direction, 'p': page}
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """فك المؤشر، ويعيد None إذا كان غير صالح"""
+    if not cursor:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        payload = json.loads(raw)
+        values = [_decode_value(v) for v in payload['k']]
+        if payload['d'] not in ('next', 'prev'):
+            return None
+        return values, payload['d'], max(int(payload.get('p', 1)), 1)
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        return None
+
+
+def approximate_total(query, ttl=TOTAL_CACHE_TTL):
+    """عدد السجلات مع تخزين مؤقت قصير بدلاً من COUNT(*) في كل صفحة"""
+    compiled = query.statement.compile()
+    key = (str(compiled), repr(sorted(compiled.params.items())))
+    now = time.monotonic()
+    with _total_cache_lock:
+        cached = _total_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+    total = query.order_by(None).count()
+    with _total_cache_lock:
+        for expired_key in [k for k, (expires, _) in _total_cache.items() if expires <= now]:
+            del _total_cache[expired_key]
+        _total_cache[key] = (now + ttl, total)
+    return total
+
+
+def keyset_paginate(query, order_columns, cursor=None, per_page=DEFAULT_PER_PAGE, with_total=False):
+    """تقسيم النتائج إلى صفحات حسب المفتاح بترتيب تنازلي
+
+    order_columns: أعمدة الترتيب (تنازلياً)، ويجب أن ينتهي بعمود فريد مثل id
+    مثال: [Employee.id] أو [Notification.created_at, Notification.id]
+    """
+    decoded = decode_cursor(cursor)
+    keys = tuple_(*order_columns) if len(order_columns) > 1 else order_columns[0]
+    total = approximate_total(query) if with_total else None
+
+    if decoded:
+        values, direction, page = decoded
+        bound = tuple_(*values) if len(values) > 1 else values[0]
+        if direction == 'next':
+            query = query.filter(keys < bound).order_by(*[c.desc() for c in order_columns])
+        else:
+            query = query.filter(keys > bound).order_by(*[c.asc() for c in order_columns])
+    else:
+        direction, page = 'next', 1
+        query = query.order_by(*[c.desc() for c in order_columns])
+
+    rows = query.limit(per_page + 1).all()
+    has_more = len(rows) > per_page
+    items = rows[:per_page]
+    if direction == 'prev':
+        items.reverse()
+
+    def key_of(item):
+        return [getattr(item, column.key) for column in order_columns]
+
+    next_cursor = prev_cursor = None
+    if items:
+        # في الاتجاه العكسي يدل وجود سجل إضافي على وجود صفحات سابقة أخرى
+        if (direction == 'next' and has_more) or direction == 'prev':
+            next_cursor = encode_cursor(key_of(items[-1]), 'next', page + 1)
+        if page > 1 and (direction == 'next' or has_more):
+            prev_cursor = encode_cursor(key_of(items[0]), 'prev', page - 1)
+
+    return KeysetPage(items, page, per_page, next_cursor, prev_cursor, total)
+
+
+def cursor_url(endpoint, cursor=None):
+    """رابط الصفحة مع الإبقاء على معاملات البحث الحالية"""
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    args.pop('page', None)
+    if cursor:
+        args['cursor'] = cursor
+    return url_for(endpoint, **args)
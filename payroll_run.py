@@ -0,0 +1,130 @@
+import calendar
+from datetime import date
+
+import pandas as pd
+from sqlalchemy import case, func, insert, select
+
+from models import db, Employee, Attendance, Payroll
+
+# عدد الصفوف في كل جملة إدراج
+CHUNK_SIZE = 1000
+
+# حالات الحضور المحتسبة كأيام حضور (المتأخر يعتبر حاضراً)
+PRESENT_STATUSES = ('present', 'late')
+
+# نفس القيم الافتراضية لنموذج كشف الراتب
+DEFAULT_OVERTIME_RATE = 1.5
+
+
+def _attendance_totals(period_from, period_to, employee_ids):
+    """أيام الحضور والغياب والانسحاب لكل موظف في استعلام GROUP BY واحد"""
+    def days(*statuses):
+        return func.sum(case((Attendance.status.in_(statuses), 1), else_=0))
+
+    stmt = select(
+        Attendance.employee_id,
+        days(*PRESENT_STATUSES).label('present_days'),
+        days('absent').label('absent_days'),
+        days('withdrawn').label('withdrawal_days')
+    ).where(
+        Attendance.date.between(period_from, period_to)
+    ).group_by(Attendance.employee_id)
+    if employee_ids is not None:
+        stmt = stmt.where(Attendance.employee_id.in_(employee_ids))
+    return pd.DataFrame(
+        db.session.execute(stmt).all(),
+        columns=['employee_id', 'present_days', 'absent_days', 'withdrawal_days']
+    ).astype('int64')
+
+
+def calculate_payroll_frame(frame):
+    """نفس معادلات Payroll.calculate_detailed_salary على أعمدة DataFrame
+
+    يجب الإبقاء على ترتيب العمليات كما هو حتى تتطابق النتائج تماماً.
+    """
+    frame['daily_salary'] = frame['basic_salary'] / 30
+    frame['due_salary'] = frame['daily_salary'] * frame['present_days']
+    frame['overtime_due'] = frame['overtime_days'] * frame['daily_salary'] * frame['overtime_rate']
+    frame['total_salary'] = (
+        frame['due_salary'] +
+        frame['overtime_due'] +
+        frame['housing_allowance'] +
+        frame['transport_allowance'] +
+        frame['other_allowances']
+    )
+    frame['absence_deduction'] = frame['absent_days'] * frame['daily_salary']
+    frame['withdrawal_deduction'] = frame['withdrawal_days'] * frame['daily_salary']
+    frame['total_deductions'] = (
+        frame['advance_deduction'] +
+        frame['violation_deduction'] +
+        frame['absence_deduction'] +
+        frame['withdrawal_deduction'] +
+        frame['insurance_deduction'] +
+        frame['tax_deduction'] +
+        frame['other_deductions']
+    )
+    frame['net_salary'] = frame['total_salary'] - frame['total_deductions']
+    frame['gross_salary'] = frame['total_salary']
+    return frame
+
+
+def run_payroll(month, year, employee_ids=None):
+    """إنشاء كشوف رواتب (مسودة) لجميع الموظفين النشطين لشهر محدد من سجلات الحضور
+
+    يتم تخطي الموظفين الذين لديهم كشف راتب لنفس الشهر مسبقاً، والموظفين بدون راتب أساسي.
+    يعيد قاموساً بعدد الكشوف المنشأة والمتخطاة والموظفين بدون راتب. لا يقوم بعمل commit.
+    """
+    period_days = calendar.monthrange(year, month)[1]
+    period_from = date(year, month, 1)
+    period_to = date(year, month, period_days)
+
+    employees_stmt = select(Employee.id, Employee.salary).where(Employee.status == 'active')
+    if employee_ids is not None:
+        employees_stmt = employees_stmt.where(Employee.id.in_(employee_ids))
+    employees = pd.DataFrame(
+        db.session.execute(employees_stmt).all(), columns=['employee_id', 'basic_salary']
+    )
+
+    existing = set(db.session.scalars(
+        select(Payroll.employee_id).where(Payroll.month == month, Payroll.year == year)
+    ))
+    skipped = int(employees['employee_id'].isin(existing).sum())
+    employees = employees[~employees['employee_id'].isin(existing)]
+
+    # راتب فارغ (بيانات قديمة) يعطي NaN في كل المبالغ، لذلك يتخطى ولا ينشأ له كشف
+    missing_salary = employees['basic_salary'].isna()
+    no_salary = int(missing_salary.sum())
+    if no_salary:
+        print(f"تحذير: تم تخطي {no_salary} موظف بدون راتب أساسي في مسير {month}/{year}: "
+              f"{employees.loc[missing_salary, 'employee_id'].tolist()}")
+        employees = employees[~missing_salary]
+    if employees.empty:
+        return {'created': 0, 'skipped': skipped, 'no_salary': no_salary}
+
+    totals = _attendance_totals(period_from, period_to, employee_ids)
+    frame = employees.merge(totals, on='employee_id', how='left')
+    for name in ('present_days', 'absent_days', 'withdrawal_days'):
+        frame[name] = frame[name].fillna(0).astype(int)
+    frame['basic_salary'] = frame['basic_salary'].astype(float)
+
+    frame['overtime_days'] = 0.0
+    frame['overtime_rate'] = DEFAULT_OVERTIME_RATE
+    for name in ('housing_allowance', 'transport_allowance', 'other_allowances',
+                 'advance_deduction', 'violation_deduction', 'insurance_deduction',
+                 'tax_deduction', 'other_deductions'):
+        frame[name] = 0.0
+
+    calculate_payroll_frame(frame)
+
+    frame['month'] = month
+    frame['year'] = year
+    frame['period_from'] = period_from
+    frame['period_to'] = period_to
+    frame['period_days'] = period_days
+    frame['status'] = 'draft'
+
+    rows = frame.to_dict('records')
+    for start in range(0, len(rows), CHUNK_SIZE):
+        db.session.execute(insert(Payroll), rows[start:start + CHUNK_SIZE])
+
+    return {'created': len(rows), 'skipped': skipped, 'no_salary': no_salary}
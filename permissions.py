@@ -0,0 +1,342 @@
+import json
+import os
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+from flask import g, has_request_context
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+
+from models import db, IdCounter, Role
+
+# تعريف جميع الوحدات والحقول في النظام
+SYSTEM_MODULES = {
+    'employees': {
+        'name': 'إدارة الموظفين',
+        'icon': 'fas fa-users',
+        'fields': {
+            'basic_info': {
+                'name': 'البيانات الأساسية',
+                'fields': ['employee_photo', 'name_arabic', 'name_english', 'national_id', 'birth_date', 'nationality', 'gender']
+            },
+            'contact_info': {
+                'name': 'بيانات التواصل',
+                'fields': ['phone', 'additional_phone', 'email', 'address', 'emergency_phone']
+            },
+            'contract_info': {
+                'name': 'بيانات العقد',
+                'fields': ['salary', 'contract_signing_date', 'contract_end_date', 'job_title', 'contract_type']
+            },
+            'work_info': {
+                'name': 'بيانات العمل',
+                'fields': ['department', 'center', 'square', 'camp_number', 'work_shift', 'employee_type']
+            },
+            'bank_info': {
+                'name': 'البيانات البنكية',
+                'fields': ['bank_type', 'iban_number', 'additional_bank', 'beneficiary_name']
+            }
+        }
+    },
+    'documents': {
+        'name': 'إدارة المستندات',
+        'icon': 'fas fa-file-pdf',
+        'fields': {
+            'document_info': {
+                'name': 'معلومات المستند',
+                'fields': ['document_name', 'document_file', 'department', 'category', 'description']
+            },
+            'employee_link': {
+                'name': 'ربط الموظف',
+                'fields': ['employee_id', 'employee_name', 'employee_number']
+            },
+            'security': {
+                'name': 'الأمان',
+                'fields': ['is_confidential', 'status']
+            }
+        }
+    },
+    'attendance': {
+        'name': 'الحضور والغياب',
+        'icon': 'fas fa-clock',
+        'fields': {
+            'time_tracking': {
+                'name': 'تتبع الوقت',
+                'fields': ['check_in', 'check_out', 'break_start', 'break_end']
+            },
+            'status_info': {
+                'name': 'معلومات الحالة',
+                'fields': ['status', 'notes', 'date']
+            }
+        }
+    },
+    'payroll': {
+        'name': 'كشوف الرواتب',
+        'icon': 'fas fa-money-bill-wave',
+        'fields': {
+            'salary_components': {
+                'name': 'مكونات الراتب',
+                'fields': ['basic_salary', 'housing_allowance', 'transport_allowance', 'other_allowances']
+            },
+            'deductions': {
+                'name': 'الخصومات',
+                'fields': ['insurance_deduction', 'tax_deduction', 'other_deductions']
+            },
+            'working_hours': {
+                'name': 'ساعات العمل',
+                'fields': ['regular_hours', 'overtime_hours', 'overtime_rate']
+            }
+        }
+    },
+    'assets': {
+        'name': 'إدارة الأصول',
+        'icon': 'fas fa-laptop',
+        'fields': {
+            'asset_info': {
+                'name': 'معلومات الأصل',
+                'fields': ['asset_id', 'name', 'description', 'category', 'value']
+            },
+            'assignment_info': {
+                'name': 'معلومات التخصيص',
+                'fields': ['employee_id', 'assigned_date', 'return_date', 'condition', 'status']
+            }
+        }
+    },
+    'recruitment': {
+        'name': 'التوظيف',
+        'icon': 'fas fa-user-plus',
+        'fields': {
+            'applicant_info': {
+                'name': 'معلومات المتقدم',
+                'fields': ['first_name', 'last_name', 'email', 'phone', 'position_applied']
+            },
+            'qualifications': {
+                'name': 'المؤهلات',
+                'fields': ['education', 'experience_years', 'skills', 'cover_letter']
+            }
+        }
+    },
+    'users': {
+        'name': 'إدارة المستخدمين',
+        'icon': 'fas fa-user-cog',
+        'fields': {
+            'user_info': {
+                'name': 'معلومات المستخدم',
+                'fields': ['username', 'email', 'role', 'created_at']
+            }
+        }
+    }
+}
+
+# الأدوار الأساسية وصلاحياتها (تنشأ في جدول الأدوار عند أول تشغيل ولا يمكن حذفها)
+DEFAULT_ROLES = {
+    'admin': {
+        'name': 'مدير النظام',
+        'modules': {
+            'employees': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'attendance': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'payroll': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'assets': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'recruitment': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'documents': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'users': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'}
+        }
+    },
+    'manager': {
+        'name': 'مدير',
+        'modules': {
+            'employees': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': ['basic_info', 'contact_info', 'work_info']},
+            'attendance': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'payroll': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': ['salary_components', 'working_hours']},
+            'assets': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'recruitment': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'documents': {'view': True, 'add': True, 'edit': True, 'delete': True, 'fields': 'all'},
+            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
+        }
+    },
+    'hr': {
+        'name': 'موارد بشرية',
+        'modules': {
+            'employees': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': ['basic_info', 'contact_info', 'contract_info', 'work_info']},
+            'attendance': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': 'all'},
+            'payroll': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': ['salary_components']},
+            'assets': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': 'all'},
+            'recruitment': {'view': True, 'add': True, 'edit': True, 'delete': False, 'fields': 'all'},
+            'documents': {'view': True, 'add': True, 'edit': False, 'delete': False, 'fields': 'all'},
+            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
+        }
+    },
+    'employee': {
+        'name': 'موظف',
+        'modules': {
+            'employees': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': ['basic_info', 'contact_info']},
+            'attendance': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': ['time_tracking', 'status_info']},
+            'payroll': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'assets': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'recruitment': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'documents': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
+        }
+    },
+    'user': {
+        'name': 'مستخدم عادي',
+        'modules': {
+            'employees': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'attendance': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'payroll': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'assets': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'recruitment': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'documents': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []},
+            'users': {'view': False, 'add': False, 'edit': False, 'delete': False, 'fields': []}
+        }
+    }
+}
+
+# الملف الذي كانت تحفظ فيه الأدوار المضافة قبل نقلها إلى قاعدة البيانات
+LEGACY_ROLES_FILE = 'roles_config.json'
+
+# عداد في id_counters يزيد مع كل تعديل على الأدوار
+VERSION_COUNTER = 'roles_version'
+
+ACTION_BITS = {'view': 1, 'add': 2, 'edit': 4, 'delete': 8}
+
+
+class CompiledRole(namedtuple('CompiledRole', ['key', 'name', 'actions', 'fields', 'definition'])):
+    """دور مترجم غير قابل للتعديل
+
+    actions: وحدة -> بتات الإجراءات المسموحة، fields: وحدة -> frozenset بمجموعات الحقول،
+    definition: تعريف الدور الأصلي بصيغة JSON (لصفحة الصلاحيات).
+    """
+    __slots__ = ()
+
+    def allows(self, module, action):
+        return bool(self.actions.get(module, 0) & ACTION_BITS[action])
+
+
+EMPTY_ROLE = CompiledRole(None, '', MappingProxyType({}), MappingProxyType({}), '{}')
+
+
+def compile_role(key, name, modules):
+    """ترجمة صلاحيات دور (بنفس شكل DEFAULT_ROLES) إلى CompiledRole"""
+    actions, fields = {}, {}
+    for module, permissions in modules.items():
+        actions[module] = sum(bit for action, bit in ACTION_BITS.items() if permissions.get(action))
+        allowed = permissions.get('fields') or []
+        if allowed == 'all':
+            allowed = SYSTEM_MODULES.get(module, {}).get('fields', {}).keys()
+        fields[module] = frozenset(allowed)
+    definition = json.dumps({'name': name, 'modules': modules}, ensure_ascii=False)
+    return CompiledRole(key, name, MappingProxyType(actions), MappingProxyType(fields), definition)
+
+
+def _execute(statement):
+    # دائماً على القاعدة الرئيسية حتى ترى كل العمليات آخر تعديل فوراً
+    return db.session.execute(statement, bind_arguments={'bind': db.engine})
+
+
+class PermissionCache:
+    """الأدوار المترجمة من قاعدة البيانات داخل العملية
+
+    كل تعديل على الأدوار يزيد رقم الإصدار في نفس المعاملة، وكل عملية تقارن رقمها
+    بالرقم المحفوظ مرة واحدة لكل طلب وتعيد الترجمة عند اختلافه، فتتفق جميع
+    العمليات على الأدوار. بعد ذلك كل فحص صلاحية هو قراءة من قاموس ثابت.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._roles = MappingProxyType({})
+
+    def _stored_version(self):
+        return _execute(select(IdCounter.value).where(IdCounter.name == VERSION_COUNTER)).scalar() or 0
+
+    def _load(self):
+        rows = _execute(select(Role.key, Role.name, Role.modules).order_by(Role.created_at, Role.key))
+        return MappingProxyType({
+            key: compile_role(key, name, json.loads(modules)) for key, name, modules in rows
+        })
+
+    def roles(self):
+        """قاموس ثابت: مفتاح الدور -> CompiledRole"""
+        if has_request_context() and '_compiled_roles' in g:
+            return g._compiled_roles
+        version = self._stored_version()
+        if version != self._version:
+            # الترجمة بعد قراءة الرقم: أي تعديل بينهما يعاد تحميله في الطلب التالي
+            roles = self._load()
+            with self._lock:
+                self._roles, self._version = roles, version
+        roles = self._roles
+        if has_request_context():
+            g._compiled_roles = roles
+        return roles
+
+    def role(self, key):
+        return self.roles().get(key, EMPTY_ROLE)
+
+    def definitions(self):
+        """تعريفات الأدوار كقواميس عادية (لصفحة الصلاحيات وتحويلها إلى JSON)"""
+        return {key: json.loads(role.definition) for key, role in self.roles().items()}
+
+    def choices(self):
+        """خيارات حقل الدور في نماذج المستخدمين"""
+        return [(key, role.name) for key, role in self.roles().items()]
+
+
+permission_cache = PermissionCache()
+
+
+def bump_version():
+    """زيادة رقم إصدار الأدوار (ضمن معاملة التعديل، يحفظ مع commit)"""
+    stmt = update(IdCounter).where(IdCounter.name == VERSION_COUNTER).values(value=IdCounter.value + 1)
+    if _execute(stmt).rowcount == 0:
+        db.session.add(IdCounter(name=VERSION_COUNTER, value=1))
+
+
+def save_role(key, name, modules, is_system=False):
+    """إضافة أو تعديل دور. لا يقوم بعمل commit"""
+    role = db.session.get(Role, key) or Role(key=key, is_system=is_system)
+    role.name = name
+    role.modules = json.dumps(modules, ensure_ascii=False)
+    db.session.add(role)
+    bump_version()
+    return role
+
+
+def remove_role(key):
+    """حذف دور غير أساسي. يعيد False إذا لم يكن موجوداً. لا يقوم بعمل commit"""
+    role = db.session.get(Role, key)
+    if role is None:
+        return False
+    db.session.delete(role)
+    bump_version()
+    return True
+
+
+def _legacy_roles():
+    if not os.path.exists(LEGACY_ROLES_FILE):
+        return {}
+    try:
+        with open(LEGACY_ROLES_FILE, encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"تحذير: تعذر قراءة ملف الأدوار {LEGACY_ROLES_FILE}: {e}")
+        return {}
+
+
+def ensure_default_roles():
+    """إنشاء الأدوار الأساسية عند أول تشغيل، مع الأدوار المضافة سابقاً في roles_config.json"""
+    if db.session.scalar(select(Role.key).limit(1)) is not None:
+        return False
+    for key, role in DEFAULT_ROLES.items():
+        save_role(key, role['name'], role['modules'], is_system=True)
+    for key, role in _legacy_roles().items():
+        if key not in DEFAULT_ROLES and role.get('name'):
+            save_role(key, role['name'], role.get('modules', {}))
+    try:
+        db.session.commit()
+    except IntegrityError:
+        # أنشأتها عملية أخرى في نفس الوقت
+        db.session.rollback()
+        return False
+    return True
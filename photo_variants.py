@@ -0,0 +1,96 @@
+import os
+import uuid
+
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from config import Config
+
+# المقاس: (العرض، الارتفاع، قص مربع). الصور المصغرة ضعف حجم العرض للشاشات عالية الدقة
+VARIANTS = {
+    'thumb': (128, 128, True),  # قوائم الموظفين (40-60 بكسل)
+    'card': (320, 320, True),  # صفحة الموظف وصفحة التعديل
+    'print': (600, 600, False),  # صفحة الطباعة
+}
+
+FORMATS = {
+    'webp': ('image/webp', {'format': 'WEBP', 'quality': 80, 'method': 4}),
+    'jpg': ('image/jpeg', {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+
+class PhotoError(Exception):
+    """الملف المرفوع ليس صورة يمكن قراءتها"""
+
+
+def variant_path(filename, variant, fmt, folder=None):
+    folder = folder or Config.PHOTO_VARIANTS_FOLDER
+    return os.path.join(folder, variant, f'{filename}.{fmt}')
+
+
+def generate_variants(source_path, folder=None):
+    """إنشاء جميع المقاسات (WebP و JPEG) من صورة مرفوعة
+
+    يتم تدوير الصورة حسب EXIF ثم حفظها بدون بيانات EXIF (الموقع، الجهاز...).
+    يعيد قائمة مسارات الملفات المنشأة، ويرفع PhotoError إذا لم تكن صورة.
+    """
+    filename = os.path.basename(source_path)
+    try:
+        with Image.open(source_path) as image:
+            image = ImageOps.exif_transpose(image)
+            image = image.convert('RGB')
+    except (UnidentifiedImageError, OSError) as e:
+        raise PhotoError(f'تعذر قراءة الصورة {filename}: {e}')
+
+    created = []
+    for variant, (width, height, crop) in VARIANTS.items():
+        if crop:
+            resized = ImageOps.fit(image, (width, height), Image.LANCZOS)
+        else:
+            resized = image.copy()
+            resized.thumbnail((width, height), Image.LANCZOS)
+        for fmt, (_, options) in FORMATS.items():
+            path = variant_path(filename, variant, fmt, folder)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # الحفظ في ملف مؤقت حتى لا يقرأ طلب آخر ملفاً ناقصاً
+            temp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+            resized.save(temp_path, **options)
+            os.replace(temp_path, path)
+            created.append(path)
+    return created
+
+
+def get_variant(filename, variant, fmt, source_folder=None, folder=None):
+    """مسار مقاس محدد لصورة، مع إنشائه عند أول طلب إذا لم يكن موجوداً
+
+    يعيد None إذا لم تكن الصورة الأصلية موجودة.
+    """
+    path = variant_path(filename, variant, fmt, folder)
+    if os.path.exists(path):
+        return path
+    source_folder = source_folder or os.path.join(Config.UPLOAD_FOLDER, 'photos')
+    source_path = os.path.join(source_folder, filename)
+    if not os.path.isfile(source_path):
+        return None
+    generate_variants(source_path, folder)
+    return path
+
+
+def backfill_variants(source_folder=None, folder=None, force=False):
+    """إنشاء المقاسات للصور الموجودة مسبقاً. يعيد (عدد المنشأ، قائمة الأخطاء)"""
+    source_folder = source_folder or os.path.join(Config.UPLOAD_FOLDER, 'photos')
+    created, errors = 0, []
+    for filename in sorted(os.listdir(source_folder)):
+        source_path = os.path.join(source_folder, filename)
+        if not os.path.isfile(source_path):
+            continue
+        if not force and all(
+            os.path.exists(variant_path(filename, variant, fmt, folder))
+            for variant in VARIANTS for fmt in FORMATS
+        ):
+            continue
+        try:
+            generate_variants(source_path, folder)
+            created += 1
+        except PhotoError as e:
+            errors.append(str(e))
+    return created, errors
@@ -0,0 +1,35 @@
+"""استعادة ملفات المرفقات من النسخ الاحتياطية التزايدية
+
+الاستخدام:
+    python restore_files.py                      # عرض اللقطات المتوفرة
+    python restore_files.py latest [المجلد]       # استعادة آخر لقطة
+    python restore_files.py <اسم اللقطة> [المجلد]
+المجلد الافتراضي هو مجلد المرفقات (static/uploads).
+"""
+import sys
+
+from app import app
+from backup_storage import get_backup_storage
+from file_backup import list_file_snapshots, restore_files
+
+
+def main(args):
+    with app.app_context():
+        storage = get_backup_storage()
+        if not args:
+            snapshots = list_file_snapshots(storage)
+            if not snapshots:
+                print("لا توجد لقطات ملفات محفوظة")
+            for name in snapshots:
+                print(name)
+            return
+
+        manifest_name = None if args[0] == 'latest' else args[0]
+        target_dir = args[1] if len(args) > 1 else app.config['UPLOAD_FOLDER']
+        result = restore_files(storage, target_dir, manifest_name=manifest_name)
+        print(f"تمت استعادة اللقطة {result['snapshot']}: "
+              f"{result['restored']} ملف مستعاد، {result['unchanged']} ملف مطابق")
+
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
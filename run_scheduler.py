@@ -0,0 +1,24 @@
+"""تشغيل المهام الدورية في عملية مستقلة عن خادم الويب
+
+الاستخدام:
+    SCHEDULER_ENABLED=false gunicorn wsgi:app ...   # عمال الويب بدون مجدول
+    python run_scheduler.py
+"""
+import time
+
+from app import app
+from scheduler import scheduler, init_scheduler
+
+
+def main():
+    app.config['SCHEDULER_ENABLED'] = True
+    init_scheduler(app)
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        scheduler.stop()
+
+
+if __name__ == '__main__':
+    main()
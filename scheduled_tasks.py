@@ -0,0 +1,137 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import and_, delete, select
+
+from config import Config
+from models import db, Employee, Notification, Settings
+from scheduler import periodic_task
+from jobs import cleanup_jobs, fail_stale_jobs
+from db_backup import backup_database
+from backup_storage import get_backup_storage
+from file_backup import backup_files
+from db_engine import sqlite_maintenance
+from notification_cache import mark_users_dirty
+from notification_fanout import fan_out_notification
+
+BACKUP_INTERVALS = {
+    'daily': timedelta(days=1),
+    'weekly': timedelta(days=7),
+    'monthly': timedelta(days=30),
+}
+
+# الوثائق التي ينبه قبل انتهائها: (نوع المصدر في الإشعار، العمود، اسم الوثيقة)
+EXPIRING_DOCUMENTS = [
+    ('id_expiry', Employee.id_expiry_date, 'الهوية'),
+    ('license_expiry', Employee.license_expiry_date, 'رخصة القيادة'),
+    ('contract_expiry', Employee.contract_end_date, 'العقد'),
+]
+
+
+def backup_interval():
+    """مدة النسخ الاحتياطي التلقائي من الإعدادات (None إذا كان متوقفاً)"""
+    settings = Settings.query.first()
+    if settings is None or not settings.auto_backup:
+        return None
+    return BACKUP_INTERVALS.get(settings.backup_frequency, BACKUP_INTERVALS['weekly'])
+
+
+@periodic_task('database_backup', interval=backup_interval, at_hour=Config.SCHEDULER_BACKUP_HOUR)
+def scheduled_backup():
+    """النسخ الاحتياطي التلقائي لقاعدة البيانات والمرفقات"""
+    storage = get_backup_storage()
+    report = backup_database(storage)
+    message = f'تم إنشاء النسخة الاحتياطية {report["filename"]}'
+    if Config.FILE_BACKUP_ENABLED:
+        files = backup_files(storage)
+        message += f'، وتم رفع {files["uploaded"]} ملف جديد من أصل {files["files"]} مرفق'
+    return message
+
+
+@periodic_task('notification_expiry', interval=timedelta(hours=1))
+def purge_expired_notifications():
+    """حذف الإشعارات المنتهية صلاحيتها"""
+    expired = and_(Notification.expires_at.isnot(None), Notification.expires_at < datetime.utcnow())
+    user_ids = db.session.scalars(select(Notification.user_id).where(expired).distinct()).all()
+    if not user_ids:
+        return 'لا توجد إشعارات منتهية'
+    deleted = db.session.execute(delete(Notification).where(expired)).rowcount
+    # الحذف الجماعي لا يمر بأحداث النموذج، لذلك تبطل عدادات المستخدمين يدوياً
+    mark_users_dirty(db.session, user_ids)
+    db.session.commit()
+    return f'تم حذف {deleted} إشعار منتهي'
+
+
+@periodic_task('document_expiry_scan', interval=timedelta(days=1), at_hour=6)
+def scan_document_expiry():
+    """تنبيه الموارد البشرية بالهويات والرخص والعقود التي تنتهي قريباً
+
+    كل وثيقة ينبه عنها مرة واحدة خلال فترة التنبيه (لا يتكرر الإشعار يومياً).
+    """
+    warning_days = Config.DOCUMENT_EXPIRY_WARNING_DAYS
+    today = date.today()
+    last_day = today + timedelta(days=warning_days)
+    notified_since = datetime.utcnow() - timedelta(days=warning_days)
+    sent = 0
+
+    for source_type, column, label in EXPIRING_DOCUMENTS:
+        rows = db.session.execute(
+            select(Employee.id, Employee.name_arabic, column)
+            .where(column.between(today, last_day))
+        ).all()
+        if not rows:
+            continue
+
+        already_notified = set(db.session.scalars(
+            select(Notification.source_id).where(
+                Notification.source_type == source_type,
+                Notification.source_id.in_([row.id for row in rows]),
+                Notification.created_at >= notified_since
+            ).distinct()
+        ).all())
+
+        for employee_id, name, expiry_date in rows:
+            if employee_id in already_notified:
+                continue
+            days_left = (expiry_date - today).days
+            fan_out_notification(
+                ['admin', 'manager', 'hr'],
+                f'قرب انتهاء {label}',
+                f'{label} للموظف {name} تنتهي في {expiry_date.strftime("%Y-%m-%d")} (بعد {days_left} يوم)',
+                notification_type='warning',
+                priority='high' if days_left <= 7 else 'normal',
+                action_url=f'/employees/view/{employee_id}',
+                action_text='عرض الموظف',
+                source_type=source_type,
+                source_id=employee_id,
+                background=False
+            )
+            sent += 1
+    db.session.commit()
+    return f'تم إرسال {sent} تنبيه بانتهاء الوثائق'
+
+
+@periodic_task('jobs_cleanup', interval=timedelta(days=1), at_hour=3)
+def scheduled_jobs_cleanup():
+    """حذف المهام الخلفية القديمة وملفات نتائجها"""
+    return f'تم حذف {cleanup_jobs()} مهمة قديمة'
+
+
+@periodic_task('stale_jobs', interval=timedelta(minutes=15))
+def scheduled_stale_jobs():
+    """تحديد المهام الخلفية التي توقفت عمليتها كفاشلة"""
+    return f'تم تحديد {fail_stale_jobs()} مهمة متوقفة كفاشلة'
+
+
+def sqlite_maintenance_interval():
+    if db.engine.url.get_backend_name() != 'sqlite':
+        return None
+    return timedelta(hours=Config.SQLITE_MAINTENANCE_HOURS)
+
+
+@periodic_task('sqlite_maintenance', interval=sqlite_maintenance_interval)
+def scheduled_sqlite_maintenance():
+    """دمج ملف WAL (checkpoint) وتحديث إحصائيات SQLite"""
+    result = sqlite_maintenance()
+    if result['busy']:
+        return f'تم دمج {result["checkpointed"]} من {result["wal_pages"]} صفحة (قراءة جارية منعت الدمج الكامل)'
+    return f'تم دمج {result["checkpointed"]} صفحة من ملف WAL'
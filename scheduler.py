@@ -0,0 +1,244 @@
+import os
+import threading
+import time
+import traceback
+from datetime import datetime
+
+from sqlalchemy import text
+
+from config import Config
+from models import db, ScheduledTaskRun
+
+try:
+    import fcntl
+except ImportError:  # ويندوز
+    fcntl = None
+    import msvcrt
+
+# مفتاح قفل PostgreSQL الاستشاري الخاص بالمجدول (رقم ثابت يميز هذا القفل)
+ADVISORY_LOCK_KEY = 724900118
+
+# اسم المهمة -> PeriodicTask
+_tasks = {}
+
+
+class PeriodicTask:
+    """مهمة دورية: interval مدة ثابتة (timedelta) أو دالة تعيد المدة أو None للإيقاف
+
+    at_hour: إذا حدد يتم تشغيل المهمة في هذه الساعة من يوم موعدها.
+    """
+
+    def __init__(self, name, func, interval, at_hour=None):
+        self.name = name
+        self.func = func
+        self.interval = interval
+        self.at_hour = at_hour
+
+    def next_run(self, last_run, now):
+        """موعد التشغيل القادم، أو None إذا كانت المهمة متوقفة
+
+        المهمة التي لم تشغل من قبل أو فات موعدها (كان الخادم متوقفاً) تستحق
+        فوراً، وتشغل مرة واحدة فقط مهما كان عدد المواعيد الفائتة.
+        """
+        interval = self.interval() if callable(self.interval) else self.interval
+        if interval is None:
+            return None
+        if last_run is None:
+            return now
+        due = last_run + interval
+        if self.at_hour is not None:
+            due = due.replace(hour=self.at_hour, minute=0, second=0, microsecond=0)
+        return due
+
+
+def periodic_task(name, interval, at_hour=None):
+    """تسجيل دالة كمهمة دورية (تستدعى بدون معاملات وتعيد رسالة اختيارية)"""
+    def decorator(func):
+        _tasks[name] = PeriodicTask(name, func, interval, at_hour)
+        return func
+    return decorator
+
+
+class LeaderLock:
+    """قفل يضمن أن عملية واحدة فقط (من جميع عمال gunicorn) تشغل المهام الدورية
+
+    PostgreSQL: قفل استشاري على اتصال مخصص (يعمل بين عدة خوادم).
+    غير ذلك: قفل ملف في مجلد instance (يعمل بين العمليات على نفس الخادم).
+    يتحرر القفل تلقائياً إذا توقفت العملية، فتتولى عملية أخرى المهمة.
+    """
+
+    def __init__(self, engine, lock_file):
+        self.engine = engine
+        self.lock_file = lock_file
+        self._connection = None
+        self._handle = None
+
+    def acquire(self):
+        if self.engine.url.get_backend_name() == 'postgresql':
+            return self._acquire_advisory()
+        return self._acquire_file()
+
+    def _acquire_advisory(self):
+        connection = self.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+        acquired = connection.execute(
+            text('SELECT pg_try_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY}
+        ).scalar()
+        if not acquired:
+            connection.close()
+            return False
+        self._connection = connection
+        return True
+
+    def _acquire_file(self):
+        os.makedirs(os.path.dirname(self.lock_file) or '.', exist_ok=True)
+        handle = open(self.lock_file, 'a+')
+        try:
+            if fcntl is not None:
+                fcntl.flock(handle.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            else:
+                handle.seek(0)
+                msvcrt.locking(handle.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            handle.close()
+            return False
+        self._handle = handle
+        return True
+
+    def is_held(self):
+        """التحقق من أن القفل ما زال محجوزاً (اتصال PostgreSQL قد ينقطع)"""
+        if self._handle is not None:
+            return True
+        if self._connection is None:
+            return False
+        try:
+            self._connection.execute(text('SELECT 1'))
+            return True
+        except Exception as e:
+            print(f"تحذير: انقطع اتصال قفل المجدول: {e}")
+            self.release()
+            return False
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+        if self._handle is not None:
+            self._handle.close()
+            self._handle = None
+
+
+class Scheduler:
+    """مشغل المهام الدورية في خيط خلفي
+
+    كل عملية تحاول الحصول على القفل كل دورة، والعملية التي تحصل عليه فقط
+    تشغل المهام المستحقة. آخر تشغيل لكل مهمة يحفظ في جدول scheduled_task_runs
+    لذلك لا تتكرر المهام بعد إعادة التشغيل وتشغل المهام الفائتة عند البدء.
+    """
+
+    def __init__(self):
+        self.app = None
+        self.is_leader = False
+        self._lock = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self, app):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.app = app
+        with app.app_context():
+            self._lock = LeaderLock(db.engine, app.config.get('SCHEDULER_LOCK_FILE', Config.SCHEDULER_LOCK_FILE))
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='raizo-scheduler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._lock is not None:
+            self._lock.release()
+        self.is_leader = False
+
+    def _run(self):
+        poll_interval = self.app.config.get('SCHEDULER_POLL_INTERVAL', Config.SCHEDULER_POLL_INTERVAL)
+        while not self._stop.is_set():
+            try:
+                if self.is_leader:
+                    self.is_leader = self._lock.is_held()
+                else:
+                    self.is_leader = self._lock.acquire()
+                    if self.is_leader:
+                        print(f"المجدول يعمل في هذه العملية (pid {os.getpid()})")
+                if self.is_leader:
+                    with self.app.app_context():
+                        run_pending()
+            except Exception as e:
+                print(f"خطأ في المجدول: {e}")
+            self._stop.wait(poll_interval)
+
+
+def _run_task(task, record, now):
+    record.last_status = 'running'
+    db.session.commit()
+
+    started = time.monotonic()
+    try:
+        message = task.func()
+        db.session.commit()
+        status = 'succeeded'
+    except Exception as e:
+        db.session.rollback()
+        print(f"خطأ في المهمة الدورية {task.name}: {e}")
+        traceback.print_exc()
+        message = str(e)
+        status = 'failed'
+
+    # المهمة الفاشلة لا تعاد قبل موعدها القادم حتى لا تتكرر كل دقيقة
+    record = db.session.get(ScheduledTaskRun, task.name)
+    record.last_run_at = now
+    record.last_finished_at = datetime.now()
+    record.last_status = status
+    record.last_message = message
+    record.last_duration = round(time.monotonic() - started, 3)
+    record.run_count = (record.run_count or 0) + 1
+    record.next_run_at = task.next_run(now, now)
+    db.session.commit()
+    return status
+
+
+def run_pending(now=None):
+    """تشغيل المهام المستحقة (داخل سياق التطبيق)، ويعيد أسماء المهام التي تم تشغيلها"""
+    executed = []
+    for task in list(_tasks.values()):
+        # الوقت يحسب لكل مهمة لأن المهمة السابقة قد تستغرق وقتاً طويلاً
+        current = now or datetime.now()
+        record = db.session.get(ScheduledTaskRun, task.name)
+        if record is None:
+            record = ScheduledTaskRun(name=task.name, run_count=0)
+            db.session.add(record)
+
+        due = task.next_run(record.last_run_at, current)
+        if due is None or due > current:
+            record.next_run_at = due
+            db.session.commit()
+            continue
+
+        _run_task(task, record, current)
+        executed.append(task.name)
+    return executed
+
+
+scheduler = Scheduler()
+
+
+def init_scheduler(app):
+    """بدء المجدول إذا كان مفعلاً (يستدعى من wsgi.py، وليس عند استيراد التطبيق)"""
+    import scheduled_tasks  # noqa: F401 تسجيل المهام الدورية
+    if app.config.get('SCHEDULER_ENABLED', Config.SCHEDULER_ENABLED):
+        scheduler.start(app)
+
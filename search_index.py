@@ -0,0 +1,254 @@
+import re
+
+from sqlalchemy import column, event, func, inspect, literal_column, table, text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+
+from models import db, Employee
+
+# التشكيل والتطويل
+_DIACRITICS = re.compile('[\u0610-\u061a\u064b-\u065f\u0670\u06d6-\u06ed\u0640]')
+
+_LETTER_MAP = str.maketrans({
+    'أ': 'ا', 'إ': 'ا', 'آ': 'ا', 'ٱ': 'ا',
+    'ة': 'ه',
+    'ى': 'ي',
+    'ؤ': 'و',
+    'ئ': 'ي',
+    # الأرقام العربية والفارسية
+    '٠': '0', '١': '1', '٢': '2', '٣': '3', '٤': '4',
+    '٥': '5', '٦': '6', '٧': '7', '٨': '8', '٩': '9',
+    '۰': '0', '۱': '1', '۲': '2', '۳': '3', '۴': '4',
+    '۵': '5', '۶': '6', '۷': '7', '۸': '8', '۹': '9',
+})
+
+_NON_DIGITS = re.compile(r'\D')
+
+FTS_TABLE = 'employee_fts'
+
+# أعمدة الفهرس: يجب أن تطابق أسماء أعمدة جدول الموظفين (external content)
+FTS_COLUMNS = ['search_name', 'national_id', 'employee_id', 'search_phones']
+
+# حد أدنى لطول الكلمة في فهرس trigram
+TRIGRAM_MIN_LENGTH = 3
+
+# نوع الفهرس المستخدم لكل محرك: fts5_trigram / fts5 / pg_trgm / like
+_backends = {}
+
+
+def normalize_arabic(value):
+    """تطبيع النص العربي للبحث: إزالة التشكيل وتوحيد الهمزات والتاء المربوطة"""
+    if not value:
+        return ''
+    value = _DIACRITICS.sub('', str(value)).translate(_LETTER_MAP).lower()
+    return ' '.join(value.split())
+
+
+def normalize_digits(value):
+    """استخراج الأرقام فقط (مع تحويل الأرقام العربية)"""
+    if not value:
+        return ''
+    return _NON_DIGITS.sub('', str(value).translate(_LETTER_MAP))
+
+
+def search_fields(name_arabic=None, name_english=None, phone=None, additional_phone=None):
+    """قيم حقول البحث المطبّعة لموظف (تستخدم أيضاً في الإدراج الجماعي)"""
+    phones = ' '.join(p for p in (normalize_digits(phone), normalize_digits(additional_phone)) if p)
+    return {
+        'search_name': normalize_arabic(f"{name_arabic or ''} {name_english or ''}")[:210],
+        'search_phones': phones[:50]
+    }
+
+
+@event.listens_for(Employee, 'before_insert')
+@event.listens_for(Employee, 'before_update')
+def _sync_search_fields(mapper, connection, target):
+    for key, value in search_fields(
+        target.name_arabic, target.name_english, target.phone, target.additional_phone
+    ).items():
+        setattr(target, key, value)
+
+
+def _backend():
+    return _backends.get(str(db.engine.url), 'like')
+
+
+def _ensure_shadow_columns():
+    """إضافة أعمدة البحث لقواعد البيانات القديمة"""
+    existing = {c['name'] for c in inspect(db.engine).get_columns('employee')}
+    for name, length in (('search_name', 210), ('search_phones', 50)):
+        if name not in existing:
+            db.session.execute(text(f'ALTER TABLE employee ADD COLUMN {name} VARCHAR({length})'))
+    db.session.commit()
+
+
+def backfill_search_fields(batch_size=1000):
+    """تعبئة حقول البحث للموظفين الذين لم تُحسب حقولهم بعد"""
+    updated = 0
+    while True:
+        rows = db.session.query(
+            Employee.id, Employee.name_arabic, Employee.name_english,
+            Employee.phone, Employee.additional_phone, Employee.updated_at
+        ).filter(Employee.search_name.is_(None)).limit(batch_size).all()
+        if not rows:
+            break
+        # الإبقاء على updated_at كما هو لأن التعديل داخلي وليس من المستخدم
+        db.session.execute(db.update(Employee), [
+            dict(
+                id=row.id,
+                updated_at=row.updated_at,
+                **search_fields(row.name_arabic, row.name_english, row.phone, row.additional_phone)
+            )
+            for row in rows
+        ])
+        db.session.commit()
+        updated += len(rows)
+    return updated
+
+
+def _create_sqlite_fts():
+    """إنشاء جدول FTS5 ومشغلات المزامنة، ويعيد نوع الفهرس وهل أنشئ الجدول الآن"""
+    exists = db.session.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type='table' AND name=:name"
+    ), {'name': FTS_TABLE}).first()
+
+    if exists:
+        sql = db.session.execute(text(
+            "SELECT sql FROM sqlite_master WHERE name=:name"
+        ), {'name': FTS_TABLE}).scalar() or ''
+        backend = 'fts5_trigram' if 'trigram' in sql else 'fts5'
+    else:
+        columns = ', '.join(FTS_COLUMNS)
+        backend = None
+        for tokenizer, name in (('trigram', 'fts5_trigram'), ('unicode61', 'fts5')):
+            try:
+                db.session.execute(text(
+                    f"CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5({columns}, "
+                    f"content='employee', content_rowid='id', tokenize='{tokenizer}')"
+                ))
+                backend = name
+                break
+            except OperationalError:
+                db.session.rollback()
+        if backend is None:
+            return None, False
+
+    new_values = ', '.join(f'new.{c}' for c in FTS_COLUMNS)
+    old_values = ', '.join(f'old.{c}' for c in FTS_COLUMNS)
+    columns = ', '.join(FTS_COLUMNS)
+    db.session.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON employee BEGIN
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """))
+    db.session.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON employee BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+        END
+    """))
+    db.session.execute(text(f"""
+        CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF {columns} ON employee BEGIN
+            INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, {columns}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {FTS_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});
+        END
+    """))
+    db.session.commit()
+    return backend, not exists
+
+
+def _create_postgres_trigram():
+    db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+    for name in FTS_COLUMNS:
+        db.session.execute(text(
+            f'CREATE INDEX IF NOT EXISTS ix_employee_{name}_trgm ON employee USING gin ({name} gin_trgm_ops)'
+        ))
+    db.session.commit()
+    return 'pg_trgm'
+
+
+def rebuild_search_index():
+    """إعادة بناء فهرس البحث بالكامل"""
+    backfill_search_fields()
+    if _backend().startswith('fts5'):
+        db.session.execute(text(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')"))
+        db.session.commit()
+
+
+def ensure_search_index():
+    """تجهيز أعمدة البحث والفهرس المناسب لمحرك قاعدة البيانات"""
+    _ensure_shadow_columns()
+    # يجب تعبئة الحقول قبل إنشاء المشغلات حتى لا تحذف من الفهرس صفوفاً لم تُفهرس
+    backfill_search_fields()
+    dialect = db.engine.dialect.name
+    backend, created = 'like', False
+    try:
+        if dialect == 'sqlite':
+            backend, created = _create_sqlite_fts()
+            backend = backend or 'like'
+        elif dialect == 'postgresql':
+            backend = _create_postgres_trigram()
+    except (OperationalError, ProgrammingError) as e:
+        db.session.rollback()
+        print(f"تحذير: تعذر إنشاء فهرس البحث، سيتم البحث بدون فهرس: {e}")
+        backend = 'like'
+    _backends[str(db.engine.url)] = backend
+
+    if created:
+        rebuild_search_index()
+    return backend
+
+
+def _fts_phrase(term, trigram):
+    tokens = term.split()
+    if trigram:
+        return ' AND '.join('"%s"' % t.replace('"', '""') for t in tokens)
+    return ' AND '.join('"%s"*' % t.replace('"', '""') for t in tokens)
+
+
+def apply_search(query, name=None, national_id=None, phone=None, any_field=None, ranked=True):
+    """تطبيق البحث على استعلام الموظفين مع ترتيب النتائج حسب الصلة
+
+    name: الاسم العربي أو الإنجليزي، national_id: رقم الهوية،
+    phone: الجوال أو الجوال الإضافي، any_field: البحث في جميع الحقول.
+    ranked=False يكتفي بالتصفية دون ترتيب (للقوائم المقسمة حسب المفتاح).
+    """
+    terms = []
+    if name:
+        terms.append((['search_name'], normalize_arabic(name)))
+    if national_id:
+        terms.append((['national_id'], normalize_digits(national_id) or national_id.strip()))
+    if phone:
+        terms.append((['search_phones'], normalize_digits(phone) or phone.strip()))
+    if any_field:
+        terms.append((FTS_COLUMNS, normalize_arabic(any_field)))
+    terms = [(columns, term) for columns, term in terms if term]
+    if not terms:
+        return query
+
+    backend = _backend()
+    trigram = backend == 'fts5_trigram'
+    too_short = any(len(token) < TRIGRAM_MIN_LENGTH for _, term in terms for token in term.split())
+
+    if backend.startswith('fts5') and not (trigram and too_short):
+        expression = ' AND '.join(
+            '{%s} : (%s)' % (' '.join(columns), _fts_phrase(term, trigram)) for columns, term in terms
+        )
+        fts = table(FTS_TABLE, column('rowid'), column('rank'))
+        matches = db.select(fts.c.rowid, fts.c.rank).where(
+            literal_column(FTS_TABLE).op('MATCH')(expression)
+        ).subquery()
+        query = query.join(matches, Employee.id == matches.c.rowid)
+        return query.order_by(matches.c.rank) if ranked else query
+
+    # pg_trgm أو البحث العادي: LIKE على الحقول المطبّعة
+    rank = []
+    for columns, term in terms:
+        per_column = []
+        for name_ in columns:
+            col = getattr(Employee, name_)
+            per_column.append(db.and_(*[col.contains(token, autoescape=True) for token in term.split()]))
+            if backend == 'pg_trgm':
+                rank.append(func.similarity(col, term))
+        query = query.filter(db.or_(*per_column))
+    if rank and ranked:
+        query = query.order_by(func.greatest(*rank).desc() if len(rank) > 1 else rank[0].desc())
+    return query
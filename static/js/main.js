@@ -151,51 +151,54 @@ function updateNotifications() {
             }
             return response.json();
         })
-        .then(data => {
-            console.log('📊 البيانات المستلمة:', data);
-            
-            // العثور على العناصر المطلوبة
-            const bellIcon = document.querySelector('#notificationsDropdown');
-            const dropdownMenu = document.querySelector('#notificationsDropdown + .dropdown-menu');
-            let badge = document.querySelector('#notificationsDropdown .badge');
-            
-            if (!bellIcon) {
-                console.error('❌ لم يتم العثور على أيقونة الجرس!');
-                return;
-            }
-            
-            console.log(`📬 عدد الإشعارات غير المقروءة: ${data.unread_count}`);
-            
-            // تحديث أو إنشاء العداد
-            if (data.unread_count > 0) {
-                if (!badge) {
-                    // إنشاء شارة جديدة
-                    badge = document.createElement('span');
-                    badge.className = 'position-absolute top-0 start-100 translate-middle badge rounded-pill bg-danger';
-                    bellIcon.appendChild(badge);
-                    console.log('✅ تم إنشاء شارة العداد');
-                }
-                
-                badge.textContent = data.unread_count;
-                badge.style.display = 'inline-block';
-                console.log(`✅ تم تحديث العداد: ${data.unread_count}`);
-                
-                // تحديث محتوى القائمة المنسدلة
-                if (dropdownMenu && data.notifications && data.notifications.length > 0) {
-                    updateNotificationsDropdown(dropdownMenu, data.notifications);
-                }
-            } else {
-                console.log('📭 لا توجد إشعارات غير مقروءة');
-                if (badge) {
-                    badge.style.display = 'none';
-                }
-            }
-        })
+        .then(renderNotifications)
         .catch(error => {
             console.error('❌ خطأ في تحديث الإشعارات:', error);
         });
 }
 
+// عرض العداد وآخر الإشعارات (من الاستعلام الدوري أو من البث المباشر)
+function renderNotifications(data) {
+    console.log('📊 البيانات المستلمة:', data);
+    
+    // العثور على العناصر المطلوبة
+    const bellIcon = document.querySelector('#notificationsDropdown');
+    const dropdownMenu = document.querySelector('#notificationsDropdown + .dropdown-menu');
+    let badge = document.querySelector('#notificationsDropdown .badge');
+    
+    if (!bellIcon) {
+        console.error('❌ لم يتم العثور على أيقونة الجرس!');
+        return;
+    }
+    
+    console.log(`📬 عدد الإشعارات غير المقروءة: ${data.unread_count}`);
+    
+    // تحديث أو إنشاء العداد
+    if (data.unread_count > 0) {
+        if (!badge) {
+            // إنشاء شارة جديدة
+            badge = document.createElement('span');
+            badge.className = 'position-absolute top-0 start-100 translate-middle badge rounded-pill bg-danger';
+            bellIcon.appendChild(badge);
+            console.log('✅ تم إنشاء شارة العداد');
+        }
+        
+        badge.textContent = data.unread_count;
+        badge.style.display = 'inline-block';
+        console.log(`✅ تم تحديث العداد: ${data.unread_count}`);
+        
+        // تحديث محتوى القائمة المنسدلة
+        if (dropdownMenu && data.notifications && data.notifications.length > 0) {
+            updateNotificationsDropdown(dropdownMenu, data.notifications);
+        }
+    } else {
+        console.log('📭 لا توجد إشعارات غير مقروءة');
+        if (badge) {
+            badge.style.display = 'none';
+        }
+    }
+}
+
 // دالة تحديث محتوى القائمة المنسدلة
 function updateNotificationsDropdown(dropdownMenu, notifications) {
     // البحث عن منطقة الإشعارات الديناميكية
@@ -289,15 +292,53 @@ function formatNotificationDate(dateString) {
     });
 }
 
-// تشغيل التحديث عند تحميل الصفحة
-document.addEventListener('DOMContentLoaded', function() {
-    console.log('🚀 تم تحميل الصفحة - بدء نظام الإشعارات');
+// البث المباشر للإشعارات (Server-Sent Events) مع الرجوع للتحديث الدوري عند تعذره
+let notificationsPollTimer = null;
+
+function startNotificationsPolling() {
+    if (notificationsPollTimer) {
+        return;
+    }
+    updateNotifications();
+    notificationsPollTimer = setInterval(updateNotifications, 30000);
+    console.log('⏰ تم تفعيل التحديث الدوري للإشعارات');
+}
+
+function startNotificationsStream() {
+    if (!window.EventSource) {
+        startNotificationsPolling();
+        return;
+    }
     
-    // تحديث فوري
-    setTimeout(updateNotifications, 1000);
+    const source = new EventSource('/api/notifications/stream');
+    let failures = 0;
     
-    // تحديث دوري كل 30 ثانية
-    setInterval(updateNotifications, 30000);
+    source.onmessage = function(event) {
+        failures = 0;
+        renderNotifications(JSON.parse(event.data));
+    };
     
-    console.log('⏰ تم تفعيل التحديث الدوري للإشعارات');
-});
\ No newline at end of file
+    // انتهاء مدة الاتصال من الخادم: إعادة الاتصال فوراً
+    source.addEventListener('reconnect', function() {
+        source.close();
+        startNotificationsStream();
+    });
+    
+    source.onerror = function() {
+        failures++;
+        // الخادم رفض البث (204) أو تكرر الفشل: الرجوع للتحديث الدوري
+        if (source.readyState === EventSource.CLOSED || failures >= 3) {
+            console.warn('⚠️ تعذر البث المباشر للإشعارات، سيتم التحديث الدوري');
+            source.close();
+            startNotificationsPolling();
+        }
+    };
+    
+    console.log('📡 تم تفعيل البث المباشر للإشعارات');
+}
+
+// تشغيل التحديث عند تحميل الصفحة
+document.addEventListener('DOMContentLoaded', function() {
+    console.log('🚀 تم تحميل الصفحة - بدء نظام الإشعارات');
+    startNotificationsStream();
+});
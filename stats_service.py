@@ -0,0 +1,116 @@
+import copy
+import threading
+import time
+from datetime import date
+
+from sqlalchemy import func
+
+from models import db, Employee, Attendance, Payroll, Asset, Document, JobApplication
+
+# أنواع الموظفين المعتمدة (نفس خيارات نموذج الموظف)
+EMPLOYEE_TYPES = [
+    'الإدارة',
+    'الإداريات',
+    'الحراسات الأمنية',
+    'الحارسات',
+    'العمالة رجال',
+    'العاملات',
+    'مرشدي الحافلات'
+]
+
+# أي نوع غير موجود في القائمة أعلاه يُحسب تحت هذا المفتاح
+OTHER_EMPLOYEE_TYPE = 'أخرى'
+
+# حالات الحضور التي تعرض دائماً حتى لو كان عددها صفراً
+ATTENDANCE_STATUSES = ['present', 'absent', 'late', 'withdrawn']
+
+DEFAULT_CACHE_TTL = 30  # بالثواني
+
+_cache = {}
+_cache_lock = threading.Lock()
+
+
+def _grouped_counts(column, *criteria):
+    """عدد السجلات لكل قيمة في العمود باستعلام GROUP BY واحد"""
+    rows = db.session.query(column, func.count()).filter(*criteria).group_by(column).all()
+    return {key: count for key, count in rows}
+
+
+def _compute_stats(for_date):
+    """حساب جميع الإحصائيات من قاعدة البيانات"""
+    # الموظفون النشطون حسب النوع
+    type_counts = _grouped_counts(Employee.employee_type, Employee.status == 'active')
+    employees_by_type = {employee_type: 0 for employee_type in EMPLOYEE_TYPES}
+    employees_by_type[OTHER_EMPLOYEE_TYPE] = 0
+    for employee_type, count in type_counts.items():
+        if employee_type in employees_by_type:
+            employees_by_type[employee_type] += count
+        else:
+            employees_by_type[OTHER_EMPLOYEE_TYPE] += count
+
+    # الحضور حسب الحالة لليوم المطلوب
+    attendance_counts = _grouped_counts(Attendance.status, Attendance.date == for_date)
+    attendance = {status: 0 for status in ATTENDANCE_STATUSES}
+    for status, count in attendance_counts.items():
+        if status:
+            attendance[status] = attendance.get(status, 0) + count
+
+    # العهد حسب الحالة
+    asset_counts = _grouped_counts(Asset.status)
+
+    # المستندات حسب السرية
+    document_counts = _grouped_counts(Document.is_confidential)
+
+    # عدد كشوف الشهر الحالي وطلبات التوظيف المعلقة في استعلام واحد
+    payroll_count, pending_applications = db.session.query(
+        db.session.query(func.count(Payroll.id)).filter(
+            Payroll.month == for_date.month,
+            Payroll.year == for_date.year
+        ).scalar_subquery(),
+        db.session.query(func.count(JobApplication.id)).filter(
+            JobApplication.status == 'pending'
+        ).scalar_subquery()
+    ).one()
+
+    return {
+        'date': for_date.isoformat(),
+        'employees_by_type': employees_by_type,
+        'total_employees': sum(type_counts.values()),
+        'attendance': attendance,
+        'attendance_total': sum(attendance_counts.values()),
+        'assets_by_status': asset_counts,
+        'total_assets': sum(asset_counts.values()),
+        'assigned_assets': asset_counts.get('assigned', 0),
+        'total_documents': sum(document_counts.values()),
+        'confidential_documents': document_counts.get(True, 0),
+        'payroll_count': payroll_count or 0,
+        'pending_applications': pending_applications or 0
+    }
+
+
+def get_stats(for_date=None, ttl=DEFAULT_CACHE_TTL):
+    """الحصول على إحصائيات لوحة التحكم مع تخزين مؤقت قصير حسب التاريخ"""
+    for_date = for_date or date.today()
+    key = for_date.isoformat()
+    now = time.monotonic()
+
+    with _cache_lock:
+        cached = _cache.get(key)
+        if cached and cached[0] > now:
+            return copy.deepcopy(cached[1])
+
+    stats = _compute_stats(for_date)
+
+    with _cache_lock:
+        # إزالة المدخلات المنتهية حتى لا يكبر الكاش مع مرور الأيام
+        for expired_key in [k for k, (expires, _) in _cache.items() if expires <= now]:
+            del _cache[expired_key]
+        _cache[key] = (now + ttl, stats)
+
+    return copy.deepcopy(stats)
+
+
+def invalidate_stats_cache():
+    """مسح الإحصائيات المخزنة مؤقتاً"""
+    with _cache_lock:
+        _cache.clear()
@@ -0,0 +1,44 @@
+from datetime import date, time
+
+import pytest
+
+import attendance_bulk
+from app import app, db
+from attendance_bulk import bulk_upsert_attendance
+from models import Attendance
+
+DAY = date(2031, 3, 1)
+
+
+@pytest.mark.parametrize('native', [True, False], ids=['on_conflict', 'insert_update'])
+def test_bulk_upsert_counts_and_keeps_existing_times(make_employee, monkeypatch, native):
+    monkeypatch.setattr(attendance_bulk, 'supports_native_upsert', lambda: native)
+    with app.app_context():
+        existing = make_employee()
+        db.session.add(Attendance(employee_id=existing.id, date=DAY, status='present',
+                                  check_in=time(8, 0), check_out=time(16, 0)))
+        new = make_employee()
+        db.session.flush()
+
+        result = bulk_upsert_attendance(DAY, {
+            # بدون أوقات: تبقى الأوقات المسجلة سابقاً
+            str(existing.id): {'status': 'late', 'notes': 'تأخير'},
+            # نفس الموظف بمفتاحين مختلفين: الأخير يطبق
+            f'0{new.id}': {'status': 'absent'},
+            str(new.id): {'status': 'present', 'check_in': '09:00'},
+            '1000000000': {'status': 'present'},
+            'abc': {'status': 'present'},
+        }, chunk_size=2)
+
+        assert (result['inserted'], result['updated'], result['failed']) == (1, 1, 2)
+        errors = {row['employee_id'] for row in result['rows'] if row['action'] == 'error'}
+        assert errors == {1000000000, 'abc'}
+
+        db.session.expire_all()
+        updated = Attendance.query.filter_by(employee_id=existing.id, date=DAY).one()
+        assert (updated.status, updated.notes) == ('late', 'تأخير')
+        assert (updated.check_in, updated.check_out) == (time(8, 0), time(16, 0))
+
+        inserted = Attendance.query.filter_by(employee_id=new.id, date=DAY).one()
+        assert (inserted.status, inserted.check_in, inserted.check_out) == ('present', time(9, 0), None)
+        db.session.rollback()
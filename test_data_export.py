@@ -0,0 +1,28 @@
+from openpyxl import load_workbook
+
+import data_export
+from app import app, db
+from data_export import export_all_data_file
+
+
+def test_xlsx_rolls_over_to_new_sheet_at_row_limit(tmp_path, monkeypatch, make_employee):
+    monkeypatch.setattr(data_export, 'XLSX_MAX_ROWS', 3)
+    path = str(tmp_path / 'export.xlsx')
+    with app.app_context():
+        for _ in range(5):
+            make_employee()
+        db.session.commit()
+        counts = export_all_data_file(path, 'xlsx')
+
+    workbook = load_workbook(path, read_only=True)
+    employee_sheets = [name for name in workbook.sheetnames if name.startswith('الموظفين')]
+    assert employee_sheets[:3] == ['الموظفين', 'الموظفين_2', 'الموظفين_3']
+
+    exported = 0
+    for name in employee_sheets:
+        rows = list(workbook[name].values)
+        assert len(rows) <= 3
+        assert rows[0] == ('ID', 'الاسم', 'الهاتف', 'القسم', 'الراتب')
+        exported += len(rows) - 1
+    assert exported == counts['الموظفين']
+    workbook.close()
@@ -0,0 +1,99 @@
+from sqlalchemy import create_engine, text
+
+from db_engine import configure_engine, sqlite_maintenance
+
+
+def test_sqlite_pragmas_are_applied_to_every_connection(tmp_path):
+    engine = create_engine(f'sqlite:///{tmp_path / "test.db"}')
+    assert configure_engine(engine, {'journal_mode': 'WAL', 'synchronous': 'NORMAL', 'busy_timeout': 1234})
+
+    for _ in range(2):
+        with engine.connect() as connection:
+            assert connection.execute(text('PRAGMA journal_mode')).scalar() == 'wal'
+            assert connection.execute(text('PRAGMA synchronous')).scalar() == 1
+            assert connection.execute(text('PRAGMA busy_timeout')).scalar() == 1234
+        engine.dispose()
+
+    with engine.begin() as connection:
+        connection.execute(text('CREATE TABLE t (x INTEGER)'))
+        connection.execute(text('INSERT INTO t VALUES (1)'))
+    assert sqlite_maintenance(engine)['busy'] is False
+
+
+def test_read_replica_routes_reads_but_not_writes(tmp_path):
+    from flask import Flask
+    from models import db, Settings
+    from db_engine import use_replica
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "primary.db"}'
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f'sqlite:///{tmp_path / "replica.db"}'}
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        Settings.__table__.create(db.engines['replica'])
+        with db.engines['replica'].begin() as connection:
+            connection.execute(Settings.__table__.insert().values(company_name='replica'))
+        db.session.add(Settings(company_name='primary'))
+        db.session.commit()
+
+        assert Settings.query.one().company_name == 'primary'
+        with use_replica():
+            assert Settings.query.one().company_name == 'replica'
+            # الكتابة تذهب للقاعدة الرئيسية حتى داخل use_replica
+            db.session.add(Settings(company_name='written'))
+            db.session.commit()
+            Settings.query.filter_by(company_name='primary').update({'company_name': 'updated'})
+            db.session.commit()
+            assert Settings.query.count() == 1
+        assert sorted(s.company_name for s in Settings.query) == ['updated', 'written']
+
+
+def test_submitted_job_is_read_back_from_primary(tmp_path, monkeypatch):
+    from flask import Flask
+    import jobs
+    from models import db, Job
+    from db_engine import use_replica
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "primary.db"}'
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f'sqlite:///{tmp_path / "replica.db"}'}
+    db.init_app(app)
+    monkeypatch.setitem(jobs._tasks, 'noop', lambda context: None)
+    monkeypatch.setattr(jobs, '_get_executor', lambda: type('Executor', (), {'submit': lambda *args: None})())
+
+    with app.app_context():
+        db.create_all()
+        Job.__table__.create(db.engines['replica'])
+        # النسخة المقروءة متأخرة: المهمة الجديدة ليست فيها بعد
+        with use_replica():
+            job = jobs.submit_job('noop')
+            assert job.status == 'queued'
+            assert job.to_dict()['id'] == job.id
+
+
+def test_facets_are_cached_from_primary(tmp_path, make_employee):
+    from flask import Flask
+    from models import db, Employee
+    from db_engine import use_replica
+    from facet_cache import facet_cache, get_facet
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{tmp_path / "primary.db"}'
+    app.config['SQLALCHEMY_BINDS'] = {'replica': f'sqlite:///{tmp_path / "replica.db"}'}
+    db.init_app(app)
+
+    with app.app_context():
+        db.create_all()
+        Employee.__table__.create(db.engines['replica'])
+        make_employee(department='الصيانة')
+        db.session.commit()
+        try:
+            # صفحة على النسخة المقروءة بعد الحفظ مباشرة: النسخة لم تستلم الموظف بعد
+            with use_replica():
+                assert Employee.query.count() == 0
+                assert get_facet(Employee.department) == ['الصيانة']
+            assert get_facet(Employee.department) == ['الصيانة']
+        finally:
+            facet_cache.invalidate()
@@ -0,0 +1,89 @@
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+
+from app import app, db, SYSTEM_MODULES, EMPLOYEE_FIELD_COLUMNS
+from employee_export import EXPORT_COLUMNS, export_columns
+from employee_fields import CORE_COLUMNS, allowed_columns, compile_field_groups, employee_projection
+from models import Employee
+
+
+def test_field_groups_map_to_real_columns():
+    groups = compile_field_groups(SYSTEM_MODULES['employees']['fields'])
+    columns = {attribute.key for attribute in Employee.__mapper__.column_attrs}
+
+    assert set(groups) == set(SYSTEM_MODULES['employees']['fields'])
+    for group_columns in groups.values():
+        assert group_columns <= columns
+    assert {'iban_number', 'iban_certificate'} <= groups['bank_info']
+    assert 'salary' in groups['contract_info']
+
+
+def test_allowed_columns_excludes_other_groups():
+    columns = allowed_columns(EMPLOYEE_FIELD_COLUMNS, ['basic_info', 'contact_info'])
+
+    assert CORE_COLUMNS <= columns
+    assert {'national_id', 'phone'} <= columns
+    assert not columns & EMPLOYEE_FIELD_COLUMNS['bank_info']
+    assert not columns & EMPLOYEE_FIELD_COLUMNS['contract_info']
+
+    # needed يقصر الأعمدة على ما تعرضه الصفحة فقط
+    needed = allowed_columns(EMPLOYEE_FIELD_COLUMNS, ['basic_info', 'contact_info'], ['phone', 'salary'])
+    assert needed == CORE_COLUMNS | {'phone'}
+
+
+def test_projection_never_selects_hidden_columns(make_employee):
+    columns = allowed_columns(EMPLOYEE_FIELD_COLUMNS, ['basic_info', 'contact_info'])
+    with app.app_context():
+        employee_id = make_employee(iban_number='SA0000000000000000000000').id
+        db.session.commit()
+
+        query = Employee.query.options(employee_projection(columns))
+        sql = str(query.statement.compile())
+        assert 'iban_number' not in sql
+        assert 'salary' not in sql
+
+        employee = query.filter_by(id=employee_id).one()
+        assert employee.name_arabic is not None
+        with pytest.raises(InvalidRequestError):
+            employee.iban_number
+
+
+def test_export_columns_follow_fields():
+    fields = allowed_columns(EMPLOYEE_FIELD_COLUMNS, ['basic_info', 'work_info'])
+    columns = export_columns(fields)
+
+    assert columns[0][1] == 'id'
+    assert {field for _, field, _ in columns} <= fields
+    assert 'iban_number' not in {field for _, field, _ in columns}
+    assert export_columns() == EXPORT_COLUMNS
+
+
+def _login(user, password):
+    client = app.test_client()
+    client.post('/login', data={'username': user.username, 'password': password},
+                base_url='https://localhost')
+    return client
+
+
+def test_print_and_edit_follow_employee_permissions(make_user, make_employee):
+    iban = 'SA4420000001234567891234'
+    with app.app_context():
+        employee = make_employee(iban_number=iban, salary=4321.5, camp_number='C-77')
+        db.session.commit()
+        employee_id, national_id = employee.id, employee.national_id
+
+    admin = _login(*make_user('admin'))
+    response = admin.get(f'/employees/print/{employee_id}', base_url='https://localhost')
+    assert response.status_code == 200
+    assert iban in response.get_data(as_text=True)
+    assert admin.get(f'/employees/edit/{employee_id}', base_url='https://localhost').status_code == 200
+
+    # دور الموظف: البيانات الأساسية والتواصل فقط، بدون تعديل
+    staff = _login(*make_user('employee'))
+    response = staff.get(f'/employees/print/{employee_id}', base_url='https://localhost')
+    body = response.get_data(as_text=True)
+    assert response.status_code == 200
+    assert national_id in body
+    assert iban not in body and '4321' not in body and 'C-77' not in body
+    assert staff.get(f'/employees/edit/{employee_id}', base_url='https://localhost').status_code == 403
+    assert staff.post(f'/employees/edit/{employee_id}', base_url='https://localhost').status_code == 403
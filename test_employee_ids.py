@@ -0,0 +1,85 @@
+import pytest
+from sqlalchemy import event
+
+from app import app, db
+from employee_ids import (
+    ID_DIGITS, allocate_employee_ids, next_employee_id, initial_position, _format, EMPLOYEE_ID_START, ID_SPACE
+)
+from models import Employee
+
+
+@pytest.fixture
+def session():
+    """كل التغييرات (العداد والموظفين) تلغى بعد الاختبار"""
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+
+
+def test_ids_are_unique_and_six_digits(session):
+    ids = [next_employee_id() for _ in range(5)] + allocate_employee_ids(50)
+
+    assert len(set(ids)) == len(ids)
+    assert all(len(employee_id) == ID_DIGITS and employee_id.isdigit() for employee_id in ids)
+    assert not session.query(Employee).filter(Employee.employee_id.in_(ids)).count()
+
+
+def test_used_ids_are_skipped(session, make_employee):
+    # رقم يدوي قبل العداد مباشرة يجب أن يتم تجاوزه
+    upcoming = next_employee_id()
+    following = str(int(upcoming) + 1)
+    make_employee(following)
+
+    ids = allocate_employee_ids(3)
+    assert following not in ids
+    assert len(ids) == 3
+
+
+def test_positions_wrap_within_six_digits():
+    assert _format(EMPLOYEE_ID_START) == str(EMPLOYEE_ID_START)
+    assert _format(EMPLOYEE_ID_START + ID_SPACE - 1) == '999999'
+    assert _format(EMPLOYEE_ID_START + ID_SPACE) == str(EMPLOYEE_ID_START)
+
+
+def _replace_employees(session, make_employee, numbers):
+    session.query(Employee).delete()
+    for number in numbers:
+        make_employee(str(number))
+
+
+def test_counter_starts_at_largest_gap(session, make_employee):
+    _replace_employees(session, make_employee, [100000, 100001, 100002, 600000, 999990])
+    assert initial_position(session) == 100003
+
+    # أكبر فجوة بعد أكبر رقم (حتى 999999 ثم من 100000)
+    _replace_employees(session, make_employee, [100000, 250000, 400000])
+    assert initial_position(session) == 400001
+
+    # الرقم 999999 مستخدم: البحث عن فجوة بدلاً من البدء من 100000 دائماً
+    _replace_employees(session, make_employee, [100000, 250000, 999999])
+    assert initial_position(session) == 250001
+    _replace_employees(session, make_employee, [500000, 600000, 999999])
+    assert _format(initial_position(session)) == '100000'
+
+
+def test_dense_ids_need_few_queries(session, make_employee):
+    # 90% من الأرقام التالية للعداد مستخدمة (مثل الأرقام العشوائية القديمة)
+    start = int(next_employee_id()) + 1
+    for number in range(start, start + 3000):
+        if number % 10:
+            make_employee(str(number))
+    allocate_employee_ids(1)
+
+    statements = []
+
+    def count(*args):
+        statements.append(1)
+
+    event.listen(db.engine, 'before_cursor_execute', count)
+    try:
+        ids = [next_employee_id() for _ in range(20)]
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', count)
+    assert len(set(ids)) == 20
+    assert not session.query(Employee).filter(Employee.employee_id.in_(ids)).count()
+    assert len(statements) <= 20 * 4
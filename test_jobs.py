@@ -0,0 +1,33 @@
+from datetime import datetime, timedelta
+from uuid import uuid4
+
+from app import app, db
+from jobs import JobContext, fail_stale_jobs
+from models import Job
+
+
+def _job(status, minutes_ago):
+    moment = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    job = Job(id=uuid4().hex, job_type='export_employees', status=status,
+              created_at=moment, started_at=moment, updated_at=moment)
+    db.session.add(job)
+    return job
+
+
+def test_stale_jobs_are_marked_failed():
+    with app.app_context():
+        stale_running = _job('running', 120)
+        stale_queued = _job('queued', 90)
+        active = _job('running', 5)
+        finished = _job('succeeded', 600)
+        # مهمة قديمة لكنها حدثت نسبة الإنجاز للتو
+        progressing = _job('running', 300)
+        db.session.commit()
+        JobContext(progressing.id, None).progress(40)
+
+        assert fail_stale_jobs(stale_minutes=60) == 2
+        db.session.expire_all()
+        assert stale_running.status == stale_queued.status == 'failed'
+        assert stale_running.finished_at and stale_running.error
+        assert active.status == progressing.status == 'running'
+        assert finished.status == 'succeeded'
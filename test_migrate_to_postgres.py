@@ -0,0 +1,81 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import Column, Date, Float, MetaData, Table, create_engine, func, select
+
+import migrate_to_postgres
+from migrate_to_postgres import migrate
+from models import db, Attendance, Employee
+
+
+def _constant(column):
+    if isinstance(column.type, Date):
+        return date(2020, 1, 1)
+    if isinstance(column.type, Float):
+        return 0
+    return '-'
+
+
+@pytest.fixture
+def source_url(tmp_path):
+    """قاعدة SQLite قديمة بدون القيد الفريد على الحضور وفيها سجلان لنفس اليوم"""
+    engine = create_engine(f'sqlite:///{tmp_path / "source.db"}')
+    db.metadata.create_all(engine, tables=[t for t in db.metadata.sorted_tables if t.name != 'attendance'])
+    legacy_attendance = Table('attendance', MetaData(), *(
+        Column(c.name, c.type, primary_key=c.primary_key) for c in Attendance.__table__.columns
+    ))
+    legacy_attendance.create(engine)
+
+    required = {c.name: _constant(c) for c in Employee.__table__.columns
+                if not c.nullable and c.default is None and not c.primary_key}
+    with engine.begin() as connection:
+        connection.execute(Employee.__table__.insert().values(id=1, **required))
+        connection.execute(legacy_attendance.insert(), [
+            {'id': 1, 'employee_id': 1, 'date': date(2024, 1, 1), 'status': 'present'},
+            {'id': 2, 'employee_id': 1, 'date': date(2024, 1, 1), 'status': 'absent'},
+            {'id': 3, 'employee_id': 1, 'date': date(2024, 1, 2), 'status': 'present'},
+        ])
+    engine.dispose()
+    return f'sqlite:///{tmp_path / "source.db"}'
+
+
+def _counts(url, *tables):
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        counts = [connection.execute(select(func.count()).select_from(t)).scalar() for t in tables]
+    engine.dispose()
+    return counts
+
+
+def test_duplicates_are_reported_before_copying(source_url, tmp_path):
+    target_url = f'sqlite:///{tmp_path / "target.db"}'
+    with pytest.raises(SystemExit, match='attendance'):
+        migrate(source_url, target_url)
+    assert _counts(target_url, Employee.__table__, Attendance.__table__) == [0, 0]
+
+    migrate(source_url, target_url, merge_duplicates=True)
+    engine = create_engine(target_url)
+    with engine.connect() as connection:
+        rows = connection.execute(select(Attendance.id, Attendance.status).order_by(Attendance.id)).all()
+    engine.dispose()
+    assert [tuple(row) for row in rows] == [(2, 'absent'), (3, 'present')]
+
+
+def test_failed_copy_leaves_target_empty(source_url, tmp_path, monkeypatch):
+    target_url = f'sqlite:///{tmp_path / "target.db"}'
+    copy_table = migrate_to_postgres.copy_table
+
+    def failing_copy(source, target_connection, table, *args):
+        if table.name == 'attendance':
+            raise RuntimeError('انقطاع الاتصال')
+        return copy_table(source, target_connection, table, *args)
+
+    monkeypatch.setattr(migrate_to_postgres, 'copy_table', failing_copy)
+    with pytest.raises(RuntimeError):
+        migrate(source_url, target_url, merge_duplicates=True)
+    assert _counts(target_url, Employee.__table__) == [0]
+
+    # إعادة التشغيل تنجح لأن القاعدة الجديدة بقيت فارغة
+    monkeypatch.setattr(migrate_to_postgres, 'copy_table', copy_table)
+    migrate(source_url, target_url, merge_duplicates=True)
+    assert _counts(target_url, Employee.__table__, Attendance.__table__) == [1, 2]
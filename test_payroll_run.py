@@ -0,0 +1,92 @@
+from datetime import date, timedelta
+
+import pandas as pd
+
+from app import app, db
+from models import Attendance, Payroll
+from payroll_run import calculate_payroll_frame, run_payroll
+
+MONTH, YEAR = 2, 2031
+
+AMOUNTS = ['daily_salary', 'due_salary', 'overtime_due', 'total_salary', 'absence_deduction',
+           'withdrawal_deduction', 'total_deductions', 'net_salary', 'gross_salary']
+
+INPUTS = ['basic_salary', 'present_days', 'absent_days', 'withdrawal_days', 'overtime_days',
+          'overtime_rate', 'housing_allowance', 'transport_allowance', 'other_allowances',
+          'advance_deduction', 'violation_deduction', 'insurance_deduction', 'tax_deduction',
+          'other_deductions']
+
+
+def _detailed(**values):
+    payroll = Payroll(**values)
+    payroll.calculate_detailed_salary()
+    return payroll
+
+
+def _add_attendance(employee, statuses):
+    for day, status in statuses.items():
+        db.session.add(Attendance(employee_id=employee.id, date=date(YEAR, MONTH, day), status=status))
+
+
+def test_bulk_run_matches_detailed_calculation(make_employee):
+    with app.app_context():
+        # شهر كامل: حضور وتأخير وغياب وانسحاب وأيام بدون تسجيل
+        full = make_employee(salary=4567.89)
+        statuses = {day: 'present' for day in range(1, 21)}
+        statuses.update({21: 'late', 22: 'late', 23: 'absent', 24: 'absent', 25: 'absent', 26: 'withdrawn'})
+        _add_attendance(full, statuses)
+
+        # تعيين في منتصف الشهر: سجلات الحضور تبدأ من يوم المباشرة
+        hired = make_employee(salary=3333.33, hire_date=date(YEAR, MONTH, 15))
+        statuses = {day: 'present' for day in range(15, 29)}
+        statuses[20] = 'absent'
+        _add_attendance(hired, statuses)
+
+        # بدون أي سجل حضور
+        absent = make_employee(salary=2500)
+
+        employees = [full, hired, absent]
+        result = run_payroll(MONTH, YEAR, employee_ids=[e.id for e in employees])
+        assert result == {'created': 3, 'skipped': 0, 'no_salary': 0}
+
+        for employee in employees:
+            bulk = Payroll.query.filter_by(employee_id=employee.id, month=MONTH, year=YEAR).one()
+            records = Attendance.query.filter_by(employee_id=employee.id).all()
+            expected = _detailed(
+                basic_salary=employee.salary,
+                present_days=sum(r.status in ('present', 'late') for r in records),
+                absent_days=sum(r.status == 'absent' for r in records),
+                withdrawal_days=sum(r.status == 'withdrawn' for r in records),
+                overtime_days=0, overtime_rate=1.5,
+                housing_allowance=0, transport_allowance=0, other_allowances=0,
+                advance_deduction=0, violation_deduction=0, insurance_deduction=0,
+                tax_deduction=0, other_deductions=0
+            )
+            assert (bulk.present_days, bulk.absent_days, bulk.withdrawal_days) == \
+                (expected.present_days, expected.absent_days, expected.withdrawal_days)
+            assert bulk.period_from == date(YEAR, MONTH, 1) and bulk.period_to == date(YEAR, MONTH, 28)
+            for name in AMOUNTS:
+                assert getattr(bulk, name) == getattr(expected, name), name
+
+        # تشغيل ثان لا ينشئ كشوفاً مكررة
+        assert run_payroll(MONTH, YEAR, employee_ids=[e.id for e in employees])['skipped'] == 3
+        db.session.rollback()
+
+
+def test_frame_matches_detailed_calculation_with_overtime_and_deductions():
+    rows = [
+        dict(basic_salary=4567.89, present_days=24, absent_days=3, withdrawal_days=1, overtime_days=3.5,
+             overtime_rate=1.5, housing_allowance=1141.97, transport_allowance=456.79, other_allowances=100.1,
+             advance_deduction=500, violation_deduction=33.3, insurance_deduction=441.27,
+             tax_deduction=0, other_deductions=12.5),
+        dict(basic_salary=3333.33, present_days=13, absent_days=1, withdrawal_days=0, overtime_days=2,
+             overtime_rate=2.0, housing_allowance=0, transport_allowance=300, other_allowances=0,
+             advance_deduction=0, violation_deduction=0, insurance_deduction=0,
+             tax_deduction=0, other_deductions=0),
+    ]
+    frame = calculate_payroll_frame(pd.DataFrame(rows, columns=INPUTS))
+
+    for row, calculated in zip(rows, frame.to_dict('records')):
+        expected = _detailed(**row)
+        for name in AMOUNTS:
+            assert calculated[name] == getattr(expected, name), name
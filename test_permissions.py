@@ -0,0 +1,52 @@
+import pytest
+
+from app import app, db
+from permissions import (
+    DEFAULT_ROLES, SYSTEM_MODULES, EMPTY_ROLE, PermissionCache, compile_role, remove_role, save_role
+)
+
+
+@pytest.fixture
+def session():
+    """كل تعديلات الأدوار تلغى بعد الاختبار"""
+    with app.app_context():
+        yield db.session
+        db.session.rollback()
+
+
+def test_compile_role_matches_definition():
+    manager = compile_role('manager', 'مدير', DEFAULT_ROLES['manager']['modules'])
+    admin = compile_role('admin', 'مدير النظام', DEFAULT_ROLES['admin']['modules'])
+
+    assert manager.allows('employees', 'view')
+    assert manager.allows('payroll', 'edit')
+    assert not manager.allows('payroll', 'delete')
+    assert not manager.allows('users', 'view')
+    assert not manager.allows('unknown', 'view')
+    assert manager.fields['employees'] == {'basic_info', 'contact_info', 'work_info'}
+    assert admin.fields['employees'] == set(SYSTEM_MODULES['employees']['fields'])
+
+    assert not EMPTY_ROLE.allows('employees', 'view')
+    with pytest.raises(TypeError):
+        manager.actions['users'] = 15
+
+
+def test_cache_reloads_when_version_changes(session):
+    worker_a, worker_b = PermissionCache(), PermissionCache()
+    assert set(DEFAULT_ROLES) <= set(worker_a.roles())
+    assert worker_b.role('auditor') is EMPTY_ROLE
+
+    modules = {'employees': {'view': True, 'add': False, 'edit': False, 'delete': False, 'fields': ['basic_info']}}
+    save_role('auditor', 'مدقق', modules)
+    session.flush()
+
+    # كل عملية ترى الدور الجديد عند قراءة رقم الإصدار التالي
+    for worker in (worker_a, worker_b):
+        auditor = worker.role('auditor')
+        assert auditor.allows('employees', 'view')
+        assert not auditor.allows('employees', 'edit')
+        assert auditor.fields['employees'] == {'basic_info'}
+
+    assert remove_role('auditor')
+    session.flush()
+    assert worker_a.role('auditor') is EMPTY_ROLE
@@ -0,0 +1,26 @@
+from PIL import Image
+
+from photo_variants import backfill_variants, generate_variants, variant_path
+
+
+def test_variants_are_resized_rotated_and_stripped(tmp_path):
+    source = tmp_path / 'photos'
+    source.mkdir()
+    exif = Image.Exif()
+    exif[0x0112] = 6  # الصورة ملتقطة بالعرض ويجب تدويرها 90 درجة
+    exif[0x010F] = 'PhoneMaker'
+    Image.new('RGB', (2000, 1000), 'red').save(source / 'photo.jpg', exif=exif)
+    folder = str(tmp_path / 'variants')
+
+    created = generate_variants(str(source / 'photo.jpg'), folder)
+    assert len(created) == 6
+
+    with Image.open(variant_path('photo.jpg', 'thumb', 'webp', folder)) as thumb:
+        assert thumb.size == (128, 128)
+    with Image.open(variant_path('photo.jpg', 'print', 'jpg', folder)) as printed:
+        assert printed.size == (300, 600)
+        assert not printed.getexif()
+
+    (source / 'notes.txt').write_text('not an image')
+    created_count, errors = backfill_variants(str(source), folder)
+    assert created_count == 0 and len(errors) == 1
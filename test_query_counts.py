@@ -0,0 +1,86 @@
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from app import app, db
+from models import Attendance, Payroll, Asset
+
+
+class QueryCounter:
+    """عداد استعلامات SQL المنفذة أثناء الطلب"""
+
+    def __init__(self):
+        self.statements = []
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self):
+        self.statements = []
+        event.listen(db.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(db.engine, 'before_cursor_execute', self._record)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture
+def query_counter():
+    with app.app_context():
+        yield QueryCounter()
+
+
+@pytest.fixture
+def list_data(make_employee):
+    """موظفون مع سجلات حضور ورواتب وعهد لليوم الحالي"""
+    today = date.today()
+
+    def add_employees(count):
+        with app.app_context():
+            for _ in range(count):
+                employee = make_employee()
+                db.session.add(Attendance(employee_id=employee.id, date=today, status='present'))
+                payroll = Payroll(
+                    employee_id=employee.id, month=today.month, year=today.year,
+                    period_from=today, period_to=today, period_days=30,
+                    present_days=30, absent_days=0, withdrawal_days=0,
+                    basic_salary=3000, overtime_days=0, overtime_rate=1.5,
+                    housing_allowance=0, transport_allowance=0, other_allowances=0,
+                    advance_deduction=0, violation_deduction=0, insurance_deduction=0,
+                    tax_deduction=0, other_deductions=0
+                )
+                payroll.calculate_detailed_salary()
+                db.session.add(payroll)
+                db.session.add(Asset(
+                    asset_id=f'A{employee.employee_id}', name='جهاز', category='إلكترونيات',
+                    employee_id=employee.id, status='assigned'
+                ))
+            db.session.commit()
+
+    return add_employees
+
+
+@pytest.mark.parametrize('url', [
+    '/payroll',
+    '/attendance/gender/ذكر',
+    '/assets',
+])
+def test_list_pages_have_no_n_plus_one(client, query_counter, list_data, url):
+    # عدد الاستعلامات يجب ألا يزيد بزيادة عدد السجلات المعروضة
+    list_data(2)
+    client.get(url, base_url='https://localhost')  # تسخين الكاش
+    with query_counter as counter:
+        assert client.get(url, base_url='https://localhost').status_code == 200
+    small = counter.count
+
+    list_data(5)
+    client.get(url, base_url='https://localhost')
+    with query_counter as counter:
+        assert client.get(url, base_url='https://localhost').status_code == 200
+
+    assert counter.count == small, counter.statements
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+import scheduler
+from scheduler import LeaderLock, PeriodicTask
+
+
+class FakeEngine:
+    class url:
+        @staticmethod
+        def get_backend_name():
+            return 'sqlite'
+
+
+def test_only_one_process_holds_the_leader_lock(tmp_path):
+    lock_file = str(tmp_path / 'scheduler.lock')
+    first = LeaderLock(FakeEngine, lock_file)
+    second = LeaderLock(FakeEngine, lock_file)
+
+    assert first.acquire()
+    assert not second.acquire()
+
+    # توقف القائد يحرر القفل لعملية أخرى
+    first.release()
+    assert second.acquire()
+    second.release()
+
+
+def test_missed_runs_are_caught_up_once():
+    task = PeriodicTask('backup', None, timedelta(days=1), at_hour=2)
+    last_run = datetime(2026, 1, 1, 2, 0, 30)
+
+    assert task.next_run(None, datetime(2026, 1, 1, 9)) == datetime(2026, 1, 1, 9)
+    assert task.next_run(last_run, last_run) == datetime(2026, 1, 2, 2, 0)
+
+    # الخادم كان متوقفاً ثلاثة أيام: المهمة مستحقة الآن مرة واحدة
+    now = datetime(2026, 1, 5, 10, 0)
+    assert task.next_run(last_run, now) <= now
+    assert task.next_run(now, now) == datetime(2026, 1, 6, 2, 0)
+
+    disabled = PeriodicTask('backup', None, lambda: None)
+    assert disabled.next_run(last_run, now) is None
+
+
+@pytest.fixture
+def test_task(monkeypatch):
+    from app import app
+    from models import db, ScheduledTaskRun
+
+    calls = []
+
+    def task():
+        calls.append(1)
+        return 'ok'
+
+    monkeypatch.setattr(scheduler, '_tasks', {
+        'test_task': PeriodicTask('test_task', task, timedelta(hours=1))
+    })
+    with app.app_context():
+        yield calls
+        db.session.query(ScheduledTaskRun).filter_by(name='test_task').delete()
+        db.session.commit()
+
+
+def test_run_pending_persists_last_run(test_task):
+    from models import db, ScheduledTaskRun
+
+    now = datetime(2026, 1, 1, 12, 0)
+    assert scheduler.run_pending(now) == ['test_task']
+    assert scheduler.run_pending(now + timedelta(minutes=30)) == []
+    assert scheduler.run_pending(now + timedelta(hours=1)) == ['test_task']
+
+    record = db.session.get(ScheduledTaskRun, 'test_task')
+    assert (record.last_status, record.run_count, record.last_message) == ('succeeded', 2, 'ok')
+    assert record.next_run_at == now + timedelta(hours=2)
+    assert len(test_task) == 2
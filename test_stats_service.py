@@ -0,0 +1,73 @@
+from datetime import date
+
+from app import app, db
+from models import Asset, Attendance, Document, Employee, JobApplication, Payroll
+from stats_service import EMPLOYEE_TYPES, OTHER_EMPLOYEE_TYPE, get_stats, invalidate_stats_cache
+
+DAY = date(2031, 4, 1)
+
+
+def _seed(make_employee):
+    employees = [
+        make_employee(employee_type='الحراسات الأمنية'),
+        make_employee(employee_type='الحراسات الأمنية'),
+        make_employee(employee_type='العاملات'),
+        make_employee(employee_type='نوع غير معتمد'),
+        make_employee(employee_type='الإدارة', status='inactive'),
+    ]
+    statuses = ['present', 'present', 'late', 'sick', 'absent']
+    for employee, status in zip(employees, statuses):
+        db.session.add(Attendance(employee_id=employee.id, date=DAY, status=status))
+    db.session.flush()
+
+
+def test_stats_match_individual_counts(make_employee):
+    with app.app_context():
+        _seed(make_employee)
+        invalidate_stats_cache()
+        stats = get_stats(DAY)
+
+        active = Employee.query.filter(Employee.status == 'active')
+        expected_types = {t: active.filter(Employee.employee_type == t).count() for t in EMPLOYEE_TYPES}
+        expected_types[OTHER_EMPLOYEE_TYPE] = active.filter(Employee.employee_type.notin_(EMPLOYEE_TYPES)).count()
+        assert stats['employees_by_type'] == expected_types
+        assert expected_types[OTHER_EMPLOYEE_TYPE] >= 1
+        assert stats['total_employees'] == active.count()
+
+        on_day = Attendance.query.filter(Attendance.date == DAY)
+        assert stats['attendance'] == {
+            status: on_day.filter(Attendance.status == status).count()
+            for status in ['present', 'absent', 'late', 'withdrawn', 'sick']
+        }
+        assert stats['attendance']['present'] == 2
+        assert stats['attendance_total'] == on_day.count() == 5
+
+        assert stats['total_assets'] == Asset.query.count()
+        assert stats['assigned_assets'] == Asset.query.filter_by(status='assigned').count()
+        assert stats['total_documents'] == Document.query.count()
+        assert stats['confidential_documents'] == Document.query.filter_by(is_confidential=True).count()
+        assert stats['payroll_count'] == Payroll.query.filter_by(month=DAY.month, year=DAY.year).count()
+        assert stats['pending_applications'] == JobApplication.query.filter_by(status='pending').count()
+        db.session.rollback()
+        invalidate_stats_cache()
+
+
+def test_cached_stats_are_returned_as_copies(make_employee):
+    with app.app_context():
+        invalidate_stats_cache()
+        expected = get_stats(DAY, ttl=60)
+        stats = get_stats(DAY, ttl=60)
+        assert stats == expected
+
+        stats['employees_by_type'][OTHER_EMPLOYEE_TYPE] += 100
+        stats['attendance']['present'] = -1
+        stats['total_employees'] = 0
+
+        # موظف جديد لا يظهر قبل انتهاء مدة التخزين، والتعديل على النتيجة لا يغير المخزن
+        make_employee(employee_type='العاملات')
+        assert get_stats(DAY, ttl=60) == expected
+
+        invalidate_stats_cache()
+        assert get_stats(DAY)['total_employees'] == expected['total_employees'] + 1
+        db.session.rollback()
+        invalidate_stats_cache()
@@ -1,4 +1,9 @@
 from app import app
+from scheduler import init_scheduler
+
+# المجدول يبدأ هنا وليس عند استيراد التطبيق؛ مع عدة عمال gunicorn
+# تشغل عملية واحدة فقط المهام الدورية (قفل اختيار القائد)
+init_scheduler(app)
 
 if __name__ == "__main__":
-    app.run()
\ No newline at end of file
+    app.run()